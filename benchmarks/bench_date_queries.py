@@ -0,0 +1,203 @@
+"""
+Benchmark of the date filters of DatabaseHandler before and after the date-leading indexes, on a
+synthetic multi-year database.
+
+The script fills a scratch database (dropped and recreated, never the production one) with
+--years of hourly weather, merged data and predictions and a few alarms per region and day. It
+then runs the former queries (DATE(start) = ..., = (SELECT MAX(date) ...)) without the secondary
+indexes, adds them with ensure_indexes, and runs the rewritten half-open range queries. For every
+query it prints the EXPLAIN access type, the index used and the estimated rows, and the best time
+of --repeat runs. The run fails if a rewritten query does not use its date-leading index.
+
+Usage:
+    python -m benchmarks.bench_date_queries --years 3 --database bench_date_queries
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import mysql.connector
+from src.database.db_handler import DatabaseHandler
+
+INSERT_BATCH = 5000
+
+
+def seed_database(db, years, alarms_per_day, seed):
+    rng = np.random.default_rng(seed)
+    db.initialize_regions_in_database()
+    with db.session() as cursor:
+        cursor.execute("SELECT region_id FROM regions")
+        region_ids = [row[0] for row in cursor.fetchall()]
+
+    last_day = datetime(2025, 1, 1)
+    days = [last_day - timedelta(days=i) for i in range(years * 365)][::-1]
+    hours = [f"{hour:02d}:00:00" for hour in range(24)]
+
+    hourly = [(region_id, day.strftime('%Y-%m-%d'), hour) for day in days for region_id in region_ids for hour in hours]
+    alarms = []
+    for day in days:
+        for region_id in region_ids:
+            # distinct start minutes, the unique key is (region_id, start)
+            for minute in np.sort(rng.choice(24 * 60, size=alarms_per_day, replace=False)):
+                start = day + timedelta(minutes=int(minute))
+                alarms.append((region_id, start.strftime('%Y-%m-%d %H:%M:%S'),
+                               (start + timedelta(minutes=int(rng.integers(5, 240)))).strftime('%Y-%m-%d %H:%M:%S')))
+
+    statements = [
+        ("INSERT INTO weather (region_id, date, time, data) VALUES (%s, %s, %s, %s)",
+         [row + ('{"temp": 1.0, "humidity": 50}',) for row in hourly]),
+        ("INSERT INTO merged_data (region_id, date, time, schema_version) VALUES (%s, %s, %s, 1)", hourly),
+        ("INSERT INTO predictions (region_id, date, time, prediction_value, raw_probabilities) VALUES (%s, %s, %s, 0, 0.5)",
+         hourly),
+        ("INSERT INTO alarms (region_id, start, end) VALUES (%s, %s, %s)", alarms),
+    ]
+    with db.session() as cursor:
+        for sql, rows in statements:
+            t0 = time.perf_counter()
+            for i in range(0, len(rows), INSERT_BATCH):
+                cursor.executemany(sql, rows[i:i + INSERT_BATCH])
+            print(f"Inserted {len(rows)} rows into {sql.split()[2]} in {time.perf_counter() - t0:.1f}s.")
+        cursor.execute("ANALYZE TABLE weather, merged_data, predictions, alarms")
+        cursor.fetchall()
+    return days
+
+
+def max_value(cursor, table, column):
+    cursor.execute(f"SELECT MAX({column}) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def build_cases(cursor, sample_day):
+    """
+    (name, index expected after the upgrade, former query, rewritten query) of every filter; a
+    query is (sql, params), with the MAX() lookups of the rewritten ones resolved beforehand.
+    """
+    cases = []
+    for table in ('weather', 'merged_data', 'predictions'):
+        latest = max_value(cursor, table, 'date')
+        cases.append((f"{table} latest day", f"idx_{table}_date",
+                      (f"SELECT region_id, date, time FROM {table} WHERE date = (SELECT MAX(date) FROM {table})", ()),
+                      (f"SELECT region_id, date, time FROM {table} WHERE date >= %s AND date < %s",
+                       (latest, latest + timedelta(days=1)))))
+
+    month_start = sample_day.replace(day=1)
+    cases.append(("weather month range", "idx_weather_date",
+                  ("SELECT region_id, date, time FROM weather WHERE date >= %s AND date < %s",
+                   (month_start, month_start + timedelta(days=31))),
+                  ("SELECT region_id, date, time FROM weather WHERE date >= %s AND date < %s",
+                   (month_start, month_start + timedelta(days=31)))))
+
+    cases.append(("alarms specific date", "idx_alarms_start",
+                  ("SELECT region_id, start, end FROM alarms WHERE DATE(start) = %s", (sample_day.strftime('%Y-%m-%d'),)),
+                  ("SELECT region_id, start, end FROM alarms WHERE start >= %s AND start < %s",
+                   (sample_day, sample_day + timedelta(days=1)))))
+
+    latest_start = max_value(cursor, 'alarms', 'start')
+    cases.append(("alarms last 7 days", "idx_alarms_start",
+                  ("SELECT region_id, start, end FROM alarms WHERE start >= (SELECT MAX(start) - INTERVAL 7 DAY FROM alarms)", ()),
+                  ("SELECT region_id, start, end FROM alarms WHERE start >= %s", (latest_start - timedelta(days=7),))))
+    return cases
+
+
+def explain(cursor, sql, params):
+    """
+    Returns the access type, index and estimated rows of the query's first table.
+    """
+    cursor.execute("EXPLAIN " + sql, params)
+    columns = [column[0].lower() for column in cursor.description]
+    plan = dict(zip(columns, cursor.fetchall()[0]))
+    return plan.get('type'), plan.get('key'), plan.get('rows')
+
+
+def best_time(cursor, sql, params, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def drop_secondary_indexes(cursor):
+    for table, indexes in DatabaseHandler.SECONDARY_INDEXES.items():
+        for index_name, _ in indexes:
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+            """, (table, index_name))
+            if cursor.fetchone()[0]:
+                cursor.execute(f"DROP INDEX {index_name} ON {table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN and timings of the date filters before and after the date-leading indexes.")
+    parser.add_argument('--host', default=os.environ.get('DB_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('DB_PORT', 3306)))
+    parser.add_argument('--user', default=os.environ.get('DB_USER', 'root'))
+    parser.add_argument('--password', default=os.environ.get('DB_PASSWORD', ''))
+    parser.add_argument('--database', default='bench_date_queries',
+                        help="Scratch database, dropped and recreated by the benchmark.")
+    parser.add_argument('--years', type=int, default=3, help="Years of synthetic history.")
+    parser.add_argument('--alarms-per-day', type=int, default=3, help="Alarms per region and day.")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per query, the best one is reported.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.database == os.environ.get('DB_NAME'):
+        parser.error("--database must not be the pipeline's database (DB_NAME), it is dropped.")
+
+    server = mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password)
+    server_cursor = server.cursor()
+    server_cursor.execute(f"DROP DATABASE IF EXISTS {args.database}")
+    server_cursor.execute(f"CREATE DATABASE {args.database}")
+    server_cursor.close()
+    server.close()
+
+    db = DatabaseHandler(args.host, args.database, args.user, args.password, port=args.port)
+    db.connect()
+    try:
+        db.create_tables()
+        with db.session() as cursor:
+            drop_secondary_indexes(cursor)
+        days = seed_database(db, args.years, args.alarms_per_day, args.seed)
+
+        with db.session() as cursor:
+            cases = build_cases(cursor, days[len(days) // 2])
+            before = [(explain(cursor, *legacy), best_time(cursor, *legacy, args.repeat)) for _, _, legacy, _ in cases]
+
+        db.ensure_indexes()
+        with db.session() as cursor:
+            cursor.execute("ANALYZE TABLE weather, merged_data, predictions, alarms")
+            cursor.fetchall()
+            after = [(explain(cursor, *rewritten), best_time(cursor, *rewritten, args.repeat))
+                     for _, _, _, rewritten in cases]
+            max_plans = {table: explain(cursor, f"SELECT MAX({column}) FROM {table}", ())
+                         for table, column in (('weather', 'date'), ('merged_data', 'date'),
+                                               ('predictions', 'date'), ('alarms', 'start'))}
+    finally:
+        db.disconnect()
+
+    failures = []
+    print(f"\n{'query':<24} {'before (type/key/rows)':<44} {'ms':>8}   {'after (type/key/rows)':<44} {'ms':>8} {'speed-up':>9}")
+    for (name, expected_index, _, _), (plan_before, t_before), (plan_after, t_after) in zip(cases, before, after):
+        print(f"{name:<24} {'/'.join(map(str, plan_before)):<44} {t_before * 1000:8.2f}   "
+              f"{'/'.join(map(str, plan_after)):<44} {t_after * 1000:8.2f} {t_before / max(t_after, 1e-9):8.1f}x")
+        if plan_after[1] != expected_index or plan_after[0] not in ('range', 'ref'):
+            failures.append(f"{name}: expected a range scan of {expected_index}, EXPLAIN shows {plan_after}")
+
+    # with a date-leading index MAX() is read from the end of the index ("Select tables optimized away")
+    for table, plan in max_plans.items():
+        print(f"MAX() on {table:<14} {'/'.join(map(str, plan))}")
+
+    if failures:
+        print("\nEXPLAIN check failed:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nEXPLAIN check passed: every rewritten query scans its date-leading index.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark of the single-pass ISW report extractor against the original regex extractor, on saved
+report pages or, without --pages, on synthetic pages shaped like the ISW backgrounders.
+
+Usage:
+    python -m benchmarks.bench_isw_extract --pages data/isw_pages --repeat 5
+"""
+
+import argparse
+import glob
+import os
+import random
+import re
+import time
+from src.data_receiver.isw_receiver import ISWDataCollector
+
+
+def legacy_extract_text(html):
+    """
+    The original ISWDataCollector.extract_text, kept verbatim as the reference implementation.
+    """
+    pattern = r'<div[^>]*class\s*=\s*["\'][^"\']*?\bfield-name-body\b[^"\']*?["\'][^>]*?>(.*?\[1\].*?\[1\])'
+    match = re.search(pattern, html, re.DOTALL | re.IGNORECASE)
+    if match:
+        content = match.group(1)
+        text = re.sub(r'<[^>]+>', '', content)
+        text = ' '.join(text.split())
+        return text.strip()
+    return None
+
+
+def generate_page(paragraphs, footnotes, seed):
+    rng = random.Random(seed)
+    words = ['Russian', 'forces', 'continued', 'offensive', 'operations', 'near', 'Bakhmut', 'Avdiivka',
+             'Kupyansk', 'Ukrainian', 'officials', 'reported', 'strikes', 'drones', 'missiles', 'the',
+             'of', 'and', 'in', 'on', 'Kremlin', 'milbloggers', 'claimed', 'advances', '&amp;', '&#8217;s']
+    head = ['<html><head><title>Russian Offensive Campaign Assessment</title>',
+            '<script>var x = "<div>";</script></head><body>',
+            '<div class="menu">' + ''.join(f'<a href="/p{i}">Item {i}</a>' for i in range(200)) + '</div>',
+            '<div class="field field-name-body field-type-text-with-summary">']
+    body = []
+    for i in range(paragraphs):
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(40, 120)))
+        marker = f' <a href="#_edn{i + 1}" name="_ednref{i + 1}">[{i + 1}]</a>' if i < footnotes else ''
+        body.append(f'<p><span style="font-size: 12px;">{sentence}</span>{marker}</p>\n')
+    notes = [f'<p><a href="#_ednref{i + 1}" name="_edn{i + 1}">[{i + 1}]</a> https://t.me/source/{i}</p>\n'
+             for i in range(footnotes)]
+    tail = ['</div>', '<div class="footer">' + 'footer text ' * 500 + '</div></body></html>']
+    return ''.join(head + body + notes + tail)
+
+
+def load_pages(pages_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            pages.append(f.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ISW report text extraction.")
+    parser.add_argument('--pages', help="Directory of saved report pages (*.html). Synthetic pages if omitted.")
+    parser.add_argument('--synthetic', type=int, default=20, help="Number of synthetic pages.")
+    parser.add_argument('--paragraphs', type=int, default=150, help="Paragraphs per synthetic page.")
+    parser.add_argument('--without-footnotes', type=float, default=0.2,
+                        help="Share of synthetic pages without footnote markers (pages with no report text).")
+    parser.add_argument('--repeat', type=int, default=3, help="Passes over the corpus per extractor.")
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = load_pages(args.pages)
+    else:
+        n_without = int(args.synthetic * args.without_footnotes)
+        pages = [generate_page(args.paragraphs, footnotes=0 if i < n_without else args.paragraphs // 2, seed=i)
+                 for i in range(args.synthetic)]
+    total_mb = sum(len(page) for page in pages) / 1024 ** 2
+    print(f"Corpus: {len(pages)} pages, {total_mb:.1f} MB.")
+
+    mismatches = [i for i, page in enumerate(pages)
+                  if legacy_extract_text(page) != ISWDataCollector.extract_text(page)]
+    if mismatches:
+        raise AssertionError(f"Extractors disagree on pages {mismatches[:10]}")
+
+    timings = {}
+    for name, extract in (('regex', legacy_extract_text), ('single-pass', ISWDataCollector.extract_text)):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            for page in pages:
+                extract(page)
+        timings[name] = (time.perf_counter() - t0) / args.repeat
+        print(f"{name:>12}: {timings[name] * 1000:.1f} ms per pass ({total_mb / timings[name]:.1f} MB/s)")
+
+    print(f"Outputs match. Speed-up: x{timings['regex'] / max(timings['single-pass'], 1e-9):.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Parity check and benchmark of the batched TextEmbedder against the pickled pipeline,
+svd_reducer.transform(tfidf_vectorizer.transform(texts)), on texts drawn from each vectorizer's
+vocabulary. The embeddings must be identical (np.array_equal), not merely close.
+
+Usage:
+    python -m benchmarks.bench_text_embedder --docs 2000 --words 400 isw tg
+"""
+
+import argparse
+import os
+import pickle
+import random
+import sys
+import time
+import numpy as np
+from src.pipeline.text_artifacts import ARTIFACTS_DIR, TEXT_ARTIFACT_NAMES, TextArtifactRegistry, source_paths
+from src.pipeline.text_embedder import TextEmbedder
+
+
+def generate_texts(vocabulary, docs, words, seed):
+    rng = random.Random(seed)
+    terms = sorted(vocabulary)
+    # a few out-of-vocabulary tokens, dropped by both paths
+    terms += ['unseenterm', 'zzzz']
+    return [' '.join(rng.choice(terms) for _ in range(rng.randint(0, words))) for _ in range(docs)]
+
+
+def check_pipeline(name, artifacts_dir, docs, words, seed):
+    vectorizer_path, svd_path = source_paths(name, artifacts_dir)
+    if not (os.path.exists(vectorizer_path) and os.path.exists(svd_path)):
+        print(f"{name}: skipped, {os.path.basename(vectorizer_path)} or {os.path.basename(svd_path)} not found.")
+        return None
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open(svd_path, 'rb') as f:
+        svd_reducer = pickle.load(f)
+
+    texts = generate_texts(vectorizer.vocabulary_, docs, words, seed)
+    embedder = TextEmbedder(TextArtifactRegistry(artifacts_dir).get(name))
+
+    t0 = time.perf_counter()
+    reference = svd_reducer.transform(vectorizer.transform(texts))
+    t_reference = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    embedding = embedder.embed(texts)
+    t_embedder = time.perf_counter() - t0
+
+    if not np.array_equal(reference, embedding):
+        raise AssertionError(f"{name}: embeddings differ, max abs difference "
+                             f"{np.max(np.abs(reference - embedding)):.3e}")
+    print(f"{name}: {len(texts)} texts, identical embeddings. "
+          f"pickled pipeline {t_reference * 1000:.1f} ms, embedder {t_embedder * 1000:.1f} ms "
+          f"(x{t_reference / max(t_embedder, 1e-9):.1f})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the batched text embedder.")
+    parser.add_argument('names', nargs='*', default=list(TEXT_ARTIFACT_NAMES), help="Text pipelines to check.")
+    parser.add_argument('--artifacts-dir', default=ARTIFACTS_DIR, help="Directory of the pickled artifacts.")
+    parser.add_argument('--docs', type=int, default=2000, help="Number of texts.")
+    parser.add_argument('--words', type=int, default=400, help="Maximum vocabulary terms per text.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    checked = [check_pipeline(name, args.artifacts_dir, args.docs, args.words, args.seed) for name in args.names]
+    if not any(checked):
+        print("No pipeline could be checked.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+HTTP helpers shared by the data collectors: a thread-safe token-bucket rate limiter, a keep-alive
+session sized for a pool of worker threads, and the backoff schedule used between retries.
+"""
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter. Holds up to 'capacity' tokens, refilled at 'rate' tokens per
+    second; acquire() blocks until a token is available. Safe to share between threads.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def create_session(pool_size=10):
+    """
+    Returns a requests.Session that keeps up to pool_size connections per host alive.
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def backoff_delay(attempt, backoff_factor, retry_after=None, max_delay=60):
+    """
+    Seconds to wait before retry number attempt (0-based): the server's Retry-After header if it
+    sent a number of seconds, otherwise backoff_factor * 2 ** attempt, capped at max_delay.
+    """
+
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), max_delay)
+        except ValueError:
+            pass
+    return min(backoff_factor * 2 ** attempt, max_delay)
@@ -1,22 +1,54 @@
 import requests
 import re
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import threading
 import time
+from src.data_receiver.http_utils import TokenBucket, backoff_delay, create_session
+
+# politeness towards understandingwar.org: requests per second per host, and parallel requests
+ISW_REQUESTS_PER_SECOND = 1
+ISW_MAX_WORKERS = 4
+
+# opening tag of the report body, and the tags stripped from its text
+BODY_DIV_PATTERN = re.compile(
+    r'<div[^>]*class\s*=\s*["\'][^"\']*?\bfield-name-body\b[^"\']*?["\'][^>]*?>', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+FOOTNOTE_MARKER = '[1]'
 
 
 class ISWDataCollector:
-    def __init__(self, base_url="https://www.understandingwar.org/backgrounder/"):
+    def __init__(self, base_url="https://www.understandingwar.org/backgrounder/",
+                 max_workers=ISW_MAX_WORKERS, requests_per_second=ISW_REQUESTS_PER_SECOND,
+                 max_retries=3, backoff_factor=2.0):
         """
         Initialize the ISWDataCollector with a base URL.
+
+        Args:
+            base_url (str, optional): URL prefix of the reports.
+            max_workers (int, optional): Reports fetched in parallel.
+            requests_per_second (float, optional): Request rate allowed per host.
+            max_retries (int, optional): Retries of a request failing with a connection error or 5xx.
+            backoff_factor (float, optional): First backoff delay in seconds, doubled on every retry.
         """
 
         self.base_url = base_url
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = create_session(max_workers)
+        self._host_limiters = {}
+        self._host_lock = threading.Lock()
 
     @staticmethod
     def extract_text(html):
         """
-        Extracts text content from the first <div> element that contains the given class name.
+        Extracts text content from the first <div> element that contains the given class name,
+        up to the second '[1]' footnote marker (the one in the text and the first footnote).
+        The page is scanned once, left to right, with precompiled patterns.
 
         Args:
             html (str): The HTML content.
@@ -25,18 +57,149 @@ class ISWDataCollector:
             str or None: The extracted text with HTML tags removed, or None if not found.
         """
 
-        pattern = r'<div[^>]*class\s*=\s*["\'][^"\']*?\bfield-name-body\b[^"\']*?["\'][^>]*?>(.*?\[1\].*?\[1\])'
-        match = re.search(pattern, html, re.DOTALL | re.IGNORECASE)
-        if match:
-            content = match.group(1)
-            text = re.sub(r'<[^>]+>', '', content)
-            text = ' '.join(text.split())
-            return text.strip()
-        return None
+        match = BODY_DIV_PATTERN.search(html)
+        if not match:
+            return None
+
+        first_marker = html.find(FOOTNOTE_MARKER, match.end())
+        if first_marker < 0:
+            return None
+        second_marker = html.find(FOOTNOTE_MARKER, first_marker + len(FOOTNOTE_MARKER))
+        if second_marker < 0:
+            return None
+
+        content = html[match.end():second_marker + len(FOOTNOTE_MARKER)]
+        text = TAG_PATTERN.sub('', content)
+        return ' '.join(text.split()).strip()
+
+    def report_url(self, current_date):
+        """
+        Returns the URL of the report published for current_date.
+        """
+
+        day_without_leading_zero = str(current_date.day)
+        month_name_lower = current_date.strftime("%B").lower()
+
+        if current_date.year == 2022 and current_date.month == 2:
+            if current_date.day == 24:
+                return f"{self.base_url}russia-ukraine-warning-update-initial-russian-offensive-campaign-assessment"
+            elif current_date.day == 25:
+                return f"{self.base_url}russia-ukraine-warning-update-russian-offensive-campaign-assessment-february-25-2022"
+            elif current_date.day == 26:
+                return f"{self.base_url}russia-ukraine-warning-update-russian-offensive-campaign-assessment-february-26"
+            elif current_date.day == 27:
+                return f"{self.base_url}russia-ukraine-warning-update-russian-offensive-campaign-assessment-february-27"
+            elif current_date.day == 28:
+                return f"{self.base_url}russian-offensive-campaign-assessment-february-28-2022"
+
+        if current_date.year == 2022 and current_date.month >= 3 and current_date.day >= 1:
+            date_str = f"{month_name_lower}-{day_without_leading_zero}"
+        else:
+            date_str = f"{month_name_lower}-{day_without_leading_zero}-{current_date.year}"
+        return f"{self.base_url}russian-offensive-campaign-assessment-{date_str}"
+
+    def _host_limiter(self, url):
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_limiters:
+                self._host_limiters[host] = TokenBucket(self.requests_per_second)
+            return self._host_limiters[host]
+
+    def fetch_report(self, current_date, etag=None, last_modified=None):
+        """
+        Fetches the report of one date, as a conditional GET when the validators of an earlier
+        fetch are given.
+
+        Args:
+            current_date (datetime): Report date.
+            etag (str, optional): ETag of the stored copy.
+            last_modified (str, optional): Last-Modified of the stored copy.
+
+        Returns:
+            dict: 'date', 'url', 'status' ('fetched', 'not_modified', 'missing' or 'failed'),
+                  'http_status', 'etag', 'last_modified' and 'report_text' (None unless fetched).
+        """
+        url = self.report_url(current_date)
+        result = {
+            'date': current_date.strftime('%Y-%m-%d'),
+            'url': url,
+            'status': 'failed',
+            'http_status': None,
+            'etag': None,
+            'last_modified': None,
+            'report_text': None,
+        }
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        attempt = 0
+        while True:
+            self._host_limiter(url).acquire()
+            try:
+                response = self.session.get(url, headers=headers, timeout=60)
+            except requests.exceptions.RequestException as e:
+                print(f"Error collecting data for {result['date']}: {str(e)}")
+                response = None
+
+            if response is not None and response.status_code < 500 and response.status_code != 429:
+                break
+            if attempt >= self.max_retries:
+                if response is not None:
+                    result['http_status'] = response.status_code
+                return result
+            retry_after = response.headers.get('Retry-After') if response is not None else None
+            time.sleep(backoff_delay(attempt, self.backoff_factor, retry_after))
+            attempt += 1
+
+        result['http_status'] = response.status_code
+        result['etag'] = response.headers.get('ETag')
+        result['last_modified'] = response.headers.get('Last-Modified')
+
+        if response.status_code == 304:
+            result['status'] = 'not_modified'
+        elif response.status_code == 200:
+            result['report_text'] = self.extract_text(response.text)
+            if result['report_text']:
+                result['status'] = 'fetched'
+                print(f"Successfully collected report for {result['date']}")
+            else:
+                result['status'] = 'missing'
+                print(f"Could not find content for {result['date']}")
+        elif response.status_code == 404:
+            result['status'] = 'missing'
+            print(f"No report published for {result['date']}")
+        else:
+            print(f"HTTP {response.status_code} collecting data for {result['date']}")
+
+        return result
+
+    def fetch_reports(self, dates, validators=None):
+        """
+        Fetches the reports of the given dates in parallel, max_workers at a time.
+
+        Args:
+            dates (list): Report dates.
+            validators (dict, optional): Maps 'YYYY-MM-DD' to (etag, last_modified) of stored copies.
+
+        Returns:
+            list: fetch_report results, in dates order.
+        """
+        validators = validators or {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self.fetch_report, current_date,
+                                *validators.get(current_date.strftime('%Y-%m-%d'), (None, None)))
+                for current_date in dates
+            ]
+            return [future.result() for future in futures]
 
     def collect_data(self, start_date, end_date):
         """
-        Collects ISW reports from start_date to end_date.
+        Collects ISW reports from start_date to end_date. Dates without a report are skipped.
 
         Args:
             start_date (datetime): Starting date for collection.
@@ -46,53 +209,64 @@ class ISWDataCollector:
             DataFrame: Contains 'date', 'report_text', and 'url' columns with collected data.
         """
 
-        data = []
-        current_date = start_date
-
-        while current_date <= end_date:
-            day_without_leading_zero = str(current_date.day)
-            month_name_lower = current_date.strftime("%B").lower()
-
-            if current_date.year == 2022 and current_date.month == 2:
-                if current_date.day == 24:
-                    url = f"{self.base_url}russia-ukraine-warning-update-initial-russian-offensive-campaign-assessment"
-                elif current_date.day == 25:
-                    url = f"{self.base_url}russia-ukraine-warning-update-russian-offensive-campaign-assessment-february-25-2022"
-                elif current_date.day == 26:
-                    url = f"{self.base_url}russia-ukraine-warning-update-russian-offensive-campaign-assessment-february-26"
-                elif current_date.day == 27:
-                    url = f"{self.base_url}russia-ukraine-warning-update-russian-offensive-campaign-assessment-february-27"
-                elif current_date.day == 28:
-                    url = f"{self.base_url}russian-offensive-campaign-assessment-february-28-2022"
-
-            elif current_date.year == 2022 and current_date.month >= 3 and current_date.day >= 1:
-                date_str = f"{month_name_lower}-{day_without_leading_zero}"
-                url = f"{self.base_url}russian-offensive-campaign-assessment-{date_str}"
-            else:
-                date_str = f"{month_name_lower}-{day_without_leading_zero}-{current_date.year}"
-                url = f"{self.base_url}russian-offensive-campaign-assessment-{date_str}"
+        dates = list(pd.date_range(start_date, end_date, freq='D').to_pydatetime())
+        results = self.fetch_reports(dates)
 
-            try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    report_text = self.extract_text(response.text)
-                    if report_text:
-                        data.append({
-                            'date': current_date.strftime('%Y-%m-%d'),
-                            'report_text': report_text,
-                            'url': url
-                        })
-                        print(f"Successfully collected report for {current_date.strftime('%Y-%m-%d')}")
-                    else:
-                        print(f"Could not find content for {current_date.strftime('%Y-%m-%d')}")
-                        break
-
-            except Exception as e:
-                print(f"Error collecting data for {current_date.strftime('%Y-%m-%d')}: {str(e)}")
-                break
+        data = [
+            {'date': result['date'], 'report_text': result['report_text'], 'url': result['url']}
+            for result in results if result['status'] == 'fetched'
+        ]
+        df = pd.DataFrame(data)
+        return df
 
-            time.sleep(1)
-            current_date += timedelta(days=1)
+    def backfill(self, start_date, end_date, db_handler, refresh=False, batch_days=30):
+        """
+        Collects the ISW reports of start_date to end_date into the database, resuming from the
+        'isw_fetch_log' checkpoint table: dates already fetched are skipped, and only missing,
+        failed and never-tried dates are requested. Progress is saved after every batch, so an
+        interrupted run continues where it stopped.
 
-        df = pd.DataFrame(data)
-        return df
\ No newline at end of file
+        Args:
+            start_date (datetime): Starting date for collection.
+            end_date (datetime): Ending date for collection.
+            db_handler (DatabaseHandler)
+            refresh (bool, optional): Re-request fetched dates too, as conditional GETs that only
+                                      download reports changed since. Defaults to False.
+            batch_days (int, optional): Dates fetched and saved per batch. Defaults to 30.
+
+        Returns:
+            dict: Number of dates per outcome.
+        """
+        fetch_log = db_handler.get_isw_fetch_log(start_date, end_date + timedelta(days=1))
+        validators = {}
+        done = set()
+        for row in fetch_log.itertuples():
+            date_str = row.date.strftime('%Y-%m-%d')
+            validators[date_str] = (row.etag if pd.notna(row.etag) else None,
+                                    row.last_modified if pd.notna(row.last_modified) else None)
+            if row.status == 'fetched':
+                done.add(date_str)
+
+        dates = [current_date for current_date in pd.date_range(start_date, end_date, freq='D').to_pydatetime()
+                 if refresh or current_date.strftime('%Y-%m-%d') not in done]
+        print(f"ISW backfill: {len(done)} dates already fetched, {len(dates)} to request.")
+
+        summary = {}
+        for offset in range(0, len(dates), batch_days):
+            results = self.fetch_reports(dates[offset:offset + batch_days], validators if refresh else None)
+
+            reports = pd.DataFrame([result for result in results if result['status'] == 'fetched'])
+            if not reports.empty:
+                db_handler.insert_isw_report(reports[['date', 'report_text', 'url']])
+
+            log = pd.DataFrame(results).drop(columns=['report_text'])
+            # an unchanged report is still fetched
+            log['status'] = log['status'].replace('not_modified', 'fetched')
+            log['fetched_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            db_handler.upsert_isw_fetch_log(log)
+
+            for result in results:
+                summary[result['status']] = summary.get(result['status'], 0) + 1
+
+        print(f"ISW backfill finished: {summary}")
+        return summary
@@ -1,20 +1,20 @@
 import asyncio
-import os
-import json
 import pytz
 from datetime import datetime, timedelta
 from telethon import TelegramClient
 import pandas as pd
 
+# messages buffered in the database per insert, and the cursor saved after each
+MESSAGE_FLUSH_SIZE = 500
+
 class TelegramFetcher:
     """
-    A class to fetch messages from a Telegram chat within a specified date range.
+    Buffers the messages of Telegram channels in the database, incrementally per channel.
     """
-    def __init__(self, api_id, api_hash, session_name, output_dir='telegram_data'):
+    def __init__(self, api_id, api_hash, session_name):
         """
         Initializes the TelegramFetcher.
         """
-        self.output_dir = output_dir
         self.api_id = api_id
         self.api_hash = api_hash
         self.session_name = session_name
@@ -37,72 +37,98 @@ class TelegramFetcher:
             await self.client.disconnect()
             print("Disconnected.")
 
-    async def fetch_messages(self, chat_id, limit=None, start_date=None, end_date=None):
+    async def sync_channels(self, channels, db_handler, start_date, end_date=None, from_cursor=True,
+                            flush_size=MESSAGE_FLUSH_SIZE):
         """
-        Fetches messages from a chat within a specified date range using the initialized client.
+        Buffers the new messages of several channels in the 'telegram_messages' table, fetching
+        the channels concurrently on this client.
+
+        Only messages newer than a channel's cursor (the id of its last buffered message) are
+        requested; a channel without a cursor is read from the start of start_date (Kyiv time).
+        Messages are written every flush_size messages, and the cursor is moved after each write,
+        so an interrupted run resumes where it stopped.
+
+        Args:
+            channels (list): Channel usernames or ids.
+            db_handler (DatabaseHandler)
+            start_date (datetime): First day to fetch for channels without a cursor.
+            end_date (datetime, optional): Last day to fetch. Defaults to None (up to now).
+            from_cursor (bool, optional): Start at the cursor. If False, re-read from start_date,
+                                          e.g. to backfill older days; cursors never move back.
+            flush_size (int, optional): Messages per database write.
+
+        Returns:
+            dict: Number of new messages buffered per channel, or None for channels that failed.
         """
-
-        kyiv_tz = pytz.timezone('Europe/Kyiv')
-
         if not self.client.is_connected():
             await self.connect()
 
-        if not start_date or not end_date:
-            print(" Start date and end date are required.")
-            return []
-
-        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0).astimezone(kyiv_tz) - timedelta(hours=3)
-        end_date = end_date.replace(hour=23, minute=59, second=59, microsecond=999999).astimezone(kyiv_tz) - timedelta(hours=3)
-
-        print(f"Fetching messages from chat: {chat_id}")
-        print(f"Date range: {start_date.strftime('%Y-%m-%d %H:%M:%S %Z')} to {end_date.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+        cursors = {}
+        if from_cursor:
+            cursors = await asyncio.to_thread(db_handler.get_telegram_cursors)
+            if cursors is None:
+                print("Could not read the Telegram cursors, no messages fetched.")
+                return {channel: None for channel in channels}
 
-        messages_data = []
-        message_count = 0
+        counts = await asyncio.gather(*(
+            self._sync_channel(channel, cursors.get(channel), db_handler, start_date, end_date, flush_size)
+            for channel in channels
+        ))
+        return dict(zip(channels, counts))
 
-
-        async for message in self.client.iter_messages(
-                chat_id,
-                limit=None,  # manual limit applied later
-                reverse=False, # fetch newest first, going back in time
-                offset_date=end_date # from messages at or before the end_date
-        ):
-
-            if message.date < start_date:
-                print("Reached start date boundary.")
+    async def _sync_channel(self, channel, last_message_id, db_handler, start_date, end_date, flush_size):
+        kyiv_tz = pytz.timezone('Europe/Kyiv')
+        window_start = kyiv_tz.localize(datetime(start_date.year, start_date.month, start_date.day))
+        window_end = None
+        if end_date is not None:
+            window_end = kyiv_tz.localize(datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1))
+
+        if last_message_id:
+            print(f"Fetching messages of {channel} newer than message {last_message_id}")
+            iter_kwargs = {'min_id': last_message_id}
+        else:
+            print(f"Fetching messages of {channel} from {window_start.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+            iter_kwargs = {'offset_date': window_start}
+
+        buffer = []
+        last_seen = None
+        buffered = 0
+
+        async def flush():
+            inserted = await asyncio.to_thread(db_handler.insert_telegram_messages, pd.DataFrame(buffer))
+            if inserted is None:
+                print(f"Stopped fetching {channel}: the messages could not be buffered.")
+                return None
+            if last_seen is not None:
+                await asyncio.to_thread(db_handler.upsert_telegram_cursor, channel, last_seen.id,
+                                        last_seen.date.astimezone(kyiv_tz).replace(tzinfo=None))
+            buffer.clear()
+            return inserted
+
+        # oldest first, so the cursor only ever covers messages that are buffered
+        async for message in self.client.iter_messages(channel, reverse=True, **iter_kwargs):
+            if window_end is not None and message.date >= window_end:
                 break
 
-            # check is necessary even with offset_date because iter_messages goes backwards
-            if start_date <= message.date <= end_date:
-                if message.text is None:
-                    continue
+            last_seen = message
+            if message.text:
+                buffer.append({
+                    'channel': channel,
+                    'message_id': message.id,
+                    'date': message.date.astimezone(kyiv_tz).replace(tzinfo=None),
+                    'message': message.text,
+                })
 
-                kyiv_date = message.date.astimezone(kyiv_tz)
+            if len(buffer) >= flush_size:
+                inserted = await flush()
+                if inserted is None:
+                    return None
+                buffered += inserted
 
-                messages_data.append({
-                    'date': kyiv_date.isoformat(),
-                    'message': '' if message.text is None else message.text
-                })
-                message_count += 1
-
-                if limit is not None and message_count >= limit:
-                    print(f"Reached specified limit of {limit} messages within date range.")
-                    break
-
-        messages_data.sort(key=lambda m: m['date'])
-        print(f"Finished fetching. Found {len(messages_data)} messages within the date range.")
-        return messages_data
-
-    async def save_messages_to_csv(self, messages, filename="messages.csv"):
-      """
-      Converts fetched messages to a pandas DataFrame and saves it to a CSV file.
-      """
-      if not messages:
-        print("No messages provided to save to CSV.")
-        return
-
-      os.makedirs(self.output_dir, exist_ok=True)
-      filepath = os.path.join(self.output_dir, filename)
-      df = pd.DataFrame(messages)
-      df.to_csv(filepath, index=False)
-      print(f"Successfully converted {len(messages)} messages to DataFrame and saved to {filepath}")
\ No newline at end of file
+        inserted = await flush()
+        if inserted is None:
+            return None
+        buffered += inserted
+
+        print(f"Buffered {buffered} new messages of {channel}.")
+        return buffered
@@ -1,101 +1,338 @@
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
 import pandas as pd
+import threading
 import time
+from src.data_receiver.http_utils import TokenBucket, backoff_delay, create_session
+
+# request rate and concurrency allowed by the Visual Crossing plan
+VISUAL_CROSSING_REQUESTS_PER_SECOND = 2
+VISUAL_CROSSING_MAX_WORKERS = 4
+
+# size limits of one planned request (locations x contiguous days)
+MAX_LOCATIONS_PER_REQUEST = 10
+MAX_DAYS_PER_REQUEST = 31
+
+# statuses worth retrying with the same key, and statuses that mean the key itself is unusable
+RETRY_STATUSES = {500, 502, 503, 504}
+KEY_FAILURE_STATUSES = {401, 402, 403}
+
+
+def plan_requests(missing_days, max_locations=MAX_LOCATIONS_PER_REQUEST, max_days=MAX_DAYS_PER_REQUEST):
+    """
+    Groups the days each location still needs into as few API requests as possible: locations
+    needing exactly the same days share multi-location requests, and their days are split into
+    contiguous ranges.
+
+    Args:
+        missing_days (dict): Maps location names to the sorted dates (datetime.date) to fetch.
+        max_locations (int, optional): Locations per request.
+        max_days (int, optional): Days per request.
+
+    Returns:
+        list: (location_names, start_date, end_date) tuples, end_date inclusive.
+    """
+    locations_by_days = {}
+    for location_name, days in missing_days.items():
+        if days:
+            locations_by_days.setdefault(tuple(days), []).append(location_name)
+
+    plan = []
+    for days, location_names in locations_by_days.items():
+        ranges = []
+        range_start = previous = days[0]
+        for day in days[1:]:
+            if day - previous > timedelta(days=1) or (day - range_start).days >= max_days:
+                ranges.append((range_start, previous))
+                range_start = day
+            previous = day
+        ranges.append((range_start, previous))
+
+        for offset in range(0, len(location_names), max_locations):
+            for range_start, range_end in ranges:
+                plan.append((location_names[offset:offset + max_locations], range_start, range_end))
+
+    return plan
+
+
+class WeatherResponseCache:
+    """
+    On-disk cache of the API's per-day responses, one JSON file per location, date and API key.
+    Only past days are stored, since forecasts for today and later still change.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _path(self, coordinates, date_str, api_key):
+        key_hash = hashlib.sha1(api_key.encode('utf-8')).hexdigest()[:12]
+        name = hashlib.sha1(f"{coordinates}|{date_str}|{key_hash}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name[:2], f"{name}.json")
+
+    def get(self, coordinates, date_str, api_keys):
+        for api_key in api_keys:
+            path = self._path(coordinates, date_str, api_key)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    return json.load(f)
+        return None
+
+    def put(self, coordinates, day, api_key):
+        date_str = day.get('datetime')
+        if not date_str or date_str >= datetime.now().strftime('%Y-%m-%d'):
+            return
+        path = self._path(coordinates, date_str, api_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(day, f)
+        os.replace(path + '.tmp', path)
 
 
 class WeatherDataCollector:
     def __init__(self, api_key,
-                 base_url="https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/"):
+                 base_url="https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/",
+                 backup_api_key=None, max_workers=VISUAL_CROSSING_MAX_WORKERS,
+                 requests_per_second=VISUAL_CROSSING_REQUESTS_PER_SECOND, max_retries=4, backoff_factor=1.0,
+                 multi_url="https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timelinemulti",
+                 cache_dir=None):
         """
         Initializes the API client.
 
         Args:
-            api_token (str): The API token for authentication.
+            api_key (str): The API key for authentication.
+            base_url (str, optional): Timeline API endpoint.
+            backup_api_key (str, optional): Key switched to when api_key is rejected or out of quota.
+            max_workers (int, optional): Requests fetched concurrently. 1 fetches them one by one.
+            requests_per_second (float, optional): Rate limit shared by all workers.
+            max_retries (int, optional): Retries of a failed request, with exponential backoff.
+            backoff_factor (float, optional): First backoff delay in seconds, doubled on every retry.
+            multi_url (str, optional): Multi-location timeline API endpoint.
+            cache_dir (str, optional): Directory of the on-disk response cache. Defaults to no cache.
         """
-        self.api_key = api_key
+        self.api_keys = [key for key in (api_key, backup_api_key) if key]
         self.base_url = base_url
+        self.multi_url = multi_url
+        self.cache = WeatherResponseCache(cache_dir) if cache_dir else None
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.session = create_session(max_workers)
+        self._key_index = 0
+        self._key_lock = threading.Lock()
 
-    def collect_and_prepare_data(self, start_date, end_date, locations_dict):
+    def _fail_over(self, failed_index, reason):
         """
-        Collects HOURLY!! weather data, enriching it with specified daily metrics,
-        and prepares it directly into a list of tuples for DB insertion.
+        Switches to the next API key, unless another worker already did. Returns False when
+        there is no key left to try.
+        """
+        with self._key_lock:
+            if self._key_index != failed_index:
+                return True
+            if self._key_index + 1 >= len(self.api_keys):
+                return False
+            self._key_index += 1
+            print(f"Weather API key rejected ({reason}), switching to the backup key.")
+            return True
 
-        Args:
-            start_date (datetime): The starting date for collection.
-            end_date (datetime): The ending date for collection.
-            locations_dict (dict): Dictionary mapping location names to their coordinates.
+    def _get_json(self, url, params):
+        """
+        Requests url with the active API key, rate-limited, retrying with backoff and failing
+        over to the backup key.
 
         Returns:
-             pd.DataFrame: A DataFrame.
+            tuple: (decoded response, API key used).
         """
-        dataset = []
+        attempt = 0
+        while True:
+            key_index = self._key_index
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, params={**params, 'key': self.api_keys[key_index]}, timeout=60)
+            except requests.exceptions.RequestException as e:
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff_factor))
+                attempt += 1
+                continue
 
-        start_str = start_date.strftime('%Y-%m-%d')
-        end_str = end_date.strftime('%Y-%m-%d')
+            if response.status_code in KEY_FAILURE_STATUSES or (
+                    response.status_code == 429 and 'exceeded' in response.text.lower()):
+                if not self._fail_over(key_index, f"HTTP {response.status_code}"):
+                    raise requests.exceptions.HTTPError(
+                        f"HTTP {response.status_code}: {response.text[:200]}", response=response)
+                continue
 
-        daily_keys_to_include = {
-            'tempmax', 'tempmin', 'feelslikemax', 'feelslikemin',
-            'precipcover', 'sunrise', 'sunriseEpoch', 'sunset',
-            'sunsetEpoch', 'moonphase',
-            'conditions', 'description',
-        }
+            if response.status_code == 429 or response.status_code in RETRY_STATUSES:
+                if attempt >= self.max_retries:
+                    raise requests.exceptions.HTTPError(
+                        f"HTTP {response.status_code} after {attempt} retries", response=response)
+                time.sleep(backoff_delay(attempt, self.backoff_factor, response.headers.get('Retry-After')))
+                attempt += 1
+                continue
 
-        for location_name, coordinates in locations_dict.items():
-            print(f"\nProcessing location: {location_name} ({coordinates})")
+            if response.status_code != 200:
+                # the message, not raise_for_status(), so the key in the URL is not printed
+                raise requests.exceptions.HTTPError(
+                    f"HTTP {response.status_code}: {response.text[:200]}", response=response)
 
-            query_location = coordinates
-            url = f"{self.base_url}{query_location}/{start_str}/{end_str}?unitGroup=metric&include=days,hours&key={self.api_key}&contentType=json"
+            return response.json(), self.api_keys[key_index]
 
-            try:
-                print(f"Fetching data for {location_name} (from {start_str} to {end_str}...")
-                response = requests.get(url)
-                response.raise_for_status()  
+    def _fetch_days(self, location_names, locations_dict, start_str, end_str):
+        """
+        Fetches the daily (with hourly) data of one planned request: a single location through
+        the timeline API, several through the multi-location one.
+
+        Returns:
+            dict: Maps location names to their list of days.
+        """
+        params = {'unitGroup': 'metric', 'include': 'days,hours', 'contentType': 'json'}
+        label = ', '.join(location_names)
+        print(f"Fetching data for {label} (from {start_str} to {end_str}...")
+
+        try:
+            if len(location_names) == 1:
+                coordinates = locations_dict[location_names[0]]
+                weather_data, api_key = self._get_json(f"{self.base_url}{coordinates}/{start_str}/{end_str}", params)
+                location_results = [weather_data]
+            else:
+                weather_data, api_key = self._get_json(self.multi_url, {
+                    **params,
+                    'locations': '|'.join(locations_dict[name] for name in location_names),
+                    'datestart': start_str,
+                    'dateend': end_str,
+                })
+                # locations come back in request order
+                location_results = weather_data.get('locations', [])
+
+            fetched = {}
+            for location_name, location_data in zip(location_names, location_results):
+                if 'days' not in location_data:
+                    print(f"Warning: No 'days' array found for {location_name}")
+                    continue
+                fetched[location_name] = location_data['days']
+                if self.cache is not None:
+                    for day in location_data['days']:
+                        self.cache.put(locations_dict[location_name], day, api_key)
+
+            print(f"Successfully fetched data for {label}")
+            return fetched
+
+        except requests.exceptions.RequestException as e:
+            print(f"HTTP Error collecting data for {label}: {e}")
+        except Exception as e:
+            print(f"Unexpected error processing data for {label}: {e}")
+        return {}
 
-                weather_data = response.json()
+    @staticmethod
+    def _flatten_days(location_name, days, daily_keys_to_include):
+        """
+        Flattens the days of one location into hourly records enriched with the daily metrics.
+        """
+        location_dataset = []
+
+        for day in days:
+            day_date_str = day.get('datetime')
+
+            daily_metrics_for_hours = {}
+            for key in daily_keys_to_include:
+                if key in day:
+                    daily_metrics_for_hours[key] = day[key]
+
+            if 'hours' in day:
+                for hour in day['hours']:
+                    hour_time_str = hour.get('datetime')
 
-                if 'days' in weather_data:
-                    for day in weather_data['days']:
-                        day_date_str = day.get('datetime')  
+                    hourly_data = {
+                        'location': location_name,
+                        'date': day_date_str,
+                        'time': hour_time_str,
+                    }
 
-                        daily_metrics_for_hours = {}
-                        for key in daily_keys_to_include:
-                            if key in day:
-                                daily_metrics_for_hours[key] = day[key]
+                    for key, value in hour.items():
+                        hourly_data[key] = value
+                    for daily_key, daily_value in daily_metrics_for_hours.items():
+                        hourly_data[daily_key] = daily_value
 
-                        if 'hours' in day:
-                            for hour in day['hours']:
-                                hour_time_str = hour.get('datetime') 
+                    location_dataset.append(hourly_data)
 
-                                hourly_data = {
-                                    'location': location_name,
-                                    'date': day_date_str,
-                                    'time': hour_time_str,
-                                }
 
-                                for key, value in hour.items():
-                                    hourly_data[key] = value
-                                for daily_key, daily_value in daily_metrics_for_hours.items():
-                                    hourly_data[daily_key] = daily_value
+            else:
+                print(f"Warning: No 'hours' array found for {location_name} on {day_date_str}")
+
+        return location_dataset
+
+    def collect_and_prepare_data(self, start_date, end_date, locations_dict, skip_days=None):
+        """
+        Collects HOURLY!! weather data, enriching it with specified daily metrics,
+        and prepares it directly into a list of tuples for DB insertion.
+        Days already stored (skip_days) or in the on-disk cache are not requested again; the rest
+        is grouped by plan_requests into multi-location, multi-day requests, fetched concurrently
+        by max_workers threads sharing one keep-alive session and the rate limit.
 
-                                dataset.append(hourly_data)
+        Args:
+            start_date (datetime): The starting date for collection.
+            end_date (datetime): The ending date for collection.
+            locations_dict (dict): Dictionary mapping location names to their coordinates.
+            skip_days (set, optional): (location name, 'YYYY-MM-DD') pairs not to collect,
+                                       e.g. from DatabaseHandler.get_weather_stored_days.
 
+        Returns:
+             pd.DataFrame: A DataFrame.
+        """
+        skip_days = skip_days or set()
+        daily_keys_to_include = {
+            'tempmax', 'tempmin', 'feelslikemax', 'feelslikemin',
+            'precipcover', 'sunrise', 'sunriseEpoch', 'sunset',
+            'sunsetEpoch', 'moonphase',
+            'conditions', 'description',
+        }
 
-                        else:
-                            print(f"Warning: No 'hours' array found for {location_name} on {day_date_str}")
+        dates = [day.date() for day in pd.date_range(start_date.date(), end_date.date(), freq='D')]
+        days_by_location = {location_name: [] for location_name in locations_dict}
+        missing_days = {}
+        skipped = cached = 0
 
+        for location_name, coordinates in locations_dict.items():
+            missing_days[location_name] = []
+            for day in dates:
+                date_str = day.strftime('%Y-%m-%d')
+                if (location_name, date_str) in skip_days:
+                    skipped += 1
+                    continue
+                cached_day = self.cache.get(coordinates, date_str, self.api_keys) if self.cache is not None else None
+                if cached_day is not None:
+                    days_by_location[location_name].append(cached_day)
+                    cached += 1
                 else:
-                    print(f"Warning: No 'days' array found for {location_name}")
+                    missing_days[location_name].append(day)
 
-                print(f"Successfully processed hourly data for {location_name}")
+        plan = plan_requests(missing_days)
+        print(f"Weather collection: {skipped} location-days already stored, {cached} from the cache, "
+              f"{sum(len(days) for days in missing_days.values())} to fetch in {len(plan)} requests.")
 
-            except requests.exceptions.RequestException as e:
-                print(f"HTTP Error collecting data for {location_name}: {e}")
-            except Exception as e:
-                print(f"Unexpected error processing data for {location_name}: {e}")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._fetch_days, location_names, locations_dict,
+                                range_start.strftime('%Y-%m-%d'), range_end.strftime('%Y-%m-%d'))
+                for location_names, range_start, range_end in plan
+            ]
+            for future in futures:
+                for location_name, days in future.result().items():
+                    days_by_location[location_name].extend(days)
 
-            time.sleep(1.5)  
+        # records in locations_dict order and date order, as with sequential fetching
+        dataset = []
+        for location_name, days in days_by_location.items():
+            days = sorted(days, key=lambda day: day.get('datetime') or '')
+            dataset.extend(self._flatten_days(location_name, days, daily_keys_to_include))
 
-        print(f"\nCollection finished. Prepared {len(dataset)} unique hourly records for database insertion.")
+        print(f"\nCollection finished in {time.perf_counter() - started:.1f}s. "
+              f"Prepared {len(dataset)} unique hourly records for database insertion.")
         dataset = pd.DataFrame(dataset)
         return dataset
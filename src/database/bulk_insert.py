@@ -0,0 +1,154 @@
+"""
+Bulk ingestion helpers shared by DatabaseHandler.
+
+Records are built column by column (one conversion per column instead of a pandas Series per row)
+and written either as multi-row INSERT ... VALUES statements of a fixed batch size, or, for large
+backfills, through a temporary file and LOAD DATA LOCAL INFILE.
+"""
+
+import datetime
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_BATCH_SIZE = 1000
+
+_JSON_ENCODER = json.JSONEncoder(default=str)  # same output as json.dumps(..., default=str)
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def column_values(series):
+    """
+    Converts a DataFrame column to a list of Python objects, with None for missing values.
+
+    Args:
+        series (pd.Series)
+
+    Returns:
+        list
+    """
+
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def json_column(df, exclude=()):
+    """
+    Serializes every row of df, without the exclude columns, to a JSON string.
+
+    Args:
+        df (pd.DataFrame)
+        exclude (iterable, optional): Column names left out of the JSON.
+
+    Returns:
+        list: One JSON string per row, as json.dumps(row.to_dict(), default=str) would produce.
+    """
+
+    exclude = set(exclude)
+    keys = [column for column in df.columns if column not in exclude]
+    if not keys:
+        return ['{}'] * len(df)
+
+    columns = [column_values(df[key]) for key in keys]
+    return [_JSON_ENCODER.encode(dict(zip(keys, values))) for values in zip(*columns)]
+
+
+def build_records(columns):
+    """
+    Zips equally long column lists into parameter tuples.
+    """
+
+    return list(zip(*columns))
+
+
+def _tsv_value(value):
+    """
+    Formats a value for a LOAD DATA file with the default escaping (backslash, \\N for NULL).
+    """
+
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, float):
+        return repr(value)
+    return str(value).translate(_TSV_ESCAPES)
+
+
+def _load_data_infile(cursor, table, columns, records, mode):
+    """
+    Writes records to a temporary tab-separated file and loads it with LOAD DATA LOCAL INFILE.
+    The connection must be opened with allow_local_infile=True.
+
+    Returns:
+        int: Rows affected.
+    """
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv', delete=False) as f:
+        path = f.name
+        for record in records:
+            f.write('\t'.join(_tsv_value(value) for value in record))
+            f.write('\n')
+
+    try:
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s {mode} INTO TABLE {table}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+            LINES TERMINATED BY '\\n'
+            ({', '.join(columns)})
+        """, (path,))
+        return cursor.rowcount
+    finally:
+        os.remove(path)
+
+
+def bulk_insert(connection, table, columns, records, ignore=False, update_columns=None,
+                batch_size=DEFAULT_BATCH_SIZE, use_load_data=False):
+    """
+    Inserts records in multi-row INSERT batches (or with LOAD DATA LOCAL INFILE) and commits.
+
+    Args:
+        connection: An open mysql.connector connection.
+        table (str): Target table.
+        columns (list): Target column names, in record order.
+        records (list): Parameter tuples.
+        ignore (bool, optional): Use INSERT IGNORE (LOAD DATA ... IGNORE). Defaults to False.
+        update_columns (list, optional): Columns overwritten on a duplicate key with
+                                         ON DUPLICATE KEY UPDATE (LOAD DATA ... REPLACE, which
+                                         replaces the whole row). Defaults to None.
+        batch_size (int, optional): Rows per INSERT statement. Defaults to DEFAULT_BATCH_SIZE.
+        use_load_data (bool, optional): Load through a temporary file instead, for large backfills.
+
+    Returns:
+        int: Rows affected, as reported by MySQL.
+    """
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    affected = 0
+
+    if use_load_data:
+        mode = 'REPLACE' if update_columns else ('IGNORE' if ignore else '')
+        affected = _load_data_infile(cursor, table, columns, records, mode)
+    else:
+        row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        insert_clause = f"INSERT {'IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) VALUES "
+        update_clause = ''
+        if update_columns:
+            update_clause = ' ON DUPLICATE KEY UPDATE ' + ', '.join(f"{c} = VALUES({c})" for c in update_columns)
+
+        for offset in range(0, len(records), batch_size):
+            batch = records[offset:offset + batch_size]
+            sql = insert_clause + ', '.join([row_placeholder] * len(batch)) + update_clause
+            cursor.execute(sql, [value for record in batch for value in record])
+            affected += cursor.rowcount
+
+    connection.commit()
+    cursor.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Bulk insert into {table}: {len(records)} rows in {elapsed:.2f}s "
+          f"({len(records) / elapsed if elapsed > 0 else 0:.0f} rows/sec).")
+    return affected
@@ -1,17 +1,36 @@
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from mysql.connector import pooling
+from contextlib import contextmanager
+import threading
+import time
+from datetime import timedelta
+import numpy as np
 import pandas as pd
-import datetime
 import json
+from src.database.bulk_insert import DEFAULT_BATCH_SIZE, bulk_insert, build_records, column_values, json_column
+from src.database.merged_schema import (
+    KEY_COLUMNS,
+    MERGED_SCHEMA_VERSION,
+    TARGET_COLUMN,
+    merged_column_names,
+    merged_columns,
+)
 
 
 class DatabaseHandler:
     """
     A class to handle database operations, particularly for data related to regions,
     weather, reports, alarms, predictions, and models.
+
+    By default every method shares a single connection. With pool_size set, each call borrows
+    its own connection from a pool instead, so the handler can be shared by concurrent threads
+    (e.g. the request threads of the Flask app).
     """
 
-    def __init__(self, host, database, user, password, port=3306):
+    def __init__(self, host, database, user, password, port=3306, batch_size=DEFAULT_BATCH_SIZE,
+                 allow_local_infile=False, pool_size=None, pool_timeout=10):
         """
         Initialize database connection parameters.
 
@@ -21,26 +40,55 @@ class DatabaseHandler:
             user (str): The database username
             password (str): The database password
             port (int, optional): The database port. Defaults to 3306.
+            batch_size (int, optional): Rows per multi-row INSERT statement of the bulk inserts.
+            allow_local_infile (bool, optional): Allow LOAD DATA LOCAL INFILE, needed by the
+                                                 use_load_data option of the bulk inserts. Defaults to False.
+            pool_size (int, optional): Enables the pooled mode with this many connections
+                                       (at most 32). Defaults to None (single shared connection).
+            pool_timeout (float, optional): Seconds to wait for a free pooled connection. Defaults to 10.
         """
         self.host = host
         self.database = database
         self.user = user
         self.password = password
         self.port = port
+        self.batch_size = batch_size
+        self.allow_local_infile = allow_local_infile
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
         self.connection = None
+        self.pool = None
+        self._local = threading.local()
+        self._merged_schema_ready = False
 
     def connect(self):
         """
-        Establish a connection to the database.
+        Establish a connection to the database, or create the connection pool in pooled mode.
         """
 
         try:
+            if self.pool_size:
+                if self.pool is None:
+                    self.pool = pooling.MySQLConnectionPool(
+                        pool_name=f"db_handler_{id(self)}",
+                        pool_size=self.pool_size,
+                        pool_reset_session=True,
+                        host=self.host,
+                        database=self.database,
+                        user=self.user,
+                        password=self.password,
+                        port=self.port,
+                        allow_local_infile=self.allow_local_infile
+                    )
+                return
+
             self.connection = mysql.connector.connect(
                 host=self.host,
                 database=self.database,
                 user=self.user,
                 password=self.password,
-                port=self.port
+                port=self.port,
+                allow_local_infile=self.allow_local_infile
             )
 
         except Error as e:
@@ -48,28 +96,131 @@ class DatabaseHandler:
 
     def disconnect(self):
         """
-        Close the database connection.
+        Close the database connection. In pooled mode the pool is dropped, its connections
+        are closed as they are returned.
         """
 
         if self.connection and self.connection.is_connected():
             self.connection.close()
+        self.pool = None
 
-    def debug(self, test):
-        try:
+    def _borrow_connection(self):
+        """
+        Borrows a connection from the pool, waiting up to pool_timeout seconds for a free one,
+        and checks it is alive (reconnecting it if needed) before handing it out.
+        """
+        deadline = time.monotonic() + self.pool_timeout
+
+        while True:
+            try:
+                connection = self.pool.get_connection()
+            except PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+                continue
+
+            try:
+                connection.ping(reconnect=True, attempts=2, delay=0)
+                return connection
+            except Error:
+                connection.close()
+                if time.monotonic() >= deadline:
+                    raise
+
+    @contextmanager
+    def checkout(self):
+        """
+        Yields a live connection for the calling thread: in pooled mode a connection borrowed from
+        the pool for the duration of the block, otherwise the shared connection. Nested checkouts
+        within one thread reuse the connection of the outermost one.
+        """
+        current = getattr(self._local, 'connection', None)
+        if current is not None:
+            yield current
+            return
+
+        if not self.pool_size:
             if not self.connection or not self.connection.is_connected():
                 self.connect()
+            yield self.connection
+            return
+
+        if self.pool is None:
+            self.connect()
+
+        connection = self._borrow_connection()
+        self._local.connection = connection
+        try:
+            yield connection
+        finally:
+            self._local.connection = None
+            connection.close()  # returns it to the pool
+
+    @contextmanager
+    def dedicated_connection(self):
+        """
+        Yields a connection used by nothing else for the duration of the block: in pooled mode one
+        borrowed from the pool, otherwise a new connection. Unlike checkout(), it is not the
+        thread's connection, so it can stay open across yields of a generator while the thread
+        runs other queries.
+        """
+        if self.pool_size:
+            if self.pool is None:
+                self.connect()
+            connection = self._borrow_connection()
+        else:
+            connection = mysql.connector.connect(
+                host=self.host,
+                database=self.database,
+                user=self.user,
+                password=self.password,
+                port=self.port,
+                allow_local_infile=self.allow_local_infile
+            )
+        try:
+            yield connection
+        finally:
+            connection.close()  # returns a pooled connection to the pool
+
+    @contextmanager
+    def session(self, dictionary=False):
+        """
+        Yields a cursor on a checked-out connection; commits when the block succeeds and rolls
+        back when it raises.
+
+        Usage:
+            with db.session() as cur:
+                cur.execute("SELECT ...")
+
+        Args:
+            dictionary (bool, optional): Return rows as dictionaries. Defaults to False.
+        """
+        with self.checkout() as connection:
+            cursor = connection.cursor(dictionary=dictionary)
+            try:
+                yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def debug(self, test):
+        try:
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                cursor.execute(test)
     
-            cursor = self.connection.cursor()
-            cursor.execute(test)
-    
-            # Commit if it's not a SELECT (i.e., it's a write operation)
-            if not test.strip().lower().startswith("select"):
-                self.connection.commit()
-            else:
-                for row in cursor.fetchall():
-                    print(row)
+                # Commit if it's not a SELECT (i.e., it's a write operation)
+                if not test.strip().lower().startswith("select"):
+                    connection.commit()
+                else:
+                    for row in cursor.fetchall():
+                        print(row)
     
-            cursor.close()
+                cursor.close()
     
         except Error as e:
             print(f"Error: {e}")
@@ -81,121 +232,256 @@ class DatabaseHandler:
         """
 
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            with self.checkout() as connection:
+                cursor = connection.cursor()
 
-            cursor = self.connection.cursor()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS regions (
+                        region_id INT AUTO_INCREMENT PRIMARY KEY,
+                        region_name VARCHAR(100) UNIQUE NOT NULL,
+                        latitude FLOAT,
+                        longitude FLOAT
+                    )
+                """)
 
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS regions (
-                    region_id INT AUTO_INCREMENT PRIMARY KEY,
-                    region_name VARCHAR(100) UNIQUE NOT NULL,
-                    latitude FLOAT,
-                    longitude FLOAT
-                )
-            """)
-
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS weather (
-                    weather_id INT AUTO_INCREMENT PRIMARY KEY,
-                    region_id INT NOT NULL,
-                    date DATE NOT NULL,
-                    time TIME NULL,         
-                    data JSON NOT NULL,      
-                    FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE,
-                    UNIQUE KEY unique_weather_observation (region_id, date, time)
-                ) 
-            """)
-
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS isw_reports (
-                    isw_report_id INT AUTO_INCREMENT PRIMARY KEY,
-                    date DATE UNIQUE NOT NULL,
-                    content TEXT,
-                    url VARCHAR(255)
-                )
-            """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS weather (
+                        weather_id INT AUTO_INCREMENT PRIMARY KEY,
+                        region_id INT NOT NULL,
+                        date DATE NOT NULL,
+                        time TIME NULL,         
+                        data JSON NOT NULL,      
+                        FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE,
+                        UNIQUE KEY unique_weather_observation (region_id, date, time)
+                    ) 
+                """)
 
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS telegram_reports (
-                    tg_report_id INT AUTO_INCREMENT PRIMARY KEY,
-                    date DATE UNIQUE NOT NULL, 
-                    content TEXT
-                )
-            """) 
-
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS alarms (
-                    alarm_id INT AUTO_INCREMENT PRIMARY KEY,
-                    region_id INT NOT NULL,
-                    start DATETIME NOT NULL,
-                    end DATETIME NOT NULL,
-                    data JSON NULL,
-                    FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE,
-                    UNIQUE KEY unique_alarm_observation (region_id, start)
-                )
-            """)
-
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS merged_data (
-                    report_id INT AUTO_INCREMENT PRIMARY KEY,
-                    region_id INT NOT NULL,
-                    date DATE NOT NULL,
-                    time TIME NULL,  
-                    data JSON NULL,
-                    FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE,
-                    UNIQUE KEY unique_daily_set (region_id, date, time)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS isw_reports (
+                        isw_report_id INT AUTO_INCREMENT PRIMARY KEY,
+                        date DATE UNIQUE NOT NULL,
+                        content TEXT,
+                        url VARCHAR(255)
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS isw_fetch_log (
+                        date DATE PRIMARY KEY,
+                        url VARCHAR(255),
+                        status VARCHAR(10) NOT NULL,
+                        http_status SMALLINT NULL,
+                        etag VARCHAR(255) NULL,
+                        last_modified VARCHAR(64) NULL,
+                        attempts INT NOT NULL DEFAULT 1,
+                        fetched_at DATETIME NOT NULL
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS telegram_reports (
+                        tg_report_id INT AUTO_INCREMENT PRIMARY KEY,
+                        date DATE UNIQUE NOT NULL, 
+                        content TEXT
+                    )
+                """) 
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS telegram_messages (
+                        channel VARCHAR(64) NOT NULL,
+                        message_id BIGINT NOT NULL,
+                        date DATETIME NOT NULL,
+                        message TEXT NOT NULL,
+                        PRIMARY KEY (channel, message_id),
+                        KEY idx_telegram_messages_date (date)
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS telegram_cursors (
+                        channel VARCHAR(64) PRIMARY KEY,
+                        last_message_id BIGINT NOT NULL,
+                        last_message_date DATETIME NOT NULL,
+                        updated_at DATETIME NOT NULL
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS alarms (
+                        alarm_id INT AUTO_INCREMENT PRIMARY KEY,
+                        region_id INT NOT NULL,
+                        start DATETIME NOT NULL,
+                        end DATETIME NOT NULL,
+                        data JSON NULL,
+                        FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE,
+                        UNIQUE KEY unique_alarm_observation (region_id, start)
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS alarm_daily_aggregates (
+                        region_id INT NOT NULL,
+                        date DATE NOT NULL,
+                        minutes DOUBLE NOT NULL,
+                        starts SMALLINT NOT NULL,
+                        active_at_start TINYINT(1) NOT NULL,
+                        active_at_end TINYINT(1) NOT NULL,
+                        last_end DATETIME NULL,
+                        PRIMARY KEY (region_id, date),
+                        FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS merged_data (
+                        report_id INT AUTO_INCREMENT PRIMARY KEY,
+                        region_id INT NOT NULL,
+                        date DATE NOT NULL,
+                        time TIME NULL,  
+                        {typed_columns},
+                        schema_version SMALLINT NULL,
+                        data JSON NULL,
+                        FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE,
+                        UNIQUE KEY unique_daily_set (region_id, date, time)
                     
-                )
-            """)
-
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS predictions (
-                    prediction_id INT AUTO_INCREMENT PRIMARY KEY,
-                    region_id INT NOT NULL,
-                    date DATE NOT NULL,
-                    time TIME NULL,
-                    prediction_value TINYINT(1),
-                    raw_probabilities DECIMAL(9, 8),
-                    FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE,
-                    UNIQUE KEY unique_prediction_set (region_id, date, time)
-                )
-            """)
-
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS model_versions  (
-                    model_id INT AUTO_INCREMENT PRIMARY KEY,
-                    model_name VARCHAR(100),
-                    model_version VARCHAR(20) UNIQUE,
-                    last_trained_on DATETIME,
-                    model_blob LONGBLOB,
-                    scaler_blob LONGBLOB
-                )
-            """)
-
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS daily_metrics (
-                    metric_id INT AUTO_INCREMENT PRIMARY KEY,
-                    date DATE UNIQUE NOT NULL,
-                    model_version VARCHAR(20),
-                    accuracy DECIMAL(6,4),
-                    precision_val DECIMAL(6,4),
-                    recall DECIMAL(6,4),
-                    f1_score DECIMAL(6,4),
-                    roc_auc DECIMAL(6,4),
-                    conf_matrix JSON,
-                    FOREIGN KEY (model_version) REFERENCES model_versions(model_version) ON DELETE CASCADE,
-                    UNIQUE KEY unique_metrics_set (model_version, date)
-                )
-            """)
+                    )
+                """.format(typed_columns=",\n".join(f"{name} {sql_type} NULL" for name, sql_type in merged_columns())))
 
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS predictions (
+                        prediction_id INT AUTO_INCREMENT PRIMARY KEY,
+                        region_id INT NOT NULL,
+                        date DATE NOT NULL,
+                        time TIME NULL,
+                        prediction_value TINYINT(1),
+                        raw_probabilities DECIMAL(9, 8),
+                        FOREIGN KEY (region_id) REFERENCES regions(region_id) ON DELETE CASCADE,
+                        UNIQUE KEY unique_prediction_set (region_id, date, time)
+                    )
+                """)
 
-            self.connection.commit()
-            cursor.close()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS model_versions  (
+                        model_id INT AUTO_INCREMENT PRIMARY KEY,
+                        model_name VARCHAR(100),
+                        model_version VARCHAR(20) UNIQUE,
+                        last_trained_on DATETIME,
+                        model_blob LONGBLOB,
+                        scaler_blob LONGBLOB
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS daily_metrics (
+                        metric_id INT AUTO_INCREMENT PRIMARY KEY,
+                        date DATE UNIQUE NOT NULL,
+                        model_version VARCHAR(20),
+                        accuracy DECIMAL(6,4),
+                        precision_val DECIMAL(6,4),
+                        recall DECIMAL(6,4),
+                        f1_score DECIMAL(6,4),
+                        roc_auc DECIMAL(6,4),
+                        conf_matrix JSON,
+                        FOREIGN KEY (model_version) REFERENCES model_versions(model_version) ON DELETE CASCADE,
+                        UNIQUE KEY unique_metrics_set (model_version, date)
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS pipeline_runs (
+                        pipeline_run_stage_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                        run_id VARCHAR(32) NOT NULL,
+                        pipeline VARCHAR(64) NOT NULL,
+                        target_date DATE NULL,
+                        stage VARCHAR(128) NOT NULL,
+                        status VARCHAR(16) NOT NULL,
+                        started_at DATETIME NOT NULL,
+                        finished_at DATETIME NULL,
+                        wall_seconds DOUBLE NULL,
+                        cpu_seconds DOUBLE NULL,
+                        peak_rss_mb DOUBLE NULL,
+                        rss_growth_mb DOUBLE NULL,
+                        traced_peak_mb DOUBLE NULL,
+                        row_count BIGINT NULL,
+                        error TEXT NULL,
+                        KEY idx_pipeline_runs_run (run_id),
+                        KEY idx_pipeline_runs_started (started_at, stage)
+                    )
+                """)
+
+
+                connection.commit()
+                cursor.close()
+
+            self.ensure_indexes()
+            # CREATE TABLE IF NOT EXISTS leaves an existing merged_data without the typed columns
+            self.upgrade_merged_data_schema()
 
         except Error as e:
             print(f"Error creating tables: {e}")
             
+    # secondary indexes per table, added by ensure_indexes to new and existing databases. The unique
+    # keys lead with region_id, so filters on the date alone (the latest day, a date range) need
+    # these date-leading indexes; they also answer MAX(date) with a single index lookup.
+    SECONDARY_INDEXES = {
+        'predictions': [
+            ('idx_predictions_date', '(date, region_id, time)'),
+        ],
+        'weather': [
+            ('idx_weather_date', '(date, region_id, time)'),
+        ],
+        'merged_data': [
+            ('idx_merged_data_date', '(date, region_id, time)'),
+        ],
+        'alarms': [
+            # region_id and end included, so queries on start/end alone are answered from the index
+            ('idx_alarms_start', '(start, region_id, end)'),
+            # overlap filters (end > ... AND start < ...) scan the alarms that end after a moment
+            ('idx_alarms_end', '(end, region_id, start)'),
+        ],
+    }
+
+    def ensure_indexes(self):
+        """
+        Creates the SECONDARY_INDEXES that do not exist yet.
+        """
+        try:
+            with self.session() as cursor:
+                cursor.execute("""
+                    SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS
+                    WHERE TABLE_SCHEMA = %s
+                """, (self.database,))
+                existing = {(row[0], row[1]) for row in cursor.fetchall()}
+
+                for table, indexes in self.SECONDARY_INDEXES.items():
+                    for index_name, columns in indexes:
+                        if (table, index_name) not in existing:
+                            cursor.execute(f"CREATE INDEX {index_name} ON {table} {columns}")
+                            print(f"Created index {index_name} on {table}.")
+
+        except Error as e:
+            print(f"Database error creating indexes: {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred creating indexes: {e}")
+
+    @staticmethod
+    def _max_value(connection, table, column):
+        # looked up on its own so that the main query filters on a constant, sargable range
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SELECT MAX({column}) FROM {table}")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def _latest_day_range(self, connection, table, column='date'):
+        # [latest day, next day) of a table; on an empty table both bounds are NULL and match no
+        # rows, like the former "= (SELECT MAX(...))" filters
+        latest_date = self._max_value(connection, table, column)
+        if latest_date is None:
+            return [None, None]
+        return [latest_date, latest_date + timedelta(days=1)]
+
     def initialize_regions_in_database(self):
         """
         Populates the 'regions' table with a predefined list of Ukrainian regions
@@ -231,20 +517,18 @@ class DatabaseHandler:
         ]
 
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            with self.checkout() as connection:
+                cursor = connection.cursor()
 
-            cursor = self.connection.cursor()
+                for region_name, latitude, longitude in regions_data:
+                    cursor.execute("""
+                        INSERT IGNORE INTO regions (region_name, latitude, longitude)
+                        VALUES (%s, %s, %s)
+                    """, (region_name, latitude, longitude))
 
-            for region_name, latitude, longitude in regions_data:
-                cursor.execute("""
-                    INSERT IGNORE INTO regions (region_name, latitude, longitude)
-                    VALUES (%s, %s, %s)
-                """, (region_name, latitude, longitude))
-
-            self.connection.commit()
-            cursor.close()
-            print(f"Successfully initialized {len(regions_data)} regions in the database")
+                connection.commit()
+                cursor.close()
+                print(f"Successfully initialized {len(regions_data)} regions in the database")
 
         except Error as e:
              print(f"Database error during region initialization: {e}")
@@ -259,21 +543,19 @@ class DatabaseHandler:
             dict: Dictionary mapping regions to their coordinates
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            query = """
-                SELECT region_name, latitude, longitude 
-                FROM regions
-            """
+            with self.checkout() as connection:
+                query = """
+                    SELECT region_name, latitude, longitude 
+                    FROM regions
+                """
 
-            locations_df = pd.read_sql(query, self.connection)
-            locations_dict = {}
-            for _, row in locations_df.iterrows():
-                coordinates = f"{row['latitude']},{row['longitude']}"
-                locations_dict[row['region_name']] = coordinates
+                locations_df = pd.read_sql(query, connection)
+                locations_dict = {}
+                for _, row in locations_df.iterrows():
+                    coordinates = f"{row['latitude']},{row['longitude']}"
+                    locations_dict[row['region_name']] = coordinates
 
-            return locations_dict
+                return locations_dict
 
         except Error as e:
              print(f"Database error retrieving locations: {e}")
@@ -291,19 +573,17 @@ class DatabaseHandler:
             dict: Dictionary mapping region_name to region_id, sorted by region_id
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-    
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute("SELECT region_id, region_name FROM regions")
-            regions_db = cursor.fetchall()
-            cursor.close()
+            with self.checkout() as connection:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute("SELECT region_id, region_name FROM regions")
+                regions_db = cursor.fetchall()
+                cursor.close()
     
-            sorted_regions = sorted(regions_db, key=lambda x: x['region_id'])
+                sorted_regions = sorted(regions_db, key=lambda x: x['region_id'])
     
-            region_mapping = {region['region_name']: region['region_id'] for region in sorted_regions}
-            print(f"Region mapping fetched successfully ({len(region_mapping)} regions).")
-            return region_mapping
+                region_mapping = {region['region_name']: region['region_id'] for region in sorted_regions}
+                print(f"Region mapping fetched successfully ({len(region_mapping)} regions).")
+                return region_mapping
     
         except Error as e:
             print(f"Database Error fetching region mapping: {e}")
@@ -323,34 +603,16 @@ class DatabaseHandler:
             df (pandas.DataFrame)
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            with self.checkout() as connection:
+                records = build_records([
+                    column_values(pd.to_datetime(df['date'], format='mixed').dt.date),
+                    column_values(df['report_text']),
+                    column_values(df['url']),
+                ])
 
-            records = []
-
-            for _, row in df.iterrows():
-                date_val = row['date']
-                if isinstance(date_val, str):
-                    date_val = datetime.datetime.strptime(date_val, '%Y-%m-%d').date()
-                elif isinstance(date_val, datetime.datetime):
-                    date_val = date_val.date()
-
-                content = row['report_text']
-                url = row['url']
-                records.append((date_val, content, url))
-
-            cursor = self.connection.cursor()
-            query = """
-                INSERT INTO isw_reports (date, content, url)
-                VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    content = VALUES(content),
-                    url = VALUES(url)
-            """
-            cursor.executemany(query, records)
-            self.connection.commit()
-            print(f"Successfully inserted/handled {cursor.rowcount} isw reports.")
-            cursor.close()
+                rowcount = bulk_insert(connection, 'isw_reports', ['date', 'content', 'url'], records,
+                                       update_columns=['content', 'url'], batch_size=self.batch_size)
+                print(f"Successfully inserted/handled {rowcount} isw reports.")
 
         except Error as e:
             print(f"Database error inserting ISW reports: {e}")
@@ -358,6 +620,67 @@ class DatabaseHandler:
              print(f"An unexpected error occurred inserting ISW reports: {e}")
 
 
+    def upsert_isw_fetch_log(self, df):
+        """
+        Records the outcome of ISW report fetches in the 'isw_fetch_log' checkpoint table,
+        one row per report date, counting the attempts.
+
+        Args:
+            df (pandas.DataFrame): Columns 'date', 'url', 'status' ('fetched', 'missing' or
+                                   'failed'), 'http_status', 'etag', 'last_modified' and 'fetched_at'.
+        """
+        if df.empty:
+            return
+        try:
+            with self.checkout() as connection:
+                columns = ['date', 'url', 'status', 'http_status', 'etag', 'last_modified', 'fetched_at']
+                records = build_records([column_values(df[column]) for column in columns])
+                cursor = connection.cursor()
+                cursor.executemany(f"""
+                    INSERT INTO isw_fetch_log ({', '.join(columns)})
+                    VALUES ({', '.join(['%s'] * len(columns))})
+                    ON DUPLICATE KEY UPDATE
+                        url = VALUES(url), status = VALUES(status), http_status = VALUES(http_status),
+                        etag = COALESCE(VALUES(etag), etag),
+                        last_modified = COALESCE(VALUES(last_modified), last_modified),
+                        attempts = attempts + 1, fetched_at = VALUES(fetched_at)
+                """, records)
+                connection.commit()
+                cursor.close()
+
+        except Error as e:
+            print(f"Database error updating the ISW fetch log: {e}")
+        except Exception as e:
+             print(f"An unexpected error occurred updating the ISW fetch log: {e}")
+
+    def get_isw_fetch_log(self, start_date, end_date):
+        """
+        Retrieves the 'isw_fetch_log' rows of start_date <= date < end_date.
+
+        Args:
+            start_date (datetime): First day of the range.
+            end_date (datetime): Day after the last day of the range.
+
+        Returns:
+            df (pandas.DataFrame)
+        """
+        try:
+            with self.checkout() as connection:
+                sql_query = """
+                    SELECT date, url, status, http_status, etag, last_modified, attempts, fetched_at
+                    FROM isw_fetch_log
+                    WHERE date >= %s AND date < %s
+                """
+                params = [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')]
+                return pd.read_sql(sql_query, connection, params=params, parse_dates=['date', 'fetched_at'])
+
+        except Error as e:
+            print(f"Database error retrieving the ISW fetch log: {e}")
+            return pd.DataFrame()
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving the ISW fetch log: {e}")
+            return pd.DataFrame()
+
     def insert_model(self, model_name, version, last_trained_on, model_blob, scaler_blob):
         """
         Insert model metadata and blobs into the 'model_versions' table.
@@ -371,17 +694,15 @@ class DatabaseHandler:
             scaler_blob (bytes): Binary data of the serialized scaler.
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            cursor = self.connection.cursor()
-            cursor.execute("""
-            INSERT IGNORE INTO model_versions (model_name, model_version, last_trained_on, model_blob, scaler_blob)
-            VALUES (%s, %s, %s, %s, %s)
-            """, (model_name, version, last_trained_on, model_blob, scaler_blob))
-            self.connection.commit()
-            print(f"Successfully inserted/handled model insertion")
-            cursor.close()
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                cursor.execute("""
+                INSERT IGNORE INTO model_versions (model_name, model_version, last_trained_on, model_blob, scaler_blob)
+                VALUES (%s, %s, %s, %s, %s)
+                """, (model_name, version, last_trained_on, model_blob, scaler_blob))
+                connection.commit()
+                print(f"Successfully inserted/handled model insertion")
+                cursor.close()
 
         except Error as e:
             print(f"Database error inserting model version {version}: {e}")
@@ -400,24 +721,22 @@ class DatabaseHandler:
         """
         
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-    
-            sql_query = """
-                SELECT model_blob, scaler_blob 
-                FROM model_versions 
-                WHERE model_version = %s
-            """
+            with self.checkout() as connection:
+                sql_query = """
+                    SELECT model_blob, scaler_blob 
+                    FROM model_versions 
+                    WHERE model_version = %s
+                """
     
-            cursor = self.connection.cursor()
-            cursor.execute(sql_query, (model_version,))
-            result = cursor.fetchone()
-            cursor.close()
+                cursor = connection.cursor()
+                cursor.execute(sql_query, (model_version,))
+                result = cursor.fetchone()
+                cursor.close()
     
-            if result:
-                return result[0], result[1]  # model_blob, scaler_blob
-            else:
-                return None, None
+                if result:
+                    return result[0], result[1]  # model_blob, scaler_blob
+                else:
+                    return None, None
     
         except Error as e:
             print(f"Database error retrieving model version {model_version}: {e}")
@@ -426,32 +745,68 @@ class DatabaseHandler:
              print(f"An unexpected error occurred retrieving model version {model_version}: {e}")
              return None, None
 
-    def get_model_info(self, daily_fetcher=False):
+    def get_model_checksum(self, model_version):
+        """
+        Retrieve the checksum of a model version's blobs without transferring them.
+
+        Args:
+            model_version (str): The version of the model.
+
+        Returns:
+            str: MD5 of model_blob followed by MD5 of scaler_blob, or None if the version does not exist.
+        """
+
+        try:
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                cursor.execute("""
+                    SELECT CONCAT(MD5(model_blob), MD5(scaler_blob))
+                    FROM model_versions
+                    WHERE model_version = %s
+                """, (model_version,))
+                result = cursor.fetchone()
+                cursor.close()
+
+                return result[0] if result else None
+
+        except Error as e:
+            print(f"Database error retrieving checksum of model version {model_version}: {e}")
+            return None
+        except Exception as e:
+             print(f"An unexpected error occurred retrieving checksum of model version {model_version}: {e}")
+             return None
+
+    def get_model_info(self, daily_fetcher=False, with_checksum=False):
         """
-        Retrieve metadata for all models stored in the 'model_versions' table.
+        Retrieve metadata for all models stored in the 'model_versions' table. The model and
+        scaler blobs are never transferred.
+
+        Args:
+            daily_fetcher (bool): If True, retrieves only the most recently trained model.
+            with_checksum (bool): If True, adds a 'blob_checksum' column, the MD5 digests of
+                                  model_blob and scaler_blob computed by the server.
 
         Returns:
             df (pandas.DataFrame)
         """
         
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            base_query = """
-                SELECT model_name, model_version, last_trained_on, model_blob, scaler_blob FROM model_versions
-            """
+            with self.checkout() as connection:
+                checksum_column = ", CONCAT(MD5(model_blob), MD5(scaler_blob)) AS blob_checksum" if with_checksum else ""
+                base_query = f"""
+                    SELECT model_name, model_version, last_trained_on{checksum_column} FROM model_versions
+                """
 
-            where_clause = ""
-            if daily_fetcher:
-                where_clause = "WHERE last_trained_on = (SELECT MAX(last_trained_on) FROM model_versions)"
-                print("Filtering Models data to find the most recent model.")
+                where_clause = ""
+                if daily_fetcher:
+                    where_clause = "WHERE last_trained_on = (SELECT MAX(last_trained_on) FROM model_versions)"
+                    print("Filtering Models data to find the most recent model.")
 
-            order_by_clause = "ORDER BY last_trained_on;"
+                order_by_clause = "ORDER BY last_trained_on;"
 
-            sql_query = f"{base_query} {where_clause} {order_by_clause}"
+                sql_query = f"{base_query} {where_clause} {order_by_clause}"
             
-            return pd.read_sql(sql_query, self.connection, parse_dates=['last_trained_on'])
+                return pd.read_sql(sql_query, connection, parse_dates=['last_trained_on'])
 
         except Error as e:
             print(f"Database error retrieving model info: {e}")
@@ -478,17 +833,15 @@ class DatabaseHandler:
         """
         
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            cursor = self.connection.cursor()
-            cursor.execute("""
-            INSERT IGNORE INTO daily_metrics (date, model_version, accuracy, precision_val, recall, f1_score, roc_auc, conf_matrix)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (date, model_version, accuracy, precision, recall, f1_score, roc_auc, conf_matrix))
-            self.connection.commit()
-            print(f"Successfully inserted/handled {cursor.rowcount} metrics records")
-            cursor.close()
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                cursor.execute("""
+                INSERT IGNORE INTO daily_metrics (date, model_version, accuracy, precision_val, recall, f1_score, roc_auc, conf_matrix)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """, (date, model_version, accuracy, precision, recall, f1_score, roc_auc, conf_matrix))
+                connection.commit()
+                print(f"Successfully inserted/handled {cursor.rowcount} metrics records")
+                cursor.close()
 
         except Error as e:
             print(f"Database error inserting metrics for {model_version} on {date}: {e}")
@@ -508,52 +861,50 @@ class DatabaseHandler:
             df (pandas.DataFrame)
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            with self.checkout() as connection:
+                base_query = """
+                                SELECT 
+                                    d.date, 
+                                    m.model_name, 
+                                    d.model_version,
+                                    d.accuracy,
+                                    d.precision_val,
+                                    d.recall,
+                                    d.f1_score,
+                                    d.roc_auc,
+                                    d.conf_matrix
+                                FROM daily_metrics d
+                                JOIN model_versions m ON d.model_version = m.model_version
+                            """
+
+                where_clause = ""
+                if daily_fetcher:
+                    # Check if the table is empty first to avoid errors with MAX() on empty table
+                    cursor = connection.cursor()
+                    cursor.execute("SELECT COUNT(*) FROM daily_metrics")
+                    count = cursor.fetchone()[0]
+                    cursor.close()
+                    if count > 0:
+                        where_clause = "WHERE d.date = (SELECT MAX(date) FROM daily_metrics)"
+                        print("Filtering metrics data for the last available date.")
+                    else:
+                        print("No metrics data found, cannot filter for last day.")
+                        return pd.DataFrame()
+
+                sql_query = f"{base_query} {where_clause}"
+
+                df = pd.read_sql(
+                    sql_query,
+                    connection,
+                    parse_dates=['date']
+                )
 
-            base_query = """
-                            SELECT 
-                                d.date, 
-                                m.model_name, 
-                                d.model_version,
-                                d.accuracy,
-                                d.precision_val,
-                                d.recall,
-                                d.f1_score,
-                                d.roc_auc,
-                                d.conf_matrix
-                            FROM daily_metrics d
-                            JOIN model_versions m ON d.model_version = m.model_version
-                        """
-
-            where_clause = ""
-            if daily_fetcher:
-                # Check if the table is empty first to avoid errors with MAX() on empty table
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT COUNT(*) FROM daily_metrics")
-                count = cursor.fetchone()[0]
-                cursor.close()
-                if count > 0:
-                    where_clause = "WHERE d.date = (SELECT MAX(date) FROM daily_metrics)"
-                    print("Filtering metrics data for the last available date.")
+                if df.empty:
+                    print("No data found.")
                 else:
-                    print("No metrics data found, cannot filter for last day.")
-                    return pd.DataFrame()
-
-            sql_query = f"{base_query} {where_clause}"
-
-            df = pd.read_sql(
-                sql_query,
-                self.connection,
-                parse_dates=['date']
-            )
+                    print(f"Retrieved {len(df)} alert records.")
 
-            if df.empty:
-                print("No data found.")
-            else:
-                print(f"Retrieved {len(df)} alert records.")
-
-            return df
+                return df
 
         except Error as e:
             print(f"Database error retrieving metrics: {e}")
@@ -564,37 +915,26 @@ class DatabaseHandler:
 
 
     
-    def insert_predictions(self, df):
+    def insert_predictions(self, df, use_load_data=False):
         """
         Insert prediction results from a DataFrame into the 'predictions' table.
         Ignores insertion if a prediction for the same region, date, and time already exists.
 
         Args:
             df (pandas.DataFrame)
+            use_load_data (bool, optional): Load through LOAD DATA LOCAL INFILE (large backfills).
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            with self.checkout() as connection:
+                records = build_records([
+                    column_values(df[column])
+                    for column in ['region_id', 'date', 'time', 'is_alarm_active', 'raw_probabilities']
+                ])
 
-            records = []
-
-            for _, row in df.iterrows():
-                reg_id_val = row['region_id']
-                date_val = row['date']
-                time_val = row['time']
-                pred_val = row['is_alarm_active']
-                proba_val = row['raw_probabilities']
-                records.append((reg_id_val, date_val, time_val, pred_val, proba_val))
-
-            cursor = self.connection.cursor()
-            query = """
-                INSERT IGNORE INTO predictions (region_id, date, time, prediction_value, raw_probabilities)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.executemany(query, records)
-            self.connection.commit()
-            print(f"Successfully inserted/handled {cursor.rowcount} predictions records. Sanity check for daily runner: expected value is 576/0")
-            cursor.close()
+                rowcount = bulk_insert(connection, 'predictions',
+                                       ['region_id', 'date', 'time', 'prediction_value', 'raw_probabilities'], records,
+                                       ignore=True, batch_size=self.batch_size, use_load_data=use_load_data)
+                print(f"Successfully inserted/handled {rowcount} predictions records. Sanity check for daily runner: expected value is 576/0")
 
         except Error as e:
             print(f"Database error inserting predictions: {e}")
@@ -602,6 +942,105 @@ class DatabaseHandler:
              print(f"An unexpected error occurred inserting predictions: {e}")
 
 
+    PIPELINE_RUN_COLUMNS = ['run_id', 'pipeline', 'target_date', 'stage', 'status', 'started_at', 'finished_at',
+                            'wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'rss_growth_mb', 'traced_peak_mb',
+                            'row_count', 'error']
+
+    def insert_pipeline_runs(self, df):
+        """
+        Stores the stage metrics of a pipeline run in the 'pipeline_runs' table.
+
+        Args:
+            df (pandas.DataFrame): One row per stage, as returned by PipelineRun.to_frame().
+
+        Returns:
+            int: Number of inserted rows, or None if the insert failed.
+        """
+        if df.empty:
+            return 0
+        try:
+            with self.checkout() as connection:
+                records = build_records([column_values(df[column]) for column in self.PIPELINE_RUN_COLUMNS])
+                return bulk_insert(connection, 'pipeline_runs', self.PIPELINE_RUN_COLUMNS, records,
+                                   batch_size=self.batch_size)
+
+        except Error as e:
+            print(f"Database error inserting pipeline run metrics: {e}")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred inserting pipeline run metrics: {e}")
+            return None
+
+    def get_pipeline_runs(self, start_date=None, end_date=None, pipeline=None, stage=None):
+        """
+        Retrieves the stage metrics of the pipeline runs started in start_date <= started_at < end_date.
+
+        Args:
+            start_date (datetime, optional): Defaults to no lower bound.
+            end_date (datetime, optional): Defaults to no upper bound.
+            pipeline (str, optional): Only runs of this pipeline, e.g. 'daily_forecast'.
+            stage (str, optional): Only this stage, e.g. 'alarms' or 'isw/normalize'.
+
+        Returns:
+            df (pandas.DataFrame): One row per stage and run, oldest first.
+        """
+        try:
+            with self.checkout() as connection:
+                conditions = []
+                params = []
+                if start_date is not None:
+                    conditions.append("started_at >= %s")
+                    params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
+                if end_date is not None:
+                    conditions.append("started_at < %s")
+                    params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
+                if pipeline is not None:
+                    conditions.append("pipeline = %s")
+                    params.append(pipeline)
+                if stage is not None:
+                    conditions.append("stage = %s")
+                    params.append(stage)
+                where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+                df = pd.read_sql(
+                    f"SELECT {', '.join(self.PIPELINE_RUN_COLUMNS)} FROM pipeline_runs {where_clause} "
+                    "ORDER BY started_at, pipeline_run_stage_id",
+                    connection,
+                    params=params if params else None,
+                    parse_dates=['target_date', 'started_at', 'finished_at']
+                )
+                print(f"Retrieved {len(df)} pipeline run records.")
+                return df
+
+        except Error as e:
+            print(f"Database error retrieving pipeline runs: {e}")
+            return pd.DataFrame()
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving pipeline runs: {e}")
+            return pd.DataFrame()
+
+    def get_latest_prediction_date(self):
+        """
+        Retrieves the latest date of the 'predictions' table.
+
+        Returns:
+            pd.Timestamp: The latest prediction date, or None if there are none (or on error).
+        """
+        try:
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT MAX(date) FROM predictions")
+                latest_date = cursor.fetchone()[0]
+                cursor.close()
+                return None if latest_date is None else pd.Timestamp(latest_date)
+
+        except Error as e:
+            print(f"Database error retrieving the latest prediction date: {e}")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving the latest prediction date: {e}")
+            return None
+
     def get_predictions(self, specific_date=None, daily_fetcher=False):
         """
         Retrieves prediction data from the 'predictions' table, joined with region names.
@@ -615,51 +1054,50 @@ class DatabaseHandler:
         """
 
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            base_query = """
-                            SELECT 
-                                p.region_id, 
-                                r.region_name, 
-                                p.date, 
-                                p.time, 
-                                p.prediction_value,
-                                p.raw_probabilities
-                            FROM predictions p
-                            JOIN regions r ON p.region_id = r.region_id
-                        """
+            with self.checkout() as connection:
+                base_query = """
+                                SELECT 
+                                    p.region_id, 
+                                    r.region_name, 
+                                    p.date, 
+                                    p.time, 
+                                    p.prediction_value,
+                                    p.raw_probabilities
+                                FROM predictions p
+                                JOIN regions r ON p.region_id = r.region_id
+                            """
             
-            where_clause = ""
-            params = []
-
-            if specific_date:
-                date_str = specific_date.strftime('%Y-%m-%d') if hasattr(specific_date, 'strftime') else str(specific_date)
-                where_clause = "WHERE p.date = %s"
-                params.append(date_str)
-                print(f"Filtering PREDICTIONS data for specific date: {date_str}.")
-
-            elif daily_fetcher:
-                where_clause = "WHERE p.date = (SELECT MAX(date) FROM predictions)"
-                print("Filtering PREDICTIONS data for the last available day.")
-
-            sql_query = f"{base_query} {where_clause}"
-
-            df = pd.read_sql(
-                sql_query,
-                self.connection,
-                params=params if params else None, 
-                parse_dates=['date']
-            )
+                where_clause = ""
+                params = []
+
+                if specific_date:
+                    date_str = specific_date.strftime('%Y-%m-%d') if hasattr(specific_date, 'strftime') else str(specific_date)
+                    where_clause = "WHERE p.date = %s"
+                    params.append(date_str)
+                    print(f"Filtering PREDICTIONS data for specific date: {date_str}.")
+
+                elif daily_fetcher:
+                    where_clause = "WHERE p.date >= %s AND p.date < %s"
+                    params.extend(self._latest_day_range(connection, 'predictions'))
+                    print("Filtering PREDICTIONS data for the last available day.")
+
+                sql_query = f"{base_query} {where_clause}"
+
+                df = pd.read_sql(
+                    sql_query,
+                    connection,
+                    params=params if params else None, 
+                    parse_dates=['date']
+                )
 
-            df['time'] = df['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None) 
+                df['time'] = df['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None) 
 
-            if df.empty:
-                print("No data found.")
-            else:
-                print(f"Retrieved {len(df)} alert records.")
+                if df.empty:
+                    print("No data found.")
+                else:
+                    print(f"Retrieved {len(df)} alert records.")
 
-            return df
+                return df
 
         except Error as e:
             print(f"Database error retrieving predictions: {e}")
@@ -669,36 +1107,96 @@ class DatabaseHandler:
              return pd.DataFrame()
             
 
-    def get_isw_reports(self, daily_fetcher=False):
+    def iter_predictions(self, start_date, end_date, region_ids=None, include_probabilities=False,
+                         chunksize=5000):
+        """
+        Streams predictions of a date range through an unbuffered (server-side) cursor, using the
+        date-leading index of the 'predictions' table. The cursor runs on a dedicated connection,
+        so other queries may run between the chunks.
+
+        Args:
+            start_date (datetime): Only predictions with date >= start_date.
+            end_date (datetime): Only predictions with date < end_date.
+            region_ids (list, optional): Only predictions of these regions.
+            include_probabilities (bool, optional): Also return raw_probabilities. Defaults to False.
+            chunksize (int, optional): Rows per yielded chunk. Defaults to 5000.
+
+        Yields:
+            list: Row tuples (region_name, date, time, prediction_value[, raw_probabilities]),
+                  ordered by date, region_id and time.
+        """
+        conditions = ["p.date >= %s", "p.date < %s"]
+        params = [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')]
+        if region_ids:
+            conditions.append(f"p.region_id IN ({', '.join(['%s'] * len(region_ids))})")
+            params.extend(int(region_id) for region_id in region_ids)
+
+        sql_query = f"""
+            SELECT r.region_name, p.date, p.time, p.prediction_value
+                   {', p.raw_probabilities' if include_probabilities else ''}
+            FROM predictions p
+            JOIN regions r ON p.region_id = r.region_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY p.date, p.region_id, p.time
+        """
+
+        with self.dedicated_connection() as connection:
+            cursor = connection.cursor(buffered=False)
+            try:
+                cursor.execute(sql_query, params)
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                # a generator closed early leaves rows unread, they must be drained before the
+                # connection can be reused
+                if connection.unread_result:
+                    connection.consume_results()
+                cursor.close()
+
+    def get_isw_reports(self, daily_fetcher=False, start_date=None, end_date=None):
         """
         Retrieve ISW reports from the 'isw_reports' table.
 
         Args:
             daily_fetcher (bool): If True, retrieves reports only for the latest available date.
                                   If False (default), retrieves all reports.
+            start_date (datetime, optional): If given, retrieves reports with date >= start_date.
+                                             Ignored when daily_fetcher is True.
+            end_date (datetime, optional): If given, retrieves reports with date < end_date.
 
         Returns:
             df (pandas.DataFrame)
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            base_query = """
-                SELECT date, content, url
-                FROM isw_reports
-            """
-
-            where_clause = ""
-            if daily_fetcher:
-                where_clause = "WHERE date = (SELECT MAX(date) FROM isw_reports)"
-                print("Filtering ISW data for the last available day.")
-
-            order_by_clause = "ORDER BY date;"
+            with self.checkout() as connection:
+                base_query = """
+                    SELECT date, content, url
+                    FROM isw_reports
+                """
 
-            sql_query = f"{base_query} {where_clause} {order_by_clause}"
+                where_clause = ""
+                params = []
+                if daily_fetcher:
+                    where_clause = "WHERE date = (SELECT MAX(date) FROM isw_reports)"
+                    print("Filtering ISW data for the last available day.")
+                elif start_date is not None or end_date is not None:
+                    conditions = []
+                    if start_date is not None:
+                        conditions.append("date >= %s")
+                        params.append(start_date.strftime('%Y-%m-%d'))
+                    if end_date is not None:
+                        conditions.append("date < %s")
+                        params.append(end_date.strftime('%Y-%m-%d'))
+                    where_clause = "WHERE " + " AND ".join(conditions)
+
+                order_by_clause = "ORDER BY date;"
+
+                sql_query = f"{base_query} {where_clause} {order_by_clause}"
             
-            return pd.read_sql(sql_query, self.connection, parse_dates=['date'])
+                return pd.read_sql(sql_query, connection, params=params if params else None, parse_dates=['date'])
 
         except Error as e:
             print(f"Database error retrieving ISW reports: {e}")
@@ -716,61 +1214,57 @@ class DatabaseHandler:
             df (pandas.DataFrame)
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            with self.checkout() as connection:
+                records = build_records([column_values(df['date']), column_values(df['message'])])
 
-            records = []
-
-            for _, row in df.iterrows():
-                date_val = row['date']
-                content = row['message']
-                records.append((date_val, content))
-
-            cursor = self.connection.cursor()
-            query = """
-                INSERT INTO telegram_reports (date, content)
-                VALUES (%s, %s)
-                ON DUPLICATE KEY UPDATE
-                    content = VALUES(content)
-            """
-            cursor.executemany(query, records)
-            self.connection.commit()
-            print(f"Successfully inserted/handled {cursor.rowcount} telegram records.")
-            cursor.close()
+                rowcount = bulk_insert(connection, 'telegram_reports', ['date', 'content'], records,
+                                       update_columns=['content'], batch_size=self.batch_size)
+                print(f"Successfully inserted/handled {rowcount} telegram records.")
 
         except Error as e:
             print(f"Database error inserting Telegram reports: {e}")
         except Exception as e:
              print(f"An unexpected error occurred inserting Telegram reports: {e}")
 
-    def get_telegram_reports(self, daily_fetcher=False):
+    def get_telegram_reports(self, daily_fetcher=False, start_date=None, end_date=None):
         """
         Retrieve Telegram reports from the 'telegram_reports' table.
 
         Args:
             daily_fetcher (bool): If True, retrieves reports only for the latest available date.
                                   If False (default), retrieves all reports.
+            start_date (datetime, optional): If given, retrieves reports with date >= start_date.
+                                             Ignored when daily_fetcher is True.
+            end_date (datetime, optional): If given, retrieves reports with date < end_date.
 
         Returns:
             df (pandas.DataFrame)
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            base_query = """
-                SELECT date, content
-                FROM telegram_reports
-            """
-
-            where_clause = ""
-            if daily_fetcher:
-                where_clause = "WHERE date = (SELECT MAX(date) FROM telegram_reports)"
-                print("Filtering TELEGRAM data for the last available day.")
+            with self.checkout() as connection:
+                base_query = """
+                    SELECT date, content
+                    FROM telegram_reports
+                """
 
-            sql_query = f"{base_query} {where_clause}"
+                where_clause = ""
+                params = []
+                if daily_fetcher:
+                    where_clause = "WHERE date = (SELECT MAX(date) FROM telegram_reports)"
+                    print("Filtering TELEGRAM data for the last available day.")
+                elif start_date is not None or end_date is not None:
+                    conditions = []
+                    if start_date is not None:
+                        conditions.append("date >= %s")
+                        params.append(start_date.strftime('%Y-%m-%d'))
+                    if end_date is not None:
+                        conditions.append("date < %s")
+                        params.append(end_date.strftime('%Y-%m-%d'))
+                    where_clause = "WHERE " + " AND ".join(conditions)
+
+                sql_query = f"{base_query} {where_clause}"
             
-            return pd.read_sql(sql_query, self.connection, parse_dates=['date'])
+                return pd.read_sql(sql_query, connection, params=params if params else None, parse_dates=['date'])
 
         except Error as e:
             print(f"Database error retrieving Telegram reports: {e}")
@@ -780,7 +1274,116 @@ class DatabaseHandler:
              return pd.DataFrame()
             
 
-    def get_weather_data(self, expand_json=True, daily_fetcher=False):
+    def insert_telegram_messages(self, df):
+        """
+        Buffers fetched Telegram messages in the 'telegram_messages' table. Messages already
+        buffered are ignored.
+
+        Args:
+            df (pandas.DataFrame): Columns 'channel', 'message_id', 'date' (Kyiv local time) and 'message'.
+
+        Returns:
+            int: Number of new messages, or None if the insert failed.
+        """
+        if df.empty:
+            return 0
+        try:
+            with self.checkout() as connection:
+                columns = ['channel', 'message_id', 'date', 'message']
+                records = build_records([column_values(df[column]) for column in columns])
+                return bulk_insert(connection, 'telegram_messages', columns, records, ignore=True,
+                                   batch_size=self.batch_size)
+
+        except Error as e:
+            print(f"Database error inserting Telegram messages: {e}")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred inserting Telegram messages: {e}")
+            return None
+
+    def get_telegram_messages(self, start_date, end_date, channels=None):
+        """
+        Retrieves the buffered Telegram messages of start_date <= date < end_date, oldest first.
+
+        Args:
+            start_date (datetime): First day of the range.
+            end_date (datetime): Day after the last day of the range.
+            channels (list, optional): Only messages of these channels. Defaults to all.
+
+        Returns:
+            df (pandas.DataFrame): Columns 'channel', 'message_id', 'date' and 'message'.
+        """
+        try:
+            with self.checkout() as connection:
+                sql_query = """
+                    SELECT channel, message_id, date, message
+                    FROM telegram_messages
+                    WHERE date >= %s AND date < %s
+                """
+                params = [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')]
+                if channels:
+                    sql_query += f" AND channel IN ({', '.join(['%s'] * len(channels))})"
+                    params.extend(channels)
+                sql_query += " ORDER BY date, channel, message_id"
+                return pd.read_sql(sql_query, connection, params=params, parse_dates=['date'])
+
+        except Error as e:
+            print(f"Database error retrieving Telegram messages: {e}")
+            return pd.DataFrame()
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving Telegram messages: {e}")
+            return pd.DataFrame()
+
+    def get_telegram_cursors(self):
+        """
+        Retrieves the id of the last buffered message of every Telegram channel.
+
+        Returns:
+            dict: Maps channel to last_message_id, or None if the cursors could not be read.
+        """
+        try:
+            with self.session() as cursor:
+                cursor.execute("SELECT channel, last_message_id FROM telegram_cursors")
+                return {channel: last_message_id for channel, last_message_id in cursor.fetchall()}
+
+        except Error as e:
+            print(f"Database error retrieving Telegram cursors: {e}")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving Telegram cursors: {e}")
+            return None
+
+    def upsert_telegram_cursor(self, channel, last_message_id, last_message_date):
+        """
+        Moves the cursor of a Telegram channel to its last buffered message. The cursor never
+        moves backwards.
+
+        Args:
+            channel (str)
+            last_message_id (int)
+            last_message_date (datetime): Kyiv local time of the message.
+        """
+        try:
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                cursor.execute("""
+                    INSERT INTO telegram_cursors (channel, last_message_id, last_message_date, updated_at)
+                    VALUES (%s, %s, %s, NOW())
+                    ON DUPLICATE KEY UPDATE
+                        last_message_date = IF(VALUES(last_message_id) > last_message_id,
+                                               VALUES(last_message_date), last_message_date),
+                        last_message_id = GREATEST(last_message_id, VALUES(last_message_id)),
+                        updated_at = VALUES(updated_at)
+                """, (channel, int(last_message_id), last_message_date))
+                connection.commit()
+                cursor.close()
+
+        except Error as e:
+            print(f"Database error updating the Telegram cursor of {channel}: {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred updating the Telegram cursor of {channel}: {e}")
+
+    def get_weather_data(self, expand_json=True, daily_fetcher=False, start_date=None, end_date=None):
         """
         Retrieves weather data from the 'weather' table, optionally expanding the JSON 'data' column.
 
@@ -788,59 +1391,72 @@ class DatabaseHandler:
             expand_json (bool): If True (default), parses the 'data' JSON column into separate DataFrame columns.
             daily_fetcher (bool): If True, retrieves weather data only for the latest available date.
                                   If False (default), retrieves all weather data.
+            start_date (datetime, optional): If given, retrieves weather data with date >= start_date.
+                                             Ignored when daily_fetcher is True.
+            end_date (datetime, optional): If given, retrieves weather data with date < end_date.
 
         Returns:
             df (pandas.DataFrame)
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            base_query = """
-                SELECT
-                    w.weather_id, w.region_id, r.region_name,
-                    w.date, w.time, w.data
-                FROM weather w
-                JOIN regions r ON w.region_id = r.region_id
-            """
+            with self.checkout() as connection:
+                base_query = """
+                    SELECT
+                        w.weather_id, w.region_id, r.region_name,
+                        w.date, w.time, w.data
+                    FROM weather w
+                    JOIN regions r ON w.region_id = r.region_id
+                """
 
-            where_clause = ""
-            if daily_fetcher:
-                where_clause = "WHERE w.date = (SELECT MAX(date) FROM weather)"
-                print("Filtering WEATHER data for the last available day.")
+                where_clause = ""
+                params = []
+                if daily_fetcher:
+                    where_clause = "WHERE w.date >= %s AND w.date < %s"
+                    params.extend(self._latest_day_range(connection, 'weather'))
+                    print("Filtering WEATHER data for the last available day.")
+                elif start_date is not None or end_date is not None:
+                    conditions = []
+                    if start_date is not None:
+                        conditions.append("w.date >= %s")
+                        params.append(start_date.strftime('%Y-%m-%d'))
+                    if end_date is not None:
+                        conditions.append("w.date < %s")
+                        params.append(end_date.strftime('%Y-%m-%d'))
+                    where_clause = "WHERE " + " AND ".join(conditions)
+                    print(f"Filtering WEATHER data for the range {start_date} - {end_date}.")
 
-            order_by_clause = "ORDER BY r.region_name, w.date, w.time;"
+                order_by_clause = "ORDER BY r.region_name, w.date, w.time;"
 
-            sql_query = f"{base_query} {where_clause} {order_by_clause}"
+                sql_query = f"{base_query} {where_clause} {order_by_clause}"
 
-            print(f"Executing query to fetch weather data...")
+                print(f"Executing query to fetch weather data...")
 
-            df = pd.read_sql(sql_query, self.connection, parse_dates=['date'])
+                df = pd.read_sql(sql_query, connection, params=params if params else None, parse_dates=['date'])
 
-            if df.empty:
-                print("No weather data found.")
-                return df
+                if df.empty:
+                    print("No weather data found.")
+                    return df
 
-            print(f"Retrieved {len(df)} weather records.")
+                print(f"Retrieved {len(df)} weather records.")
 
-            if expand_json and 'data' in df.columns:
-                json_records = []
+                if expand_json and 'data' in df.columns:
+                    json_records = []
 
-                for index, json_str in df['data'].items():
-                    parsed_data = json.loads(json_str)
-                    json_records.append(parsed_data)
-                expanded_data = pd.json_normalize(json_records)
-                expanded_data.index = df.index
+                    for index, json_str in df['data'].items():
+                        parsed_data = json.loads(json_str)
+                        json_records.append(parsed_data)
+                    expanded_data = pd.json_normalize(json_records)
+                    expanded_data.index = df.index
 
-                df_expanded = pd.concat([df.drop(columns=['data']), expanded_data], axis=1)
-                df_expanded['time'] = df_expanded['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None) # !!!!
-                print("JSON data expanded successfully.")
+                    df_expanded = pd.concat([df.drop(columns=['data']), expanded_data], axis=1)
+                    df_expanded['time'] = df_expanded['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None) # !!!!
+                    print("JSON data expanded successfully.")
 
-                return df_expanded
+                    return df_expanded
 
-            else:
-                df['time'] = df['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None)
-                return df
+                else:
+                    df['time'] = df['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None)
+                    return df
 
         except Error as e:
             print(f"Database error retrieving weather data: {e}")
@@ -849,6 +1465,38 @@ class DatabaseHandler:
             print(f"An unexpected error occurred while retrieving weather data: {e}")
             return pd.DataFrame()
 
+    def get_weather_stored_days(self, start_date, end_date, min_hours=24):
+        """
+        Finds the region-days of start_date <= date < end_date whose hourly weather is already
+        stored, so the collector can skip them.
+
+        Args:
+            start_date (datetime): First day of the range.
+            end_date (datetime): Day after the last day of the range.
+            min_hours (int, optional): Stored hours needed for a day to count as complete. Defaults to 24.
+
+        Returns:
+            set: (region_name, 'YYYY-MM-DD') tuples.
+        """
+        try:
+            with self.session() as cursor:
+                cursor.execute("""
+                    SELECT r.region_name, w.date
+                    FROM weather w
+                    JOIN regions r ON w.region_id = r.region_id
+                    WHERE w.date >= %s AND w.date < %s
+                    GROUP BY r.region_name, w.date
+                    HAVING COUNT(*) >= %s
+                """, (start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), min_hours))
+                return {(region_name, date.strftime('%Y-%m-%d')) for region_name, date in cursor.fetchall()}
+
+        except Error as e:
+            print(f"Database error retrieving stored weather days: {e}")
+            return set()
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving stored weather days: {e}")
+            return set()
+
     def prepare_weather_data(self, df, region_mapping, col_mapping):
         """
         Prepares weather DataFrame rows for insertion, converting row data to JSON.
@@ -861,27 +1509,24 @@ class DatabaseHandler:
         Returns:
             list: A list of tuples, where each tuple is (region_id, date_value, time_value, json_data_string).
         """
-        df = df.replace({float('nan'): None})  # !!!!!!!
-        output = []
-
-        for _, row in df.iterrows():
-            region_value = row[col_mapping['region']]
-            region_id = region_mapping.get(region_value)
-            if region_id is None:
-                print(f"Skipping unknown location: {region_value}")
-                continue
-
-            date_value = row[col_mapping['date']]
-            time_value = row[col_mapping['time']]
-
-            json_data_dict = row.to_dict()
-            for key in col_mapping.values():
-                json_data_dict.pop(key, None)
-            json_data = json.dumps(json_data_dict, default=str)
+        df = self._drop_unknown_regions(df, region_mapping, col_mapping['region'])
 
-            output.append((region_id, date_value, time_value, json_data))
+        return build_records([
+            column_values(df[col_mapping['region']].map(region_mapping)),
+            column_values(df[col_mapping['date']]),
+            column_values(df[col_mapping['time']]),
+            json_column(df, exclude=col_mapping.values()),
+        ])
 
-        return output
+    @staticmethod
+    def _drop_unknown_regions(df, region_mapping, region_column):
+        """
+        Drops the rows whose region is missing from region_mapping, reporting each unknown region once.
+        """
+        known = df[region_column].isin(region_mapping.keys())
+        for region_value in df.loc[~known, region_column].unique():
+            print(f"Skipping unknown location: {region_value}")
+        return df[known]
 
     def prepare_alerts_data(self, df, region_mapping, col_mapping):
         """
@@ -896,7 +1541,7 @@ class DatabaseHandler:
         Returns:
             list: A list of tuples, where each tuple is (region_id, start_datetime, end_datetime, json_data_string).
         """
-        df = df.replace({float('nan'): None})  # !!!!!!!
+        df = df.copy()
 
         df['startDate'] = pd.to_datetime(df['startDate'], utc=True, format='mixed', errors='coerce')
         df['startDate'] = df['startDate'].dt.tz_convert('Europe/Kyiv')
@@ -905,29 +1550,17 @@ class DatabaseHandler:
         df['endDate'] = pd.to_datetime(df['endDate'], utc=True, format='mixed', errors='coerce')
         df['endDate'] = df['endDate'].dt.tz_convert('Europe/Kyiv')
         df['endDate'] = df['endDate'].dt.tz_localize(None)
-        
-        output = []
-
-        for _, row in df.iterrows():
-            region_value = row[col_mapping['region']]
-            region_id = region_mapping.get(region_value)
-            if region_id is None:
-                print(f"Skipping unknown location: {region_value}")
-                continue
-
-            start = row[col_mapping['start_date']]
-            end = row[col_mapping['end_date']]
 
-            json_data_dict = row.to_dict()
-            for key in col_mapping.values():
-                json_data_dict.pop(key, None)
-            json_data = json.dumps(json_data_dict, default=str)
+        df = self._drop_unknown_regions(df, region_mapping, col_mapping['region'])
 
-            output.append((region_id, start, end, json_data))
+        return build_records([
+            column_values(df[col_mapping['region']].map(region_mapping)),
+            column_values(df[col_mapping['start_date']]),
+            column_values(df[col_mapping['end_date']]),
+            json_column(df, exclude=col_mapping.values()),
+        ])
 
-        return output
-
-    def insert_weather_data(self, df, region_mapping, col_mapping):
+    def insert_weather_data(self, df, region_mapping, col_mapping, use_load_data=False):
         """
         Prepares and inserts weather data into the 'weather' table.
         Updates existing records based on unique key (region_id, date, time).
@@ -937,24 +1570,14 @@ class DatabaseHandler:
             region_mapping (dict): Dictionary mapping region names to region IDs.
             col_mapping (dict): Maps standard field names ('region', 'date', 'time')
                                 to actual column names in the DataFrame.
+            use_load_data (bool, optional): Load through LOAD DATA LOCAL INFILE (large backfills).
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-
-            cursor = self.connection.cursor()
-    
-            insert_sql = """
-                INSERT INTO weather (region_id, date, time, data)
-                VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE data = VALUES(data)
-            """
-    
-            prepared = self.prepare_weather_data(df, region_mapping, col_mapping)
-            cursor.executemany(insert_sql, prepared)
-            self.connection.commit()
-            print(f"Successfully inserted/handled {cursor.rowcount} weather records. Sanity check for daily runner: expected value is 600/0")
-            cursor.close()
+            with self.checkout() as connection:
+                prepared = self.prepare_weather_data(df, region_mapping, col_mapping)
+                rowcount = bulk_insert(connection, 'weather', ['region_id', 'date', 'time', 'data'], prepared,
+                                       update_columns=['data'], batch_size=self.batch_size, use_load_data=use_load_data)
+                print(f"Successfully inserted/handled {rowcount} weather records. Sanity check for daily runner: expected value is 600/0")
 
         except Error as e:
             print(f"Database error inserting weather data: {e}")
@@ -964,85 +1587,327 @@ class DatabaseHandler:
     def insert_alerts_data(self, df, region_mapping, col_mapping):
         """
         Prepares and inserts alerts data into the 'alarms' table.
-        Ignores insertion if an alarm for the same region and start time already exists.
+        Updates the end time and data of an alarm that already exists for the same region and start time
+        (the API corrects alarms that were still active or reported late).
 
         Args:
             df (pandas.DataFrame): DataFrame containing the raw alerts data.
             region_mapping (dict): Dictionary mapping region names to region IDs.
             col_mapping (dict): Maps standard field names ('region', 'start_date', 'end_date')
                                 to actual column names in the DataFrame.
+
+        Returns:
+            list: (region_id, date) tuples of the region-days touched by new or changed alarms,
+                  i.e. the ones whose 'alarm_daily_aggregates' rows are stale.
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            with self.checkout() as connection:
+                prepared = self.prepare_alerts_data(df, region_mapping, col_mapping)
+                prepared = [record for record in prepared if record[1] is not None]
+                # 'end' is NOT NULL: alarms still active have no end yet and are stored once a later
+                # history reports it, instead of failing the whole batch
+                still_active = sum(1 for record in prepared if record[2] is None)
+                if still_active:
+                    print(f"Skipping {still_active} alarms without an end date (still active).")
+                    prepared = [record for record in prepared if record[2] is not None]
+                if not prepared:
+                    print("No alarm records to insert.")
+                    return []
+
+                cursor = connection.cursor()
+                existing_ends = self._get_existing_alarm_ends(cursor, prepared)
+                cursor.close()
 
-            cursor = self.connection.cursor()
-    
-            insert_sql = """
-                INSERT IGNORE INTO alarms (region_id, start, end, data)
-                    VALUES (%s, %s, %s, %s)
-            """
-    
-            prepared = self.prepare_alerts_data(df, region_mapping, col_mapping)
-            cursor.executemany(insert_sql, prepared)
-            self.connection.commit()
-            print(f"Successfully inserted/handled {cursor.rowcount} alarm records.")
-            cursor.close()
+                rowcount = bulk_insert(connection, 'alarms', ['region_id', 'start', 'end', 'data'], prepared,
+                                       update_columns=['end', 'data'], batch_size=self.batch_size)
+                print(f"Successfully inserted/handled {rowcount} alarm records.")
+
+                affected = set()
+                for region_id, start, end, _ in prepared:
+                    start = pd.Timestamp(start)
+                    end = pd.Timestamp(end)
+                    key = (region_id, start)
+                    if key in existing_ends and existing_ends[key] == end:
+                        continue  # unchanged alarm
+
+                    # the days covered by the old version of a corrected alarm are stale too
+                    old_end = existing_ends.get(key, end)
+                    last_day = max(end, old_end, start).normalize()
+                    for day in pd.date_range(start.normalize(), last_day, freq='D'):
+                        affected.add((region_id, day.date()))
+
+                return sorted(affected)
 
         except Error as e:
             print(f"Database error inserting alarm data: {e}")
+            return []
         except Exception as e:
              print(f"An unexpected error occurred inserting alarm data: {e}")
+             return []
 
-    def insert_merged_data(self, df):
+    def _get_existing_alarm_ends(self, cursor, prepared):
+        """
+        Looks up the stored end time of the alarms about to be inserted.
+
+        Args:
+            cursor: An open cursor.
+            prepared (list): Tuples (region_id, start, end, json_data) from prepare_alerts_data.
+
+        Returns:
+            dict: Maps (region_id, pd.Timestamp start) to pd.Timestamp end for the alarms already stored.
+        """
+        region_ids = sorted({record[0] for record in prepared})
+        starts = [pd.Timestamp(record[1]) for record in prepared]
+        placeholders = ", ".join(["%s"] * len(region_ids))
+
+        cursor.execute(f"""
+            SELECT region_id, start, end
+            FROM alarms
+            WHERE region_id IN ({placeholders}) AND start >= %s AND start <= %s
+        """, (*region_ids, min(starts).to_pydatetime(), max(starts).to_pydatetime()))
+
+        return {(region_id, pd.Timestamp(start)): pd.Timestamp(end) for region_id, start, end in cursor.fetchall()}
+
+    def upsert_alarm_daily_aggregates(self, df):
+        """
+        Inserts or replaces rows of the 'alarm_daily_aggregates' table.
+
+        Args:
+            df (pandas.DataFrame): Columns 'region_id', 'date', 'minutes', 'starts',
+                                   'active_at_start', 'active_at_end' and 'last_end'.
+        """
+        try:
+            with self.checkout() as connection:
+                df = df.astype(object).where(df.notna(), None)
+                records = list(df[['region_id', 'date', 'minutes', 'starts', 'active_at_start',
+                                   'active_at_end', 'last_end']].itertuples(index=False, name=None))
+
+                cursor = connection.cursor()
+                query = """
+                    INSERT INTO alarm_daily_aggregates
+                        (region_id, date, minutes, starts, active_at_start, active_at_end, last_end)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        minutes = VALUES(minutes),
+                        starts = VALUES(starts),
+                        active_at_start = VALUES(active_at_start),
+                        active_at_end = VALUES(active_at_end),
+                        last_end = VALUES(last_end)
+                """
+                cursor.executemany(query, records)
+                connection.commit()
+                print(f"Successfully inserted/handled {len(records)} alarm daily aggregates.")
+                cursor.close()
+
+        except Error as e:
+            print(f"Database error inserting alarm daily aggregates: {e}")
+        except Exception as e:
+             print(f"An unexpected error occurred inserting alarm daily aggregates: {e}")
+
+    def get_alarm_daily_aggregates(self, start_date, end_date):
+        """
+        Retrieves per-region daily alarm aggregates for start_date <= date < end_date.
+
+        Args:
+            start_date (datetime): First day of the range.
+            end_date (datetime): Day after the last day of the range.
+
+        Returns:
+            df (pandas.DataFrame)
+        """
+        try:
+            with self.checkout() as connection:
+                sql_query = """
+                    SELECT region_id, date, minutes, starts, active_at_start, active_at_end, last_end
+                    FROM alarm_daily_aggregates
+                    WHERE date >= %s AND date < %s
+                    ORDER BY region_id, date
+                """
+                params = [start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')]
+
+                return pd.read_sql(sql_query, connection, params=params, parse_dates=['date', 'last_end'])
+
+        except Error as e:
+            print(f"Database error retrieving alarm daily aggregates: {e}")
+            return pd.DataFrame()
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving alarm daily aggregates: {e}")
+            return pd.DataFrame()
+
+    def get_alarm_start_days(self, start_date, end_date):
+        """
+        Retrieves the days on which at least one alarm started, for start_date <= start < end_date.
+
+        Args:
+            start_date (datetime): First moment of the range.
+            end_date (datetime): End of the range (exclusive).
+
+        Returns:
+            df (pandas.DataFrame): Column 'date', one row per day.
+        """
+        try:
+            with self.checkout() as connection:
+                sql_query = """
+                    SELECT DISTINCT DATE(start) AS date
+                    FROM alarms
+                    WHERE start >= %s AND start < %s
+                """
+                params = [start_date.strftime('%Y-%m-%d %H:%M:%S'), end_date.strftime('%Y-%m-%d %H:%M:%S')]
+
+                return pd.read_sql(sql_query, connection, params=params, parse_dates=['date'])
+
+        except Error as e:
+            print(f"Database error retrieving alarm start days: {e}")
+            return pd.DataFrame(columns=['date'])
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving alarm start days: {e}")
+            return pd.DataFrame(columns=['date'])
+
+    def insert_merged_data(self, df, use_load_data=False):
         """
         Inserts pre-processed/merged data into the 'merged_data' table.
-        Extracts region_id, date, time, and stores the rest as JSON.
+        Extracts region_id, date, time and the model features into their typed columns,
+        and stores the rest as JSON.
         Ignores insertion if data for the same region, date, and time already exists.
 
         Args:
             df (pandas.DataFrame)
+            use_load_data (bool, optional): Load through LOAD DATA LOCAL INFILE (large backfills).
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect() 
+            # databases created before the typed layout get its columns on the first insert
+            if not self._merged_schema_ready:
+                self._merged_schema_ready = self.upgrade_merged_data_schema()
+                if not self._merged_schema_ready:
+                    raise RuntimeError("merged_data lacks the typed feature columns, "
+                                       "run python -m src.database.merged_schema")
+
+            with self.checkout() as connection:
+                typed_columns = merged_column_names()
+                missing = [column for column in typed_columns if column not in df.columns]
+                if missing:
+                    print(f"Merged data lacks typed columns, storing them as NULL: {missing}")
+
+                records = build_records(
+                    [column_values(df[column]) for column in KEY_COLUMNS]
+                    + [column_values(df[column]) if column in df.columns else [None] * len(df)
+                       for column in typed_columns]
+                    + [[MERGED_SCHEMA_VERSION] * len(df), json_column(df, exclude=KEY_COLUMNS + typed_columns)]
+                )
 
-            cursor = self.connection.cursor()
-    
-            df = df.replace({float('nan'): None})  # !!!!!!!
-            records = []
-    
-            for _, row in df.iterrows():
-                region_id_val = row['region_id']
-                date_val = row['date']
-                time_val = row['time']
-    
-                json_data_dict = row.to_dict()
-                for key in ['region_id', 'date', 'time']:
-                    json_data_dict.pop(key, None)
-                json_data = json.dumps(json_data_dict, default=str)
-    
-                records.append((region_id_val, date_val, time_val, json_data))
-    
-            insert_sql = """
-                INSERT IGNORE INTO merged_data (region_id, date, time, data)
-                    VALUES (%s, %s, %s, %s)
-            """
-    
-            cursor.executemany(insert_sql, records)
-            self.connection.commit()
-            print(f"Successfully inserted/handled merged dataset of {cursor.rowcount} rows. Sanity check for daily runner: expected value is 576/0")
-            cursor.close()
+                rowcount = bulk_insert(connection, 'merged_data',
+                                       KEY_COLUMNS + typed_columns + ['schema_version', 'data'], records,
+                                       ignore=True, batch_size=self.batch_size, use_load_data=use_load_data)
+                print(f"Successfully inserted/handled merged dataset of {rowcount} rows. Sanity check for daily runner: expected value is 576/0")
             
         except Error as e:
             print(f"Database error inserting merged data: {e}")
         except Exception as e:
              print(f"An unexpected error occurred inserting merged data: {e}")
 
+    def upgrade_merged_data_schema(self):
+        """
+        Adds the typed feature columns of the current schema version (and 'schema_version')
+        that the 'merged_data' table does not have yet.
+
+        Returns:
+            bool: True if the table has the current layout afterwards, False on error.
+        """
+        try:
+            with self.session() as cursor:
+                cursor.execute("""
+                    SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'merged_data'
+                """, (self.database,))
+                existing = {row[0] for row in cursor.fetchall()}
+
+                wanted = merged_columns() + [('schema_version', 'SMALLINT')]
+                missing = [(name, sql_type) for name, sql_type in wanted if name not in existing]
+                if not missing:
+                    print("merged_data schema is up to date.")
+                    return True
+
+                additions = ", ".join(f"ADD COLUMN {name} {sql_type} NULL" for name, sql_type in missing)
+                cursor.execute(f"ALTER TABLE merged_data {additions}")
+                print(f"Added {len(missing)} columns to merged_data.")
+                return True
+
+        except Error as e:
+            print(f"Database error upgrading merged_data schema: {e}")
+            return False
+        except Exception as e:
+            print(f"An unexpected error occurred upgrading merged_data schema: {e}")
+            return False
+
+    def convert_legacy_merged_rows(self, batch_size=5000):
+        """
+        Moves the feature values of up to batch_size rows written before the typed layout
+        (schema_version IS NULL) from their JSON blob into the typed columns.
+
+        Args:
+            batch_size (int, optional): Rows converted by this call. Defaults to 5000.
+
+        Returns:
+            int: Number of rows converted, 0 when none are left (or on error).
+        """
+        try:
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                cursor.execute("""
+                    SELECT report_id, region_id, date, time, data
+                    FROM merged_data
+                    WHERE schema_version IS NULL
+                    ORDER BY report_id
+                    LIMIT %s
+                """, (batch_size,))
+                rows = cursor.fetchall()
+                cursor.close()
+                if not rows:
+                    return 0
+
+                typed_columns = merged_column_names()
+                typed_set = set(typed_columns)
+                records = []
+                for report_id, region_id, date, time_value, data in rows:
+                    values = json.loads(data) if data else {}
+                    typed = [self._to_typed_value(values.get(column)) for column in typed_columns]
+                    extras = json.dumps({k: v for k, v in values.items() if k not in typed_set}, default=str)
+                    records.append((report_id, region_id, date, time_value, *typed, MERGED_SCHEMA_VERSION, extras))
+
+                bulk_insert(connection, 'merged_data',
+                            ['report_id'] + KEY_COLUMNS + typed_columns + ['schema_version', 'data'], records,
+                            update_columns=typed_columns + ['schema_version', 'data'], batch_size=self.batch_size)
+                return len(records)
+
+        except Error as e:
+            print(f"Database error converting legacy merged rows: {e}")
+            return 0
+        except Exception as e:
+            print(f"An unexpected error occurred converting legacy merged rows: {e}")
+            return 0
+
+    @staticmethod
+    def _to_typed_value(value):
+        """
+        Converts a JSON feature value to a number for a typed column (booleans to 0/1,
+        missing markers such as null, NaN or "<NA>" to None).
+        """
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, (int, float)):
+            return None if value != value else value
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                return None
+        return None
 
     def get_merged_data(self, col_map=None, daily_fetcher=False, expand_json=True):
         """
         Fetches data from 'merged_data' table, optionally expanding JSON and reordering columns.
+        Typed feature columns are returned as regular columns; for rows not migrated yet their
+        values come from the JSON.
 
         Args:
             col_map (list, optional): A list of column names defining the desired order.
@@ -1055,41 +1920,46 @@ class DatabaseHandler:
             df (pandas.DataFrame)
         """
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect() 
-
-            base_query = """
-                    SELECT * FROM merged_data
-                """
+            with self.checkout() as connection:
+                base_query = """
+                        SELECT * FROM merged_data
+                    """
     
-            where_clause = ""
-            if daily_fetcher:
-                where_clause = "WHERE date = (SELECT MAX(date) FROM merged_data)"
-                print("Filtering MERGED data for the last available day.")
+                where_clause = ""
+                params = []
+                if daily_fetcher:
+                    where_clause = "WHERE date >= %s AND date < %s"
+                    params.extend(self._latest_day_range(connection, 'merged_data'))
+                    print("Filtering MERGED data for the last available day.")
     
-            sql_query = f"{base_query} {where_clause}"
+                sql_query = f"{base_query} {where_clause}"
     
-            df = pd.read_sql(sql_query, self.connection, parse_dates=['date'])
-            if expand_json and 'data' in df.columns:
-                # unpack the JSON into separate columns
-                json_records = [json.loads(s) for s in df['data']]
-                expanded = pd.json_normalize(json_records)
-                expanded.index = df.index
+                df = pd.read_sql(sql_query, connection, params=params if params else None, parse_dates=['date'])
+                df = df.drop(columns=['schema_version'], errors='ignore')
+                if expand_json and 'data' in df.columns:
+                    # unpack the JSON into separate columns
+                    json_records = [json.loads(s) if s else {} for s in df['data']]
+                    expanded = pd.json_normalize(json_records)
+                    expanded.index = df.index
     
-                base = df.drop(columns=['data'])
-                base['time'] = base['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None)
+                    base = df.drop(columns=['data'])
+                    base['time'] = base['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None)
+
+                    # rows written before the typed layout still carry their features in the JSON
+                    for column in expanded.columns.intersection(base.columns):
+                        base[column] = base[column].combine_first(expanded.pop(column))
     
-                df = pd.concat([base, expanded], axis=1)
+                    df = pd.concat([base, expanded], axis=1)
     
-            else:
-                df['time'] = df['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None)
+                else:
+                    df['time'] = df['time'].apply(lambda x: str(x).split()[-1] if pd.notna(x) else None)
     
-            if col_map:
-                cols_to_use = [c for c in col_map if c in df.columns]
-                extra = [c for c in df.columns if c not in cols_to_use]
-                df = df.reindex(columns=cols_to_use + extra)
+                if col_map:
+                    cols_to_use = [c for c in col_map if c in df.columns]
+                    extra = [c for c in df.columns if c not in cols_to_use]
+                    df = df.reindex(columns=cols_to_use + extra)
     
-            return df
+                return df
             
         except Error as e:
             print(f"Database error retrieving merged data: {e}")
@@ -1098,8 +1968,176 @@ class DatabaseHandler:
              print(f"An unexpected error occurred retrieving merged data: {e}")
              return pd.DataFrame()
 
+    # rough in-flight size of one fetched cell: a Python object plus its tuple slot,
+    # the downcast chunk itself only needs 1-4 bytes per cell on top of that
+    _FETCHED_CELL_BYTES = 40
+    _SQL_INT_DTYPES = {'TINYINT': np.int8, 'SMALLINT': np.int16, 'INT': np.int32}
 
-    def get_alerts(self, weekly_fetcher=False, specific_date=None):
+    @classmethod
+    def _rows_per_chunk(cls, max_memory_mb, n_columns):
+        """
+        Picks how many rows a chunk may hold so that fetching and converting it stays
+        within max_memory_mb.
+        """
+        bytes_per_row = (n_columns + 4) * (cls._FETCHED_CELL_BYTES + 4)
+        return max(1000, int(max_memory_mb * 1024 ** 2 // bytes_per_row))
+
+    def iter_merged_data(self, start_date=None, end_date=None, region_ids=None, columns=None,
+                         chunksize=None, max_memory_mb=256):
+        """
+        Streams 'merged_data' as DataFrame chunks through an unbuffered (server-side) cursor, so
+        that years of hourly rows can be processed in bounded memory. Typed columns are downcast
+        as they arrive: FLOAT to float32 and integer columns to int8/int16/int32 (float32 when the
+        chunk has NULLs). Rows not migrated to the typed layout yet get their values from the JSON.
+        The cursor runs on a dedicated connection, so other queries may run between the chunks.
+
+        Args:
+            start_date (datetime, optional): Only rows with date >= start_date.
+            end_date (datetime, optional): Only rows with date < end_date.
+            region_ids (list, optional): Only rows of these regions.
+            columns (list, optional): Typed columns to read. Defaults to all of the current schema version.
+            chunksize (int, optional): Rows per chunk. Derived from max_memory_mb when not given.
+            max_memory_mb (float, optional): Memory budget of one chunk in flight. Defaults to 256.
+
+        Yields:
+            pd.DataFrame: Chunks with 'region_id', 'date', 'time' and the requested columns,
+                          ordered by date, region and time.
+        """
+        sql_types = dict(merged_columns())
+        columns = columns or list(sql_types)
+        chunksize = chunksize or self._rows_per_chunk(max_memory_mb, len(columns))
+
+        conditions = []
+        params = []
+        if start_date is not None:
+            conditions.append("date >= %s")
+            params.append(start_date.strftime('%Y-%m-%d'))
+        if end_date is not None:
+            conditions.append("date < %s")
+            params.append(end_date.strftime('%Y-%m-%d'))
+        if region_ids:
+            conditions.append(f"region_id IN ({', '.join(['%s'] * len(region_ids))})")
+            params.extend(int(region_id) for region_id in region_ids)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # ordered like idx_merged_data_date, so the rows are streamed without a filesort
+        sql_query = f"""
+            SELECT region_id, date, time, {', '.join(columns)},
+                   CASE WHEN schema_version IS NULL THEN data END AS legacy_data
+            FROM merged_data
+            {where_clause}
+            ORDER BY date, region_id, time
+        """
+        print(f"Streaming MERGED data in chunks of {chunksize} rows.")
+
+        with self.dedicated_connection() as connection:
+            cursor = connection.cursor(buffered=False)
+            try:
+                cursor.execute(sql_query, params)
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    yield self._merged_rows_to_frame(rows, columns, sql_types)
+            finally:
+                if connection.unread_result:
+                    connection.consume_results()
+                cursor.close()
+
+    def _merged_rows_to_frame(self, rows, columns, sql_types):
+        """
+        Converts fetched (region_id, date, time, *columns, legacy_data) rows to a downcast DataFrame.
+        """
+        values = np.array([row[3:-1] for row in rows], dtype=np.float32).reshape(len(rows), len(columns))
+
+        for i, row in enumerate(rows):
+            if row[-1]:
+                legacy = json.loads(row[-1])
+                typed = [self._to_typed_value(legacy.get(column)) for column in columns]
+                values[i] = [np.nan if value is None else value for value in typed]
+
+        data = {
+            'region_id': np.array([row[0] for row in rows], dtype=np.int16),
+            'date': pd.to_datetime([row[1] for row in rows]),
+            'time': pd.Categorical([str(row[2]).split()[-1] if row[2] is not None else None for row in rows]),
+        }
+        for j, column in enumerate(columns):
+            column_data = values[:, j]
+            int_dtype = self._SQL_INT_DTYPES.get(sql_types.get(column))
+            if int_dtype is not None and not np.isnan(column_data).any():
+                column_data = column_data.astype(int_dtype)
+            data[column] = column_data
+
+        chunk = pd.DataFrame(data)
+        return chunk
+
+    def get_merged_features_array(self, feature_columns, fetch_size=10000):
+        """
+        Loads typed 'merged_data' columns straight into a float32 matrix, without building
+        per-row dictionaries or an intermediate DataFrame. Only rows in the typed layout
+        (schema_version set) are read; run the migration first for older rows.
+
+        Args:
+            feature_columns (list): Column names of the matrix, e.g. merged_col_map().
+            fetch_size (int, optional): Rows fetched from the server per round trip. Defaults to 10000.
+
+        Returns:
+            tuple: (keys, X, y) with keys a DataFrame of 'region_id', 'date' and 'time',
+                   X a float32 array (NaN for NULL) and y an int8 array of the target.
+        """
+        try:
+            with self.checkout() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT COUNT(*) FROM merged_data WHERE schema_version IS NOT NULL")
+                n_rows = cursor.fetchall()[0][0]
+
+                X = np.empty((n_rows, len(feature_columns)), dtype=np.float32)
+                y = np.empty(n_rows, dtype=np.int8)
+                region_ids = np.empty(n_rows, dtype=np.int32)
+                dates = []
+                times = []
+
+                cursor.execute(f"""
+                    SELECT region_id, date, time, {TARGET_COLUMN}, {', '.join(feature_columns)}
+                    FROM merged_data
+                    WHERE schema_version IS NOT NULL
+                    ORDER BY date, time, region_id
+                """)
+
+                filled = 0
+                while filled < n_rows:
+                    rows = cursor.fetchmany(min(fetch_size, n_rows - filled))
+                    if not rows:
+                        break
+                    block_end = filled + len(rows)
+                    X[filled:block_end] = np.array([row[4:] for row in rows], dtype=np.float32)
+                    y[filled:block_end] = [row[3] or 0 for row in rows]
+                    region_ids[filled:block_end] = [row[0] for row in rows]
+                    dates.extend(row[1] for row in rows)
+                    times.extend(str(row[2]).split()[-1] if row[2] is not None else None for row in rows)
+                    filled = block_end
+
+                cursor.fetchall()  # drain rows inserted after the count
+                cursor.close()
+
+                keys = pd.DataFrame({
+                    'region_id': region_ids[:filled],
+                    'date': pd.to_datetime(dates),
+                    'time': times,
+                })
+                print(f"Loaded {filled} merged rows x {len(feature_columns)} features "
+                      f"({X[:filled].nbytes / 1024 ** 2:.1f} MB float32).")
+                return keys, X[:filled], y[:filled]
+
+        except Error as e:
+            print(f"Database error loading merged features: {e}")
+            return pd.DataFrame(), np.empty((0, len(feature_columns)), dtype=np.float32), np.empty(0, dtype=np.int8)
+        except Exception as e:
+            print(f"An unexpected error occurred loading merged features: {e}")
+            return pd.DataFrame(), np.empty((0, len(feature_columns)), dtype=np.float32), np.empty(0, dtype=np.int8)
+
+
+    def get_alerts(self, weekly_fetcher=False, specific_date=None, start_date=None, end_date=None, overlapping=False):
         """
         Retrieves alert data from the 'alarms' table, joined with region names.
 
@@ -1108,56 +2146,74 @@ class DatabaseHandler:
                                    relative to the latest alert start time.
             validation_set (bool): If True, retrieves alerts only for the single latest date
                                    on which any alert started. Overrides weekly_fetcher if True.
+            start_date (datetime, optional): If given (with or without end_date), retrieves alerts
+                                             started at or after this moment. Overrides weekly_fetcher.
+            end_date (datetime, optional): If given, retrieves alerts started strictly before this moment.
+            overlapping (bool, optional): With start_date, retrieves the alerts still active after
+                                          start_date (end > start_date) instead of those started
+                                          from it on, e.g. the alarms running into a range of days.
 
         Returns:
             df (pandas.DataFrame)
         """
 
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect() 
-
-            base_query = """
-                SELECT 
-                    a.alarm_id, 
-                    a.region_id, 
-                    r.region_name, 
-                    a.start, 
-                    a.end, 
-                    a.data
-                FROM alarms a
-                JOIN regions r ON a.region_id = r.region_id
-            """
+            with self.checkout() as connection:
+                base_query = """
+                    SELECT 
+                        a.alarm_id, 
+                        a.region_id, 
+                        r.region_name, 
+                        a.start, 
+                        a.end, 
+                        a.data
+                    FROM alarms a
+                    JOIN regions r ON a.region_id = r.region_id
+                """
             
 
-            where_clause = ""
-            params = []
-
-            if specific_date:
-                date_str = specific_date.strftime('%Y-%m-%d') if hasattr(specific_date, 'strftime') else str(specific_date)
-                where_clause = "WHERE DATE(start) = %s"
-                params.append(date_str)
-                print(f"Filtering ALARMS data for specific date: {date_str}.")
-
-            elif weekly_fetcher:
-                where_clause = "WHERE a.start >= (SELECT MAX(start) - INTERVAL 7 DAY FROM alarms)"
-                print("Filtering ALARMS data for the last available day.")
-
-            sql_query = f"{base_query} {where_clause}"
-
-            df = pd.read_sql(
-                sql_query,
-                self.connection,
-                params=params if params else None, 
-                parse_dates=['start', 'end']
-            )
+                where_clause = ""
+                params = []
+
+                if specific_date:
+                    day_start = pd.Timestamp(specific_date).normalize()
+                    where_clause = "WHERE a.start >= %s AND a.start < %s"
+                    params.extend([day_start.strftime('%Y-%m-%d %H:%M:%S'),
+                                   (day_start + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')])
+                    print(f"Filtering ALARMS data for specific date: {day_start.strftime('%Y-%m-%d')}.")
+
+                elif start_date is not None or end_date is not None:
+                    conditions = []
+                    if start_date is not None:
+                        conditions.append("a.end > %s" if overlapping else "a.start >= %s")
+                        params.append(start_date.strftime('%Y-%m-%d %H:%M:%S'))
+                    if end_date is not None:
+                        conditions.append("a.start < %s")
+                        params.append(end_date.strftime('%Y-%m-%d %H:%M:%S'))
+                    where_clause = "WHERE " + " AND ".join(conditions)
+                    print(f"Filtering ALARMS data for the range {start_date} - {end_date}.")
+
+                elif weekly_fetcher:
+                    latest_start = self._max_value(connection, 'alarms', 'start')
+                    where_clause = "WHERE a.start >= %s"
+                    params.append(None if latest_start is None else latest_start - timedelta(days=7))
+                    print("Filtering ALARMS data for the last available day.")
+
+                sql_query = f"{base_query} {where_clause}"
+
+                df = pd.read_sql(
+                    sql_query,
+                    connection,
+                    params=params if params else None, 
+                    parse_dates=['start', 'end']
+                )
 
-            if df.empty:
-                print("No alarm data found.")
-            else:
-                print(f"Retrieved {len(df)} alert records.")
+                if df.empty:
+                    print("No alarm data found.")
+                else:
+                    print(f"Retrieved {len(df)} alert records.")
 
-            return df
+                return df
 
         except Error as e:
             print(f"Database error retrieving alerts: {e}")
@@ -0,0 +1,121 @@
+"""
+Typed column layout of the 'merged_data' table.
+
+Every feature the model uses is stored in its own numeric column instead of inside the JSON 'data'
+blob, which only keeps the remaining helper fields (datetime, merge keys, ...). The column list is
+versioned: rows written with a layout record its number in 'schema_version', rows written before
+the migration have it NULL and keep all their fields in 'data' until migrate_merged_data runs.
+"""
+
+from dotenv import load_dotenv
+import os
+
+MERGED_SCHEMA_VERSION = 1
+
+# (column, SQL type) per schema version, in the col_map order used for training
+MERGED_SCHEMA_VERSIONS = {
+    1: [
+        ('time_since_last_alarm_end_minutes_at_start_of_day', 'FLOAT'),
+        ('total_alarm_minutes_yesterday', 'FLOAT'),
+        ('alarms_started_yesterday', 'SMALLINT'),
+        ('alarms_started_trend', 'SMALLINT'),
+        ('was_alarm_active_end_of_yesterday', 'TINYINT'),
+        ('is_alarm_active_lag_7d', 'TINYINT'),
+        ('avg_daily_alarm_minutes_last_7_days', 'FLOAT'),
+        ('dew', 'FLOAT'),
+        ('snow', 'FLOAT'),
+        ('temp', 'FLOAT'),
+        ('precip', 'FLOAT'),
+        ('tempmax', 'FLOAT'),
+        ('tempmin', 'FLOAT'),
+        ('winddir', 'FLOAT'),
+        ('humidity', 'FLOAT'),
+        ('pressure', 'FLOAT'),
+        ('windgust', 'FLOAT'),
+        ('moonphase', 'FLOAT'),
+        ('snowdepth', 'FLOAT'),
+        ('windspeed', 'FLOAT'),
+        ('cloudcover', 'FLOAT'),
+        ('visibility', 'FLOAT'),
+        ('precipcover', 'FLOAT'),
+        ('precipprob_binary', 'TINYINT'),
+        ('rain_bin', 'TINYINT'),
+        ('snow_bin', 'TINYINT'),
+        ('rain_snow_bin', 'TINYINT'),
+        ('sunrise_seconds', 'INT'),
+        ('sunset_seconds', 'INT'),
+        ('daylight_duration_seconds', 'INT'),
+        *[(f'svd_comp_{i + 1}', 'FLOAT') for i in range(30)],
+        *[(f'svd2_comp_{i + 1}', 'FLOAT') for i in range(30)],
+        ('hour_of_day', 'TINYINT'),
+        ('day_of_week', 'TINYINT'),
+        ('month', 'TINYINT'),
+        ('is_alarm_active', 'TINYINT'),
+    ],
+}
+
+TARGET_COLUMN = 'is_alarm_active'
+KEY_COLUMNS = ['region_id', 'date', 'time']
+
+
+def merged_columns(version=MERGED_SCHEMA_VERSION):
+    """
+    Returns the (column, SQL type) pairs of a schema version.
+    """
+
+    return MERGED_SCHEMA_VERSIONS[version]
+
+
+def merged_column_names(version=MERGED_SCHEMA_VERSION):
+    """
+    Returns the typed column names of a schema version, target included.
+    """
+
+    return [name for name, _ in merged_columns(version)]
+
+
+def merged_col_map(version=MERGED_SCHEMA_VERSION):
+    """
+    Returns the model feature order: region_id followed by the typed feature columns.
+    """
+
+    return ['region_id'] + [name for name in merged_column_names(version) if name != TARGET_COLUMN]
+
+
+def migrate_merged_data(db, batch_size=5000):
+    """
+    Upgrades the 'merged_data' table to the current typed layout and moves the feature values of
+    existing rows out of their JSON blobs, batch by batch. Safe to rerun: only rows without a
+    schema_version are processed.
+
+    Args:
+        db (DatabaseHandler)
+        batch_size (int, optional): Rows converted per batch. Defaults to 5000.
+    """
+    db.upgrade_merged_data_schema()
+
+    total = 0
+    while True:
+        converted = db.convert_legacy_merged_rows(batch_size)
+        if not converted:
+            break
+        total += converted
+        print(f"Migrated {total} merged_data rows to schema version {MERGED_SCHEMA_VERSION}.")
+
+    print(f"merged_data migration finished, {total} rows converted.")
+
+
+if __name__ == '__main__':
+    from src.database.db_handler import DatabaseHandler
+
+    load_dotenv()
+    db = DatabaseHandler(
+        host=os.environ.get("DB_HOST"),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        port=os.environ.get("DB_PORT")
+    )
+    db.connect()
+    migrate_merged_data(db)
+    db.disconnect()
@@ -0,0 +1,281 @@
+"""
+On-disk Parquet snapshots of the training tables.
+
+'merged_data', 'alarms' and 'weather' are exported into one Parquet file per table and month
+(data/snapshots/<table>/<YYYY-MM>.parquet) with the JSON columns already expanded, so retraining
+and analysis can read them back without querying MySQL and parsing JSON again. Exports are
+incremental: manifest.json records the last exported date of every table, and the next export only
+fetches rows from that date on, rewriting just the month files those rows fall into. Alarms are the
+exception: their end is corrected after insertion, and long alarms are only stored once they have
+ended, possibly weeks after their start. For them the manifest records a fingerprint (row count and
+checksum) of every exported month, and each export rewrites the months whose fingerprint in the
+database has changed. The reader memory-maps the files.
+"""
+
+from dotenv import load_dotenv
+from datetime import datetime
+import json
+import os
+import pandas as pd
+import pyarrow.parquet as pq
+
+SNAPSHOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'snapshots'))
+SNAPSHOT_TABLES = ('merged_data', 'alarms', 'weather')
+MANIFEST_FILE = 'manifest.json'
+
+# column each table is partitioned and filtered by
+DATE_COLUMNS = {
+    'merged_data': 'date',
+    'alarms': 'start',
+    'weather': 'date',
+}
+
+# per-month fingerprint of the tables whose old rows may still change after insertion
+MONTH_FINGERPRINTS = {
+    'alarms': "COUNT(*), BIT_XOR(CRC32(CONCAT_WS('|', region_id, start, end, data)))",
+}
+
+
+def load_manifest(snapshot_dir=SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, snapshot_dir=SNAPSHOT_DIR):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _month_path(table, month, snapshot_dir):
+    return os.path.join(snapshot_dir, table, f"{month.strftime('%Y-%m')}.parquet")
+
+
+def _first_date(db, table):
+    """
+    Returns the earliest date of a table, or None if it is empty.
+    """
+    with db.session() as cursor:
+        cursor.execute(f"SELECT MIN({DATE_COLUMNS[table]}) FROM {table}")
+        first = cursor.fetchall()[0][0]
+    return None if first is None else pd.Timestamp(first).normalize()
+
+
+def _fetch_range(db, table, start_date, end_date):
+    """
+    Fetches the rows of a table with start_date <= date < end_date as a DataFrame.
+    """
+    if table == 'merged_data':
+        chunks = list(db.iter_merged_data(start_date=start_date, end_date=end_date))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    if table == 'alarms':
+        df = db.get_alerts(start_date=start_date, end_date=end_date)
+        return df.sort_values('start', ignore_index=True) if not df.empty else df
+    if table == 'weather':
+        return db.get_weather_data(start_date=start_date, end_date=end_date)
+    raise ValueError(f"No snapshot export defined for table '{table}'.")
+
+
+def _month_fingerprints(db, table):
+    """
+    Returns the current fingerprint of every month of a table in MONTH_FINGERPRINTS, keyed by 'YYYY-MM'.
+    """
+    with db.session() as cursor:
+        cursor.execute(f"""
+            SELECT DATE_FORMAT({DATE_COLUMNS[table]}, '%Y-%m') AS month, {MONTH_FINGERPRINTS[table]}
+            FROM {table}
+            GROUP BY month
+        """)
+        return {month: f"{count}:{checksum}" for month, count, checksum in cursor.fetchall()}
+
+
+def _export_changed_months(db, table, manifest, snapshot_dir):
+    """
+    Rewrites the month files of a table in MONTH_FINGERPRINTS whose fingerprint differs from the one
+    recorded at their last export (new months included) and records the new fingerprints.
+
+    Returns:
+        int: Number of rows exported.
+    """
+    entry = manifest.get(table, {})
+    recorded = dict(entry.get('fingerprints', {}))
+    last_date = entry.get('last_date')
+    # taken before fetching: a row written meanwhile changes the fingerprint again next time
+    fingerprints = _month_fingerprints(db, table)
+
+    exported = 0
+    for name in sorted(fingerprints):
+        if recorded.get(name) == fingerprints[name]:
+            continue
+        month = pd.Timestamp(name + '-01')
+        df = _fetch_range(db, table, month, month + pd.DateOffset(months=1))
+        if df.empty:
+            continue
+        _write_month(df, table, month, None, snapshot_dir)
+        exported += len(df)
+        recorded[name] = fingerprints[name]
+        month_last_date = df[DATE_COLUMNS[table]].max().normalize().strftime('%Y-%m-%d')
+        last_date = max(last_date or month_last_date, month_last_date)
+
+    manifest[table] = {
+        'last_date': last_date,
+        'fingerprints': recorded,
+        'exported_at': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    save_manifest(manifest, snapshot_dir)
+    print(f"Snapshot of {table}: {exported} rows exported in changed months, up to {last_date}.")
+    return exported
+
+
+def _write_month(df, table, month, resume_from, snapshot_dir):
+    """
+    Writes a month file: the rows already in the snapshot before resume_from, followed by df.
+    """
+    path = _month_path(table, month, snapshot_dir)
+    date_column = DATE_COLUMNS[table]
+
+    if resume_from is not None and os.path.exists(path):
+        existing = pd.read_parquet(path)
+        existing = existing[existing[date_column] < resume_from]
+        if not existing.empty:
+            df = pd.concat([existing, df], ignore_index=True)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return len(df)
+
+
+def export_snapshot(db, tables=SNAPSHOT_TABLES, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Brings the Parquet snapshots of the given tables up to date, month by month.
+
+    Args:
+        db (DatabaseHandler)
+        tables (iterable, optional): Tables to export. Defaults to SNAPSHOT_TABLES.
+        snapshot_dir (str, optional): Root directory of the snapshots. Defaults to data/snapshots.
+
+    Returns:
+        dict: Number of rows exported per table.
+    """
+    manifest = load_manifest(snapshot_dir)
+    exported = {}
+    today = pd.Timestamp(datetime.now().date())
+
+    for table in tables:
+        if table in MONTH_FINGERPRINTS:
+            exported[table] = _export_changed_months(db, table, manifest, snapshot_dir)
+            continue
+
+        date_column = DATE_COLUMNS[table]
+        last_date = manifest.get(table, {}).get('last_date')
+        resume_from = pd.Timestamp(last_date) if last_date is not None else None
+
+        start = resume_from if resume_from is not None else _first_date(db, table)
+        if start is None:
+            print(f"Table {table} is empty, nothing to snapshot.")
+            continue
+
+        exported[table] = 0
+        month = start.to_period('M').to_timestamp()
+        while month <= today:
+            next_month = month + pd.DateOffset(months=1)
+            df = _fetch_range(db, table, max(start, month), next_month)
+            if not df.empty:
+                _write_month(df, table, month, resume_from, snapshot_dir)
+                exported[table] += len(df)
+                last_date = df[date_column].max().normalize().strftime('%Y-%m-%d')
+            month = next_month
+
+        manifest[table] = {
+            'last_date': last_date,
+            'exported_at': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        save_manifest(manifest, snapshot_dir)
+        print(f"Snapshot of {table}: {exported[table]} rows exported, up to {last_date}.")
+
+    return exported
+
+
+def snapshot_months(table, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Returns the months available in the snapshot of a table, as sorted Timestamps.
+    """
+    table_dir = os.path.join(snapshot_dir, table)
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(pd.Timestamp(name[:-len('.parquet')] + '-01')
+                  for name in os.listdir(table_dir) if name.endswith('.parquet'))
+
+
+def iter_snapshot(table, start_date=None, end_date=None, columns=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Reads the snapshot of a table month by month through memory-mapped Parquet files.
+
+    Args:
+        table (str): One of SNAPSHOT_TABLES.
+        start_date (datetime, optional): Only rows with date >= start_date.
+        end_date (datetime, optional): Only rows with date < end_date.
+        columns (list, optional): Columns to read. Defaults to all.
+        snapshot_dir (str, optional): Root directory of the snapshots. Defaults to data/snapshots.
+
+    Yields:
+        pd.DataFrame: One frame per month, in date order.
+    """
+    date_column = DATE_COLUMNS[table]
+    read_columns = None
+    if columns is not None:
+        read_columns = list(columns) if date_column in columns else [date_column] + list(columns)
+
+    for month in snapshot_months(table, snapshot_dir):
+        next_month = month + pd.DateOffset(months=1)
+        if start_date is not None and next_month <= pd.Timestamp(start_date):
+            continue
+        if end_date is not None and month >= pd.Timestamp(end_date):
+            break
+
+        df = pq.read_table(_month_path(table, month, snapshot_dir), columns=read_columns,
+                           memory_map=True).to_pandas()
+        if start_date is not None:
+            df = df[df[date_column] >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            df = df[df[date_column] < pd.Timestamp(end_date)]
+        if columns is not None and date_column not in columns:
+            df = df.drop(columns=[date_column])
+        yield df.reset_index(drop=True)
+
+
+def read_snapshot(table, start_date=None, end_date=None, columns=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Reads the snapshot of a table into one DataFrame. Same arguments as iter_snapshot.
+
+    Returns:
+        df (pandas.DataFrame)
+    """
+    frames = list(iter_snapshot(table, start_date, end_date, columns, snapshot_dir))
+    if not frames:
+        print(f"No snapshot data found for {table}.")
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == '__main__':
+    import sys
+    from src.database.db_handler import DatabaseHandler
+
+    load_dotenv()
+    db = DatabaseHandler(
+        host=os.environ.get("DB_HOST"),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        port=os.environ.get("DB_PORT")
+    )
+    db.connect()
+    export_snapshot(db, tables=sys.argv[1:] or SNAPSHOT_TABLES)
+    db.disconnect()
@@ -0,0 +1,184 @@
+"""
+Historical backfill of 'merged_data' and 'predictions' over a range of target days.
+
+Instead of running the daily orchestrator once per day, the range is split into chunks of
+chunk_days, and every stage processes a whole chunk at once: the weather of every location is
+requested once per chunk, the alarm features are computed in one pass over all days, the ISW and
+Telegram reports are normalized and embedded in one batch each, and the chunk is predicted with a
+single predict_proba call. As in the daily run, day D uses the reports of day D - 1.
+
+Chunks are independent and can run on a process pool. Telegram messages are fetched once, by the
+parent process, before the chunks start (Telethon's session file cannot be shared between
+processes); the workers read them from the database. Every worker has its own API rate limiters,
+so the request rates grow with the number of processes. A backfill that rewrites the latest
+predicted day republishes the forecast cache served by the Flask app.
+
+Usage:
+    python -m src.forecasting.backfill --from 2024-01-01 --to 2024-06-30 --processes 2
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import os
+import pandas as pd
+from src.pipeline.weather_processor import get_and_process_weather
+from src.pipeline.alarm_processor import get_and_process_alarms
+from src.pipeline.isw_processor import get_and_process_isw_reports
+from src.pipeline.telegram_processor import fetch_telegram_messages, get_and_process_telegram_reports
+from src.forecasting.prediction_handler import process_daily_predictions
+from src.forecasting.daily_forecast_orchestrator import create_database_handler, merge_final_dataset
+from src.forecasting.stage_graph import Stage, run_stages
+from src.frontend.forecast_cache import publish_forecast_cache
+from src.pipeline.instrumentation import PipelineRun
+
+BACKFILL_CHUNK_DAYS = 31
+PREDICTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'predictions'))
+
+
+def date_chunks(start_date, end_date, chunk_days=BACKFILL_CHUNK_DAYS):
+    """
+    Splits start_date to end_date (inclusive) into consecutive (first day, last day) chunks.
+    """
+
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def backfill_chunk(start_date, end_date, text_processes=None):
+    """
+    Rebuilds the merged data and predictions of the target days start_date to end_date.
+
+    Args:
+        start_date (datetime): First target day.
+        end_date (datetime): Last target day.
+        text_processes (int, optional): Worker processes for the text normalization.
+
+    Returns:
+        int: Number of merged (and predicted) rows.
+    """
+    db = create_database_handler()
+    db.connect()
+    report_start = start_date - timedelta(days=1)
+    report_end = end_date - timedelta(days=1)
+
+    async def telegram_stage(inputs):
+        return await get_and_process_telegram_reports(report_start, db, end_date=report_end, fetch=False,
+                                                      processes=text_processes)
+
+    stages = [
+        Stage('weather', lambda inputs: get_and_process_weather(start_date, db, end_date=end_date)),
+        Stage('alarms', lambda inputs: get_and_process_alarms(list(pd.date_range(start_date, end_date, freq='D')), db)),
+        Stage('isw', lambda inputs: get_and_process_isw_reports(report_start, db, end_date=report_end,
+                                                               processes=text_processes)),
+        Stage('telegram', telegram_stage),
+        Stage('merge', lambda inputs: merge_final_dataset(inputs['weather'], inputs['alarms'], inputs['isw'],
+                                                          inputs['telegram'], db),
+              depends_on=('weather', 'alarms', 'isw', 'telegram')),
+        Stage('predict', lambda inputs: process_daily_predictions(inputs['merge'], db), depends_on=('merge',)),
+    ]
+    run = PipelineRun('backfill', start_date)
+    try:
+        with run.activate():
+            results, timings = asyncio.run(run_stages(stages))
+    finally:
+        run.write_report()
+        run.save(db)
+        db.disconnect()
+    return len(results['merge'])
+
+
+def run_backfill(start_date, end_date, chunk_days=BACKFILL_CHUNK_DAYS, processes=None, text_processes=None,
+                 fetch_telegram=True):
+    """
+    Backfills the target days start_date to end_date, chunk_days at a time.
+
+    Args:
+        start_date (datetime): First target day.
+        end_date (datetime): Last target day.
+        chunk_days (int, optional): Target days per chunk.
+        processes (int, optional): Chunks run in parallel. Defaults to None (one at a time).
+        text_processes (int, optional): Worker processes for the text normalization of a chunk.
+        fetch_telegram (bool, optional): Fetch the Telegram messages of the range first.
+
+    Returns:
+        dict: Maps every chunk (first day, last day) to its number of rows, or None if it failed.
+    """
+    if fetch_telegram:
+        db = create_database_handler()
+        db.connect()
+        try:
+            asyncio.run(fetch_telegram_messages(start_date - timedelta(days=1), db,
+                                                end_date=end_date - timedelta(days=1)))
+        finally:
+            db.disconnect()
+
+    chunks = date_chunks(start_date, end_date, chunk_days)
+    print(f"Backfilling {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d} in {len(chunks)} chunks.")
+
+    summary = {}
+    if processes and processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {chunk: executor.submit(backfill_chunk, *chunk, text_processes) for chunk in chunks}
+            for chunk, future in futures.items():
+                try:
+                    summary[chunk] = future.result()
+                except Exception as e:
+                    print(f"Backfill of {chunk[0]:%Y-%m-%d} - {chunk[1]:%Y-%m-%d} failed: {e}")
+                    summary[chunk] = None
+    else:
+        for chunk in chunks:
+            try:
+                summary[chunk] = backfill_chunk(*chunk, text_processes)
+            except Exception as e:
+                print(f"Backfill of {chunk[0]:%Y-%m-%d} - {chunk[1]:%Y-%m-%d} failed: {e}")
+                summary[chunk] = None
+
+    print("\n===== BACKFILL SUMMARY =====")
+    for (chunk_start, chunk_end), rows in summary.items():
+        print(f"  {chunk_start:%Y-%m-%d} - {chunk_end:%Y-%m-%d}: {'failed' if rows is None else f'{rows} rows'}")
+
+    if any(rows for rows in summary.values()):
+        republish_if_latest(end_date)
+    return summary
+
+
+def republish_if_latest(end_date):
+    """
+    Republishes the forecast cache if the backfill covered the latest predicted day, whose
+    predictions the Flask app would otherwise keep serving from the previous publication.
+    """
+    db = create_database_handler()
+    db.connect()
+    try:
+        latest_date = db.get_latest_prediction_date()
+        if latest_date is not None and latest_date <= pd.Timestamp(end_date):
+            publish_forecast_cache(db, PREDICTIONS_DIR)
+    finally:
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild merged_data and predictions over a range of days.")
+    parser.add_argument('--from', dest='start_date', required=True, type=lambda s: datetime.strptime(s, '%Y-%m-%d'),
+                        help="First target day (YYYY-MM-DD).")
+    parser.add_argument('--to', dest='end_date', required=True, type=lambda s: datetime.strptime(s, '%Y-%m-%d'),
+                        help="Last target day (YYYY-MM-DD), inclusive.")
+    parser.add_argument('--chunk-days', type=int, default=BACKFILL_CHUNK_DAYS, help="Target days per chunk.")
+    parser.add_argument('--processes', type=int, default=1, help="Chunks run in parallel.")
+    parser.add_argument('--text-processes', type=int, default=None,
+                        help="Worker processes for the text normalization of a chunk.")
+    parser.add_argument('--skip-telegram-fetch', action='store_true',
+                        help="Use the Telegram messages already in the database.")
+    args = parser.parse_args()
+
+    if args.end_date < args.start_date:
+        parser.error("--to must not be before --from")
+    run_backfill(args.start_date, args.end_date, chunk_days=args.chunk_days, processes=args.processes,
+                 text_processes=args.text_processes, fetch_telegram=not args.skip_telegram_fetch)
@@ -0,0 +1,110 @@
+"""
+On-disk checkpoints of the orchestrator's stage outputs.
+
+Every checkpointed stage writes its prepared DataFrame to
+data/checkpoints/<target date>/<stage>.<version>.parquet, where the version is a hash of the
+stage's source code. A rerun for the same target date loads the DataFrame instead of running the
+stage again (and calling its external API again), unless the stage is forced or its code changed.
+Frames that Parquet cannot store (mixed-type object columns) are pickled instead. Checkpoints of
+target dates older than CHECKPOINT_RETENTION_DAYS are deleted.
+"""
+
+import hashlib
+import inspect
+import os
+import shutil
+from datetime import datetime, timedelta
+import pandas as pd
+
+CHECKPOINT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'checkpoints'))
+CHECKPOINT_RETENTION_DAYS = 7
+CHECKPOINT_FORMATS = ('parquet', 'pkl')
+
+
+def source_version(*objects):
+    """
+    Returns a short hash of the source files that define the given functions, classes or modules.
+    """
+
+    digest = hashlib.sha1()
+    for path in sorted({inspect.getsourcefile(obj) for obj in objects}):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+class StageCheckpoints:
+    """
+    The checkpoints of one target date.
+    """
+
+    def __init__(self, target_date, checkpoint_dir=CHECKPOINT_DIR, retention_days=CHECKPOINT_RETENTION_DAYS):
+        """
+        Args:
+            target_date (datetime): Target date of the run.
+            checkpoint_dir (str, optional): Root directory of all checkpoints.
+            retention_days (int, optional): Target dates kept, counted back from target_date.
+        """
+
+        self.target_date = target_date
+        self.checkpoint_dir = checkpoint_dir
+        self.retention_days = retention_days
+        self.directory = os.path.join(checkpoint_dir, target_date.strftime('%Y-%m-%d'))
+
+    def _path(self, stage_name, version, fmt):
+        return os.path.join(self.directory, f"{stage_name}.{version}.{fmt}")
+
+    def load(self, stage_name, version):
+        """
+        Returns the checkpointed DataFrame of a stage, or None if there is none for this version.
+        """
+        for fmt in CHECKPOINT_FORMATS:
+            path = self._path(stage_name, version, fmt)
+            if not os.path.exists(path):
+                continue
+            try:
+                return pd.read_parquet(path) if fmt == 'parquet' else pd.read_pickle(path)
+            except Exception as e:
+                print(f"Could not read checkpoint {path}: {e}")
+        return None
+
+    def save(self, stage_name, version, df):
+        """
+        Writes the DataFrame of a stage, replacing its checkpoints of other versions. Failures are
+        reported and otherwise ignored: a missing checkpoint only means the stage runs again.
+        """
+        if not isinstance(df, pd.DataFrame):
+            print(f"Stage '{stage_name}' did not return a DataFrame, no checkpoint written.")
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        for filename in os.listdir(self.directory):
+            if filename.startswith(stage_name + '.'):
+                os.remove(os.path.join(self.directory, filename))
+
+        path = self._path(stage_name, version, 'parquet')
+        try:
+            df.to_parquet(path + '.tmp')
+        except Exception:
+            path = self._path(stage_name, version, 'pkl')
+            try:
+                df.to_pickle(path + '.tmp', compression=None)
+            except Exception as e:
+                print(f"Could not write the checkpoint of stage '{stage_name}': {e}")
+                return
+        os.replace(path + '.tmp', path)
+        print(f"Checkpointed stage '{stage_name}' to {path}")
+        self.prune()
+
+    def prune(self):
+        """
+        Deletes the checkpoints of target dates more than retention_days before target_date.
+        """
+        oldest = (self.target_date - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+        for name in os.listdir(self.checkpoint_dir):
+            try:
+                datetime.strptime(name, '%Y-%m-%d')
+            except ValueError:
+                continue
+            if name < oldest:
+                shutil.rmtree(os.path.join(self.checkpoint_dir, name), ignore_errors=True)
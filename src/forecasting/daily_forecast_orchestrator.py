@@ -2,9 +2,19 @@ from src.pipeline.weather_processor import get_and_process_weather
 from src.pipeline.alarm_processor import get_and_process_alarms, get_and_process_validation_set
 from src.pipeline.isw_processor import get_and_process_isw_reports
 from src.pipeline.telegram_processor import get_and_process_telegram_reports
+from src.pipeline import alarm_features, text_artifacts, text_embedder, text_normalizer
+from src.data_receiver.alarms_receiver import UkraineAlarmAPIClient
+from src.data_receiver.isw_receiver import ISWDataCollector
+from src.data_receiver.telegram_receiver import TelegramFetcher
+from src.data_receiver.weather_receiver import WeatherDataCollector
 from src.forecasting.prediction_handler import process_daily_predictions
+from src.frontend.forecast_cache import publish_forecast_cache
 from src.database.db_handler import DatabaseHandler
+from src.forecasting.stage_graph import Stage, run_stages
+from src.forecasting.checkpoints import StageCheckpoints, source_version
+from src.pipeline.instrumentation import PipelineRun
 from dotenv import load_dotenv
+import argparse
 import json
 import os
 import pandas as pd
@@ -20,47 +30,7 @@ warnings.filterwarnings(
     category=UserWarning,
 )
 
-# we use async here to ensure that modules related to Telegram data collection work properly 
-# (due to the specifics of the telethon library)
-async def prepare_final_dataset(): 
-    load_dotenv()
-    db_host = os.environ.get("DB_HOST")
-    db_name = os.environ.get("DB_NAME")
-    db_user = os.environ.get("DB_USER")
-    db_password = os.environ.get("DB_PASSWORD")
-    db_port = os.environ.get("DB_PORT")
-    db = DatabaseHandler(
-        host=db_host,
-        database=db_name,
-        user=db_user,
-        password=db_password,
-        port=db_port
-    )
-    db.connect()
-    print("\n===== DATABASE CONNECTION ESTABLISHED =====")
-
-    today_target_date = datetime.strptime(datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
-    yesterday_target_date = today_target_date - timedelta(days=1)
-    timestamp_for_filename = today_target_date.strftime("%Y-%m-%d")
-    timestamp_for_metrics = pd.Timestamp(yesterday_target_date)
-    print(f"\n===== TARGET DATETIME: {timestamp_for_filename} =====")
-    
-    print("\n===== STEP 1: PROCESSING WEATHER =====")
-    weather_prepared = get_and_process_weather(today_target_date, db)
-
-    
-    print("\n===== STEP 2: PROCESSING ALARM FEATURES =====")
-    alarms_features_prepared = get_and_process_alarms(today_target_date, db)
-
-    
-    print("\n===== STEP 3: PROCESSING ISW REPORTS =====")
-    isw_prepared = get_and_process_isw_reports(yesterday_target_date, db)
-
-    
-    print("\n===== STEP 4: PROCESSING TELEGRAM REPORTS =====")
-    telegram_prepared  = await get_and_process_telegram_reports(yesterday_target_date, db)
-
-    
+def merge_final_dataset(weather_prepared, alarms_features_prepared, isw_prepared, telegram_prepared, db):
     print("\n===== STEP 5: MERGING FINAL DATASET =====")
     weather_prepared['datetime'] = pd.to_datetime(weather_prepared['datetime'], errors='coerce')
     alarms_features_prepared['datetime'] = pd.to_datetime(alarms_features_prepared['datetime'], errors='coerce')
@@ -101,7 +71,10 @@ async def prepare_final_dataset():
     merged_v3['month'] = merged_v3['datetime'].dt.month
 
     db.insert_merged_data(merged_v3) 
-    
+    return merged_v3
+
+
+def publish_daily_predictions(merged_v3, db, timestamp_for_filename):
     print("\n===== STEP 6: PROCESSING DAILY PREDICTIONS =====")
     process_daily_predictions(merged_v3, db)
 
@@ -126,7 +99,12 @@ async def prepare_final_dataset():
     with open(json_filepath_abs, "w", encoding='utf-8') as f:
         json.dump(final_json, f, indent=2)
 
-    
+    # prebuilt API response, served by the Flask app until the next run
+    publish_forecast_cache(db, predictions_dir_abs)
+
+
+def evaluate_yesterday_predictions(db, yesterday_target_date):
+    timestamp_for_metrics = pd.Timestamp(yesterday_target_date)
     print("\n===== STEP 7: EVALUATING YESTERDAY'S PREDICTIONS =====")    
     # we get predictions for yesterday and evaluate them based on the actual alarm information that happened yesterday that we got today.
     predictions_validate = db.get_predictions(specific_date=yesterday_target_date)
@@ -160,9 +138,101 @@ async def prepare_final_dataset():
         db.insert_metrics(yesterday_target_date, 'hgb_v3', accuracy, precision, recall, f1_score, roc_auc, conf_matrix_json)
         print(db.get_metrics(daily_fetcher=True))
 
-    print("\n===== DATABASE CONNECTION CLOSED =====")  
-    db.disconnect()
+
+def create_database_handler():
+    """
+    Returns a DatabaseHandler configured from the environment, pooled since the concurrent
+    stages use the database from several threads.
+    """
+    load_dotenv()
+    db_host = os.environ.get("DB_HOST")
+    db_name = os.environ.get("DB_NAME")
+    db_user = os.environ.get("DB_USER")
+    db_password = os.environ.get("DB_PASSWORD")
+    db_port = os.environ.get("DB_PORT")
+    db_pool_size = int(os.environ.get("DB_POOL_SIZE", 8))
+    return DatabaseHandler(
+        host=db_host,
+        database=db_name,
+        user=db_user,
+        password=db_password,
+        port=db_port,
+        pool_size=db_pool_size
+    )
+
+
+# we use async here to ensure that modules related to Telegram data collection work properly 
+# (due to the specifics of the telethon library)
+async def prepare_final_dataset(force_stages=(), profile=False, trace_memory=False):
+    """
+    Runs the daily pipeline for today. The prepared data of steps 1-4 is checkpointed under
+    data/checkpoints/<date>/, so a rerun on the same day only repeats the stages that failed.
+    The time, memory and rows of every stage are stored in 'pipeline_runs' and in a JSON report
+    under data/pipeline_runs/.
+
+    Args:
+        force_stages (iterable, optional): Checkpointed stages to run again anyway, or 'all'.
+        profile (bool, optional): Dump a cProfile of every stage. Defaults to False.
+        trace_memory (bool, optional): Also record the traced Python allocations. Defaults to False.
+    """
+    db = create_database_handler()
+    db.connect()
+    print("\n===== DATABASE CONNECTION ESTABLISHED =====")
+
+    today_target_date = datetime.strptime(datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+    yesterday_target_date = today_target_date - timedelta(days=1)
+    timestamp_for_filename = today_target_date.strftime("%Y-%m-%d")
+    print(f"\n===== TARGET DATETIME: {timestamp_for_filename} =====")
+
+    # the Telethon client runs on this event loop, the other stages in worker threads
+    async def telegram_stage(inputs):
+        return await get_and_process_telegram_reports(yesterday_target_date, db)
+
+    # steps 1-4 fetch from independent services and run concurrently, joined before the merge;
+    # their results are checkpointed per target date and version of the code they run: the
+    # processor, its data receiver, the feature modules it calls and the database handler
+    text_modules = (text_normalizer, text_embedder, text_artifacts)
+    stages = [
+        Stage('weather', lambda inputs: get_and_process_weather(today_target_date, db),
+              version=source_version(get_and_process_weather, WeatherDataCollector, DatabaseHandler)),
+        Stage('alarms', lambda inputs: get_and_process_alarms(today_target_date, db),
+              version=source_version(get_and_process_alarms, alarm_features, UkraineAlarmAPIClient, DatabaseHandler)),
+        Stage('isw', lambda inputs: get_and_process_isw_reports(yesterday_target_date, db),
+              version=source_version(get_and_process_isw_reports, ISWDataCollector, *text_modules, DatabaseHandler)),
+        Stage('telegram', telegram_stage,
+              version=source_version(get_and_process_telegram_reports, TelegramFetcher, *text_modules, DatabaseHandler)),
+        Stage('merge', lambda inputs: merge_final_dataset(inputs['weather'], inputs['alarms'], inputs['isw'],
+                                                          inputs['telegram'], db),
+              depends_on=('weather', 'alarms', 'isw', 'telegram')),
+        Stage('predict', lambda inputs: publish_daily_predictions(inputs['merge'], db, timestamp_for_filename),
+              depends_on=('merge',)),
+        Stage('evaluate', lambda inputs: evaluate_yesterday_predictions(db, yesterday_target_date),
+              depends_on=('predict',)),
+    ]
+    if 'all' in force_stages:
+        force_stages = [stage.name for stage in stages if stage.version is not None]
+    run = PipelineRun('daily_forecast', today_target_date, profile=profile, trace_memory=trace_memory)
+    try:
+        with run.activate():
+            await run_stages(stages, checkpoints=StageCheckpoints(today_target_date), force_stages=force_stages)
+    finally:
+        run.print_summary()
+        run.write_report()
+        run.save(db)
+
+        print("\n===== DATABASE CONNECTION CLOSED =====")  
+        db.disconnect()
     
 
 if __name__ == "__main__":
-    asyncio.run(prepare_final_dataset())
+    parser = argparse.ArgumentParser(description="Daily alarm forecast pipeline.")
+    parser.add_argument('--force-stage', action='append', default=[],
+                        choices=['weather', 'alarms', 'isw', 'telegram', 'all'],
+                        help="Run a checkpointed stage again even if today's checkpoint exists (repeatable).")
+    parser.add_argument('--profile', action='store_true',
+                        help="Dump a cProfile of every stage to data/pipeline_runs/profiles/.")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Also record the peak of traced Python allocations per stage (slower).")
+    args = parser.parse_args()
+    asyncio.run(prepare_final_dataset(force_stages=args.force_stage, profile=args.profile,
+                                      trace_memory=args.trace_memory))
@@ -0,0 +1,96 @@
+"""
+In-process cache of the unpickled models and scalers stored in the 'model_versions' table.
+
+A model version is loaded from its LONGBLOBs and unpickled once per process and then shared by all
+callers. Every lookup first asks the database for the version's checksum (MD5 of both blobs,
+computed by the server so the blobs are not transferred) and reloads only when it differs from the
+cached one, i.e. when the row was replaced. When a newer model version appears, load_latest
+switches to it and drops the older cached versions.
+"""
+
+import hashlib
+import pickle
+import threading
+
+
+def blob_checksum(model_blob, scaler_blob):
+    """
+    Returns the checksum of a model's blobs, equal to CONCAT(MD5(model_blob), MD5(scaler_blob)) in MySQL.
+    """
+
+    return hashlib.md5(model_blob).hexdigest() + hashlib.md5(scaler_blob).hexdigest()
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._models = {}  # model_version -> (checksum, model, scaler)
+        self._lock = threading.Lock()
+
+    def load(self, db_handler, model_version):
+        """
+        Returns the unpickled model and scaler of a model version, from the cache when its
+        checksum is unchanged.
+
+        Args:
+            db_handler (DatabaseHandler)
+            model_version (str): The version of the model to load.
+
+        Returns:
+            tuple: (model, scaler), or (None, None) if the version does not exist.
+        """
+        checksum = db_handler.get_model_checksum(model_version)
+        if checksum is None:
+            print(f"Model version {model_version} not found.")
+            return None, None
+
+        with self._lock:
+            cached = self._models.get(model_version)
+            if cached is not None and cached[0] == checksum:
+                return cached[1], cached[2]
+
+            model_blob, scaler_blob = db_handler.get_model_by_version(model_version)
+            if model_blob is None:
+                return None, None
+
+            model = pickle.loads(model_blob)
+            scaler = pickle.loads(scaler_blob)
+            # keyed by the checksum of the bytes actually loaded, in case the row changed in between
+            self._models[model_version] = (blob_checksum(model_blob, scaler_blob), model, scaler)
+            print(f"Loaded model version {model_version} into the model cache.")
+            return model, scaler
+
+    def load_latest(self, db_handler):
+        """
+        Returns the most recently trained model version with its model and scaler, and evicts
+        the other cached versions once a newer one is found.
+
+        Returns:
+            tuple: (model_version, model, scaler), or (None, None, None) if there is no model.
+        """
+        model_info = db_handler.get_model_info(daily_fetcher=True)
+        if model_info.empty:
+            return None, None, None
+
+        model_version = model_info['model_version'].iloc[-1]
+        model, scaler = self.load(db_handler, model_version)
+
+        with self._lock:
+            for cached_version in list(self._models):
+                if cached_version != model_version:
+                    del self._models[cached_version]
+
+        return model_version, model, scaler
+
+    def invalidate(self, model_version=None):
+        """
+        Drops a cached model version, or all of them.
+        """
+        with self._lock:
+            if model_version is None:
+                self._models.clear()
+            else:
+                self._models.pop(model_version, None)
+
+
+# shared by every caller in the process
+model_registry = ModelRegistry()
@@ -1,11 +1,10 @@
 import pandas as pd
-import pickle
 import json
+from src.forecasting.model_registry import model_registry
 
 def process_daily_predictions(df, db_handler):
-    mod, scal = db_handler.get_model_by_version('hgb_v3')
-    loaded_model = pickle.loads(mod)
-    loaded_scaler = pickle.loads(scal)
+    # unpickled once per process, reloaded only if the stored blobs change
+    loaded_model, loaded_scaler = model_registry.load(db_handler, 'hgb_v3')
     
     target_column = 'is_alarm_active'
     
@@ -1,23 +1,195 @@
+"""
+This module is responsible for retraining the model every week on the merged dataset, including
+the new data received during that week.
+
+Loading the whole merged dataset at once does not fit into the RAM of the ec2 instance, so by
+default the loading phase runs out of core: merged_data is streamed in chunks, the StandardScaler
+is fitted incrementally with partial_fit, and the float32 training matrix is written to a
+memory-mapped file under data/retrain instead of being held in memory. Training itself is not
+out of core: HistGradientBoostingClassifier.fit makes an in-memory float64 copy of the matrix.
+The retrain therefore fails up front when that copy would exceed max_memory_mb, unless
+max_train_rows explicitly limits training to the most recent rows. Peak RSS is reported after
+every stage.
+
+With use_snapshot=True the data is read from the Parquet snapshot of merged_data
+(src/database/snapshot.py) instead of MySQL; evaluate_model reads its holdout range the same way.
+"""
+
 from dotenv import load_dotenv
 import os
 from src.database.db_handler import DatabaseHandler
+from src.database.merged_schema import merged_col_map, TARGET_COLUMN
+from src.database.snapshot import iter_snapshot, read_snapshot
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, roc_auc_score
 from datetime import datetime
+import numpy as np
+import pandas as pd
 import pytz
 import pickle
+import shutil
+import tempfile
+from src.pipeline.instrumentation import peak_rss_mb
 
-"""
-It is planned that this module will be responsible for retraining the model every week based 
-on the new data received during that week. At the moment, this module is in prototype status 
-and is not executed due to technical limitations - ec2 instance in current configuration is 
-not able to process data volumes similar to our merged dataset due to lack of RAM. 
+RETRAIN_WORK_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'retrain'))
+DEFAULT_MAX_MEMORY_MB = 1536
+CHUNK_MEMORY_MB = 128
 
-At the moment, we can consider our project as MVP - it has enough features to be usable by early 
-customers, and potential additional features like model retraining can be realized in the future.
-"""
+# HistGradientBoostingClassifier converts X to float64 (8 bytes per value) and bins it to uint8
+# (1 byte per value), and keeps a handful of float32/float64 arrays (gradients, raw predictions,
+# sample weights) per row
+_HGB_BYTES_PER_VALUE = 9
+_HGB_BYTES_PER_ROW = 64
+
+
+def report_memory(stage):
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"[retrain] {stage}: peak RSS {peak:.0f} MB")
+
+
+def merged_chunks(db, col_map, use_snapshot=False, start_date=None, end_date=None,
+                  chunk_memory_mb=CHUNK_MEMORY_MB):
+    """
+    Yields 'merged_data' chunks with the col_map features and the target, in date order, either
+    streamed from the database or read month by month from the Parquet snapshot.
+    """
+    columns = [column for column in col_map if column != 'region_id'] + [TARGET_COLUMN]
+    if use_snapshot:
+        return iter_snapshot('merged_data', start_date=start_date, end_date=end_date,
+                             columns=['region_id'] + columns)
+    return db.iter_merged_data(start_date=start_date, end_date=end_date, columns=columns,
+                               max_memory_mb=chunk_memory_mb)
+
+
+def build_training_memmap(chunks, col_map, work_dir, chunk_memory_mb=CHUNK_MEMORY_MB):
+    """
+    Writes 'merged_data' chunks into a float32 feature matrix on disk, fitting the scaler on the
+    way, and standardizes the matrix in place.
+
+    Args:
+        chunks (iterable): DataFrames with the col_map features and the target, see merged_chunks.
+        col_map (list): Feature columns of the matrix, e.g. merged_col_map().
+        work_dir (str): Directory of the memory-mapped matrix file.
+        chunk_memory_mb (float, optional): Memory budget of one scaling block.
+
+    Returns:
+        tuple: (X, y, scaler) with X a scaled float32 np.memmap of shape (rows, features),
+               y an int8 array of the target and scaler the fitted StandardScaler.
+    """
+    matrix_path = os.path.join(work_dir, 'X.float32')
+    scaler = StandardScaler()
+    targets = []
+    n_rows = 0
+
+    # pass 1: append raw feature rows to the file and fit the scaler chunk by chunk
+    with open(matrix_path, 'wb') as f:
+        for chunk in chunks:
+            X_chunk = np.ascontiguousarray(chunk[col_map].to_numpy(dtype=np.float32))
+            scaler.partial_fit(X_chunk)
+            f.write(X_chunk.tobytes())
+            targets.append(chunk[TARGET_COLUMN].fillna(0).to_numpy(dtype=np.int8))
+            n_rows += len(X_chunk)
+            del chunk, X_chunk
+
+    y = np.concatenate(targets) if targets else np.empty(0, dtype=np.int8)
+    print(f"Streamed {n_rows} merged rows x {len(col_map)} features to {matrix_path} "
+          f"({n_rows * len(col_map) * 4 / 1024 ** 2:.1f} MB on disk).")
+    report_memory('matrix written')
+
+    if n_rows == 0:
+        return np.empty((0, len(col_map)), dtype=np.float32), y, scaler
+
+    # pass 2: standardize the memory-mapped matrix in place, block by block
+    X = np.memmap(matrix_path, dtype=np.float32, mode='r+', shape=(n_rows, len(col_map)))
+    block_rows = max(1000, int(chunk_memory_mb * 1024 ** 2 // (len(col_map) * 4 * 2)))
+    for offset in range(0, n_rows, block_rows):
+        X[offset:offset + block_rows] = scaler.transform(X[offset:offset + block_rows])
+    X.flush()
+    report_memory('matrix scaled')
 
-def retrain_model_weekly():
+    return X, y, scaler
+
+
+def training_row_limit(n_features, max_memory_mb):
+    """
+    Returns how many rows the classifier can be trained on within max_memory_mb.
+
+    Raises:
+        ValueError: If the budget does not leave room for a single row next to the loading chunks.
+    """
+
+    bytes_per_row = n_features * _HGB_BYTES_PER_VALUE + _HGB_BYTES_PER_ROW
+    budget = max_memory_mb * 1024 ** 2 - CHUNK_MEMORY_MB * 1024 ** 2
+    row_limit = int(budget // bytes_per_row)
+    if row_limit <= 0:
+        raise ValueError(f"max_memory_mb={max_memory_mb} leaves no room for training rows, "
+                         f"it must exceed the {CHUNK_MEMORY_MB} MB used to load the chunks.")
+    return row_limit
+
+
+def evaluate_model(model, scaler, start_date, end_date, db=None, use_snapshot=True, threshold=0.45):
+    """
+    Scores a model on the 'merged_data' rows of a date range with the metrics of the daily evaluation.
+
+    Args:
+        model: Fitted classifier.
+        scaler: Scaler fitted with the model.
+        start_date (datetime): First day of the evaluation range.
+        end_date (datetime): Day after the evaluation range.
+        db (DatabaseHandler, optional): Needed when use_snapshot is False.
+        use_snapshot (bool, optional): Read from the Parquet snapshot instead of the database. Defaults to True.
+        threshold (float, optional): Probability above which an alarm is predicted. Defaults to 0.45.
+
+    Returns:
+        dict: accuracy, precision, recall, f1_score, roc_auc and conf_matrix.
+    """
+    col_map = merged_col_map()
+    if use_snapshot:
+        df = read_snapshot('merged_data', start_date=start_date, end_date=end_date,
+                           columns=col_map + [TARGET_COLUMN])
+    else:
+        chunks = list(merged_chunks(db, col_map, start_date=start_date, end_date=end_date))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    if df.empty:
+        print("No merged data in the evaluation range.")
+        return {}
+
+    X = scaler.transform(df[col_map].to_numpy(dtype=np.float32))
+    actual_values = df[TARGET_COLUMN].fillna(0).to_numpy(dtype=np.int8)
+    probabilities = model.predict_proba(X)[:, 1]
+    predicted_values = (probabilities > threshold).astype(int)
+
+    return {
+        'accuracy': accuracy_score(actual_values, predicted_values),
+        'precision': precision_score(actual_values, predicted_values, zero_division=0),
+        'recall': recall_score(actual_values, predicted_values, zero_division=0),
+        'f1_score': f1_score(actual_values, predicted_values, zero_division=0),
+        'roc_auc': roc_auc_score(actual_values, probabilities),
+        'conf_matrix': confusion_matrix(actual_values, predicted_values).tolist(),
+    }
+
+
+def retrain_model_weekly(out_of_core=True, max_memory_mb=DEFAULT_MAX_MEMORY_MB, work_dir=RETRAIN_WORK_DIR,
+                         use_snapshot=False, max_train_rows=None):
+    """
+    Retrains the HistGradientBoostingClassifier on all of 'merged_data' and stores it with its
+    scaler as a new model version.
+
+    Args:
+        out_of_core (bool, optional): Stream the data through a memory-mapped matrix on disk.
+                                      If False, the whole matrix is loaded into memory. Defaults to True.
+        max_memory_mb (float, optional): Peak memory budget of the out-of-core retrain. If the
+                                         classifier's copy of the training matrix would exceed it,
+                                         the retrain raises a ValueError. Defaults to DEFAULT_MAX_MEMORY_MB.
+        work_dir (str, optional): Directory for the memory-mapped matrix. Defaults to data/retrain.
+        use_snapshot (bool, optional): Read merged_data from the Parquet snapshot instead of the
+                                       database. Defaults to False.
+        max_train_rows (int, optional): Train the out-of-core model on at most this many of the
+                                        most recent rows (the scaler still sees all of them).
+                                        Defaults to None (all rows).
+    """
     load_dotenv()
     db_host = os.environ.get("DB_HOST")
     db_name = os.environ.get("DB_NAME")
@@ -34,126 +206,9 @@ def retrain_model_weekly():
     db.connect()
 
 
-    col_map = ['region_id',
-     'time_since_last_alarm_end_minutes_at_start_of_day',
-     'total_alarm_minutes_yesterday',
-     'alarms_started_yesterday',
-     'alarms_started_trend',
-     'was_alarm_active_end_of_yesterday',
-     'is_alarm_active_lag_7d',
-     'avg_daily_alarm_minutes_last_7_days',
-     'dew',
-     'snow',
-     'temp',
-     'precip',
-     'tempmax',
-     'tempmin',
-     'winddir',
-     'humidity',
-     'pressure',
-     'windgust',
-     'moonphase',
-     'snowdepth',
-     'windspeed',
-     'cloudcover',
-     'visibility',
-     'precipcover',
-     'precipprob_binary',
-     'rain_bin',
-     'snow_bin',
-     'rain_snow_bin',
-     'sunrise_seconds',
-     'sunset_seconds',
-     'daylight_duration_seconds',
-     'svd_comp_1',
-     'svd_comp_2',
-     'svd_comp_3',
-     'svd_comp_4',
-     'svd_comp_5',
-     'svd_comp_6',
-     'svd_comp_7',
-     'svd_comp_8',
-     'svd_comp_9',
-     'svd_comp_10',
-     'svd_comp_11',
-     'svd_comp_12',
-     'svd_comp_13',
-     'svd_comp_14',
-     'svd_comp_15',
-     'svd_comp_16',
-     'svd_comp_17',
-     'svd_comp_18',
-     'svd_comp_19',
-     'svd_comp_20',
-     'svd_comp_21',
-     'svd_comp_22',
-     'svd_comp_23',
-     'svd_comp_24',
-     'svd_comp_25',
-     'svd_comp_26',
-     'svd_comp_27',
-     'svd_comp_28',
-     'svd_comp_29',
-     'svd_comp_30',
-     'svd2_comp_1',
-     'svd2_comp_2',
-     'svd2_comp_3',
-     'svd2_comp_4',
-     'svd2_comp_5',
-     'svd2_comp_6',
-     'svd2_comp_7',
-     'svd2_comp_8',
-     'svd2_comp_9',
-     'svd2_comp_10',
-     'svd2_comp_11',
-     'svd2_comp_12',
-     'svd2_comp_13',
-     'svd2_comp_14',
-     'svd2_comp_15',
-     'svd2_comp_16',
-     'svd2_comp_17',
-     'svd2_comp_18',
-     'svd2_comp_19',
-     'svd2_comp_20',
-     'svd2_comp_21',
-     'svd2_comp_22',
-     'svd2_comp_23',
-     'svd2_comp_24',
-     'svd2_comp_25',
-     'svd2_comp_26',
-     'svd2_comp_27',
-     'svd2_comp_28',
-     'svd2_comp_29',
-     'svd2_comp_30',
-     'hour_of_day',
-     'day_of_week',
-     'month']
-
-    df = db.get_merged_data(col_map=col_map)
-
-    target_column = 'is_alarm_active'
-
-    potential_features = df.columns.tolist()
-    features_to_exclude = [
-        target_column,
-        'datetime',
-        'date_x',
-        'date_y',
-        'time',
-        'date',
-        'date_value',
-        'date_for_merge',
-        'time_value',
-        'severerisk',
-        'report_id'
-    ]
-
-    feature_columns = [col for col in potential_features if col not in features_to_exclude]
-
-    X = df[feature_columns]
-    y = df[target_column]
-
-    final_scaler = StandardScaler()
+    # region_id followed by the typed merged_data feature columns
+    col_map = merged_col_map()
+
     final_model_hgb = HistGradientBoostingClassifier(
      loss='log_loss',
      learning_rate=0.01,
@@ -168,8 +223,54 @@ def retrain_model_weekly():
      min_samples_leaf=40,
      random_state=1
     )
-    X_scaled_final = final_scaler.fit_transform(X)
-    final_model_hgb.fit(X_scaled_final, y)
+
+    if out_of_core:
+        # checked before loading anything, it raises on a budget too small to train at all
+        row_limit = training_row_limit(len(col_map), max_memory_mb)
+        os.makedirs(work_dir, exist_ok=True)
+        run_dir = tempfile.mkdtemp(prefix='retrain_', dir=work_dir)
+        try:
+            chunks = merged_chunks(db, col_map, use_snapshot=use_snapshot)
+            X, y, final_scaler = build_training_memmap(chunks, col_map, run_dir)
+            db.disconnect()
+            if len(y) == 0:
+                print("No merged data to retrain on.")
+                return
+
+            if max_train_rows is not None and len(y) > max_train_rows:
+                # rows are ordered by date, so this keeps the most recent ones
+                print(f"Training on the latest {max_train_rows} of {len(y)} rows (max_train_rows).")
+                X, y = X[len(y) - max_train_rows:], y[len(y) - max_train_rows:]
+
+            if len(y) > row_limit:
+                raise ValueError(f"Training on {len(y)} rows exceeds the {max_memory_mb} MB budget "
+                                 f"(at most {row_limit} rows fit). Raise max_memory_mb, or set "
+                                 f"max_train_rows to train on the most recent rows only.")
+
+            final_model_hgb.fit(X, y)
+            report_memory('model trained')
+            del X
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+        peak = peak_rss_mb()
+        if peak is not None and peak > max_memory_mb:
+            print(f"Warning: retrain peak RSS {peak:.0f} MB exceeded the {max_memory_mb} MB budget.")
+    elif use_snapshot:
+        df = read_snapshot('merged_data', columns=col_map + [TARGET_COLUMN])
+        X = df[col_map].to_numpy(dtype=np.float32)
+        y = df[TARGET_COLUMN].fillna(0).to_numpy(dtype=np.int8)
+        del df
+        final_scaler = StandardScaler()
+        final_model_hgb.fit(final_scaler.fit_transform(X), y)
+        report_memory('model trained')
+    else:
+        keys, X, y = db.get_merged_features_array(col_map)
+        db.disconnect()
+        final_scaler = StandardScaler()
+        X_scaled_final = final_scaler.fit_transform(X)
+        final_model_hgb.fit(X_scaled_final, y)
+        report_memory('model trained')
 
     model_blob = pickle.dumps(final_model_hgb)
     scaler_blob = pickle.dumps(final_scaler)
@@ -183,4 +284,4 @@ def retrain_model_weekly():
 
 
 if  __name__ == '__main__':
-    retrain_model_weekly()
\ No newline at end of file
+    retrain_model_weekly()
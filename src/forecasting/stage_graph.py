@@ -0,0 +1,181 @@
+"""
+A small dependency graph of pipeline stages, run on one event loop.
+
+Each stage starts as soon as the stages it depends on have finished, so independent stages run
+concurrently: coroutine functions (Telethon) run on the event loop itself, blocking functions
+(requests, MySQL, pandas) in worker threads. Every stage logs its start and end, and the run ends
+with a timeline of all stages and the critical path, the chain of stages that determined the total
+run time.
+
+Inside an active PipelineRun (see src.pipeline.instrumentation) every stage is measured: wall and
+CPU time, memory and the rows it returned.
+
+Stages given a version are checkpointed: with a StageCheckpoints store, their result is saved
+after they finish and loaded instead of running them again on a rerun, unless they are forced.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from src.pipeline.instrumentation import count_rows, current_run, instrumented
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Args:
+        name (str): Unique stage name.
+        func (callable): Called with a dict of the results of depends_on, by stage name. A
+                         coroutine function is awaited on the event loop, any other function
+                         runs in a worker thread.
+        depends_on (tuple, optional): Names of the stages that must finish first.
+        version (str, optional): Code version of the stage, e.g. source_version(func). Stages
+                                 with a version are checkpointed. Defaults to None.
+    """
+
+    def __init__(self, name, func, depends_on=(), version=None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.version = version
+
+
+class StageTiming:
+    def __init__(self, name, started_at, start, end=None, status='running'):
+        # start and end in seconds since the start of the run
+        self.name = name
+        self.started_at = started_at
+        self.start = start
+        self.end = end
+        self.status = status
+
+    @property
+    def duration(self):
+        return None if self.end is None else self.end - self.start
+
+
+async def run_stages(stages, checkpoints=None, force_stages=()):
+    """
+    Runs the stages, each one once its dependencies have finished.
+
+    Args:
+        stages (list): Stage objects; a stage may only depend on stages listed before it.
+        checkpoints (StageCheckpoints, optional): Store of the versioned stages' results.
+        force_stages (iterable, optional): Names of versioned stages to run even if checkpointed.
+
+    Returns:
+        tuple: (results, timings), both dicts keyed by stage name; results holds the return value
+               of every stage and timings its StageTiming (seconds since the start of the run).
+
+    Raises:
+        Exception: The exception of the first failed stage, once all stages that could run have
+                   finished.
+    """
+    known = set()
+    for stage in stages:
+        missing = [name for name in stage.depends_on if name not in known]
+        if stage.name in known or missing:
+            raise ValueError(f"Stage '{stage.name}' is defined twice or depends on unknown stages {missing}.")
+        known.add(stage.name)
+    unknown = set(force_stages) - known
+    if unknown:
+        raise ValueError(f"Unknown stages to force: {sorted(unknown)}")
+    force_stages = set(force_stages)
+
+    run_start = time.perf_counter()
+    results = {}
+    timings = {}
+    tasks = {}
+
+    async def run(stage):
+        if stage.depends_on:
+            await asyncio.gather(*(tasks[name] for name in stage.depends_on))
+        inputs = {name: results[name] for name in stage.depends_on}
+        checkpointed = checkpoints is not None and stage.version is not None
+
+        if checkpointed and stage.name not in force_stages:
+            start = time.perf_counter() - run_start
+            result = await asyncio.to_thread(checkpoints.load, stage.name, stage.version)
+            if result is not None:
+                timings[stage.name] = StageTiming(stage.name, datetime.now(), start,
+                                                  time.perf_counter() - run_start, 'checkpoint')
+                results[stage.name] = result
+                if current_run() is not None:
+                    current_run().record(stage.name, 'checkpoint', timings[stage.name].duration, count_rows(result))
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] stage '{stage.name}' loaded from its checkpoint")
+                return result
+
+        timing = StageTiming(stage.name, datetime.now(), time.perf_counter() - run_start)
+        timings[stage.name] = timing
+        print(f"[{timing.started_at.strftime('%H:%M:%S')}] stage '{stage.name}' started (+{timing.start:.1f}s)")
+        # measured in the thread (or task) that runs the stage
+        func = instrumented(stage.name)(stage.func)
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = await func(inputs)
+            else:
+                result = await asyncio.to_thread(func, inputs)
+        except BaseException:
+            timing.end = time.perf_counter() - run_start
+            timing.status = 'failed'
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] stage '{stage.name}' failed after {timing.duration:.1f}s")
+            raise
+
+        if checkpointed:
+            await asyncio.to_thread(checkpoints.save, stage.name, stage.version, result)
+
+        timing.end = time.perf_counter() - run_start
+        timing.status = 'done'
+        results[stage.name] = result
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] stage '{stage.name}' finished in {timing.duration:.1f}s")
+        return result
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(run(stage))
+
+    # a failed stage does not stop the independent ones; the stages depending on it never start
+    outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    print_stage_timeline(stages, timings)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return results, timings
+
+
+def critical_path(stages, timings):
+    """
+    Returns the names of the stages on the critical path of a completed run: starting from the
+    stage that finished last, each step goes back to the dependency that finished last.
+    """
+    if not timings:
+        return []
+
+    by_name = {stage.name: stage for stage in stages}
+    current = max(timings.values(), key=lambda timing: timing.end).name
+    path = [current]
+    while True:
+        dependencies = [timings[name] for name in by_name[current].depends_on]
+        if not dependencies:
+            break
+        current = max(dependencies, key=lambda timing: timing.end).name
+        path.append(current)
+    return path[::-1]
+
+
+def print_stage_timeline(stages, timings):
+    """
+    Prints the start, end and duration of every stage that ran, and the critical path.
+    """
+    print("\n===== STAGE TIMELINE =====")
+    for stage in stages:
+        timing = timings.get(stage.name)
+        if timing is None:
+            print(f"  {stage.name:<10} not started")
+        else:
+            print(f"  {stage.name:<10} {timing.start:7.1f}s -> {timing.end:7.1f}s  {timing.duration:7.1f}s  ({timing.status})")
+    if len(timings) < len(stages) or any(timing.status == 'failed' for timing in timings.values()):
+        return
+    path = critical_path(stages, timings)
+    if path:
+        print(f"  critical path: {' -> '.join(path)}")
@@ -1,132 +1,208 @@
-import datetime as dt
-from dotenv import load_dotenv
-import json
-import os
-import requests
-from flask import Flask, jsonify, request, render_template
-import pandas as pd 
-from src.database.db_handler import DatabaseHandler
-from flask_cors import CORS
-
-
-app = Flask(__name__)
-CORS(app)
-
-class InvalidUsage(Exception):
-    status_code = 400
-
-    def __init__(self, message, status_code=None, payload=None):
-        Exception.__init__(self)
-        self.message = message
-        if status_code is not None:
-            self.status_code = status_code
-        self.payload = payload
-
-    def to_dict(self):
-        rv = dict(self.payload or ())
-        rv["message"] = self.message
-        return rv
-
-load_dotenv()
-API_TOKEN = os.environ.get("ALERTSAPP_TOKEN")
-db_host = os.environ.get("DB_HOST")
-db_name = os.environ.get("DB_NAME")
-db_user = os.environ.get("DB_USER")
-db_password = os.environ.get("DB_PASSWORD")
-db_port = os.environ.get("DB_PORT")
-
-db = DatabaseHandler(
-    host=db_host,
-    database=db_name,
-    user=db_user,
-    password=db_password,
-    port=db_port
-)
-
-db.connect()
-
-@app.errorhandler(InvalidUsage)
-def handle_invalid_usage(error):
-    response = jsonify(error.to_dict())
-    response.status_code = error.status_code
-    return response
-
-
-@app.route("/")
-def alarm_forecast_page():
-    token_for_frontend = API_TOKEN
-    if not token_for_frontend:
-        return "API Token missing.", 500
-
-    return render_template('index.html', api_token_value=token_for_frontend)
-
-@app.route('/api/v1/alarm-forecast', methods=['POST'])
-def get_alarm_forecast_api():
-    data = request.get_json()
-
-    if not data: 
-        raise InvalidUsage("Request body must contain JSON data", status_code=400)
-
-    if data.get("token") is None:
-        raise InvalidUsage("token is required", status_code=400)
-
-    token = data.get("token")
-
-    if token != API_TOKEN:
-        raise InvalidUsage("wrong API token", status_code=403)
-
-    target_region_input = data.get('region', 'all')
-    if not target_region_input:
-        target_region_input = 'all'
-
-    try:
-        predictions_df_all = db.get_predictions(daily_fetcher=True)
-
-        if predictions_df_all.empty:
-            raise InvalidUsage("No prediction data available.", status_code=404)
-
-        model_info = db.get_model_info(daily_fetcher=True)
-        last_train_time = pd.to_datetime(model_info['last_trained_on'].iloc[0]).strftime('%Y-%m-%dT%H:%M:%SZ') if not model_info.empty else None
-
-        predictions_df_all['datetime'] = pd.to_datetime(predictions_df_all['date'].astype(str) + ' ' + predictions_df_all['time'])
-        last_pred_time = predictions_df_all['datetime'].max().strftime('%Y-%m-%dT%H:%M:%SZ') if not predictions_df_all.empty else None
-
-        predictions_df_filtered = predictions_df_all 
-
-        if target_region_input.lower() != 'all':
-            requested_regions = [r.strip().lower() for r in target_region_input.split(',') if r.strip()]
-
-            if not requested_regions:
-                target_region_input = 'all'
-
-            else:
-                predictions_df_filtered = predictions_df_all[
-                    predictions_df_all['region_name'].str.lower().isin(requested_regions)
-                ]
-
-                if predictions_df_filtered.empty:
-                    raise InvalidUsage(f"No forecast data found for region(s): {target_region_input}", status_code=404)
-
-        regions_forecast = {}
-
-        predictions_df_filtered['time_formatted'] = pd.to_datetime(predictions_df_filtered['time'], format='%H:%M:%S').dt.strftime('%H:%M')
-        predictions_df_filtered['prediction_bool'] = predictions_df_filtered['prediction_value'].astype(bool)
-
-        for region, group in predictions_df_filtered.groupby('region_name'):
-            region_data = {row['time_formatted']: row['prediction_bool']
-                           for _, row in group.sort_values('time_formatted').iterrows()}
-            regions_forecast[region] = region_data
-
-        response_data = {
-            "last_model_train_time": last_train_time,
-            "last_prediction_time": last_pred_time, 
-            "regions_forecast": regions_forecast
-        }
-
-        return jsonify(response_data)
-
-    except InvalidUsage as e:
-        raise e
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        raise InvalidUsage("An internal server error occurred.", status_code=500)
+import datetime as dt
+from dotenv import load_dotenv
+import json
+import os
+import requests
+from flask import Flask, Response, jsonify, request, render_template
+import pandas as pd 
+from src.database.db_handler import DatabaseHandler
+from src.frontend.forecast_cache import ForecastCache
+from flask_cors import CORS
+
+
+app = Flask(__name__)
+CORS(app)
+
+class InvalidUsage(Exception):
+    status_code = 400
+
+    def __init__(self, message, status_code=None, payload=None):
+        Exception.__init__(self)
+        self.message = message
+        if status_code is not None:
+            self.status_code = status_code
+        self.payload = payload
+
+    def to_dict(self):
+        rv = dict(self.payload or ())
+        rv["message"] = self.message
+        return rv
+
+load_dotenv()
+API_TOKEN = os.environ.get("ALERTSAPP_TOKEN")
+db_host = os.environ.get("DB_HOST")
+db_name = os.environ.get("DB_NAME")
+db_user = os.environ.get("DB_USER")
+db_password = os.environ.get("DB_PASSWORD")
+db_port = os.environ.get("DB_PORT")
+db_pool_size = int(os.environ.get("DB_POOL_SIZE", 8))
+MAX_RANGE_DAYS = 366
+
+# request threads borrow their own pooled connection instead of sharing one socket
+db = DatabaseHandler(
+    host=db_host,
+    database=db_name,
+    user=db_user,
+    password=db_password,
+    port=db_port,
+    pool_size=db_pool_size
+)
+
+db.connect()
+
+# responses prebuilt from the forecast the daily orchestrator publishes to data/predictions
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+forecast_cache = ForecastCache(db, os.path.join(project_root, 'data', 'predictions'))
+
+@app.errorhandler(InvalidUsage)
+def handle_invalid_usage(error):
+    response = jsonify(error.to_dict())
+    response.status_code = error.status_code
+    return response
+
+
+@app.route("/")
+def alarm_forecast_page():
+    token_for_frontend = API_TOKEN
+    if not token_for_frontend:
+        return "API Token missing.", 500
+
+    return render_template('index.html', api_token_value=token_for_frontend)
+
+@app.route('/api/v1/alarm-forecast', methods=['POST'])
+def get_alarm_forecast_api():
+    data = request.get_json()
+
+    if not data: 
+        raise InvalidUsage("Request body must contain JSON data", status_code=400)
+
+    if data.get("token") is None:
+        raise InvalidUsage("token is required", status_code=400)
+
+    token = data.get("token")
+
+    if token != API_TOKEN:
+        raise InvalidUsage("wrong API token", status_code=403)
+
+    target_region_input = data.get('region', 'all')
+    if not target_region_input:
+        target_region_input = 'all'
+
+    requested_regions = None
+    if target_region_input.lower() != 'all':
+        requested_regions = [r.strip().lower() for r in target_region_input.split(',') if r.strip()] or None
+
+    try:
+        forecast = forecast_cache.get()
+
+        if forecast is None:
+            raise InvalidUsage("No prediction data available.", status_code=404)
+
+        body, etag = forecast.response(requested_regions)
+
+        if body is None:
+            raise InvalidUsage(f"No forecast data found for region(s): {target_region_input}", status_code=404)
+
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Last-Modified'] = forecast.last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+
+        if etag in request.if_none_match or (
+                not request.if_none_match and request.if_modified_since is not None
+                and request.if_modified_since >= forecast.published_at):
+            response.status_code = 304
+            response.set_data(b'')
+
+        return response
+
+    except InvalidUsage as e:
+        raise e
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        raise InvalidUsage("An internal server error occurred.", status_code=500)
+
+
+def _format_range_row(row, include_probabilities):
+    region_name, date, time, prediction_value = row[:4]
+    seconds = int(time.total_seconds()) if time is not None else None
+    record = {
+        "region": region_name,
+        "date": date.strftime('%Y-%m-%d'),
+        "time": f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}" if seconds is not None else None,
+        "prediction": bool(prediction_value),
+    }
+    if include_probabilities:
+        record["raw_probability"] = float(row[4]) if row[4] is not None else None
+    return record
+
+
+@app.route('/api/v1/alarm-forecast/range', methods=['GET'])
+def get_alarm_forecast_range_api():
+    """
+    Streams the forecasts of a date range, one JSON object per line (NDJSON) or as a JSON array
+    written in chunks, so long exports are never held in memory.
+
+    Query parameters:
+        token: API token (or an 'Authorization: Bearer <token>' header).
+        from, to: First and last date of the range, YYYY-MM-DD (inclusive).
+        regions: Comma-separated region names. Defaults to all regions.
+        include_probabilities: 'true' to add raw_probability to every record.
+        format: 'ndjson' (default) or 'json'.
+    """
+    token = request.args.get("token")
+    auth_header = request.headers.get("Authorization", "")
+    if token is None and auth_header.startswith("Bearer "):
+        token = auth_header[len("Bearer "):]
+
+    if token is None:
+        raise InvalidUsage("token is required", status_code=400)
+
+    if token != API_TOKEN:
+        raise InvalidUsage("wrong API token", status_code=403)
+
+    try:
+        start_date = dt.datetime.strptime(request.args["from"], '%Y-%m-%d')
+        end_date = dt.datetime.strptime(request.args["to"], '%Y-%m-%d') + dt.timedelta(days=1)
+    except KeyError:
+        raise InvalidUsage("from and to are required", status_code=400)
+    except ValueError:
+        raise InvalidUsage("from and to must be dates in YYYY-MM-DD format", status_code=400)
+
+    if end_date <= start_date:
+        raise InvalidUsage("from must not be after to", status_code=400)
+    if (end_date - start_date).days > MAX_RANGE_DAYS:
+        raise InvalidUsage(f"The range can span at most {MAX_RANGE_DAYS} days", status_code=400)
+
+    output_format = request.args.get("format", "ndjson").lower()
+    if output_format not in ("ndjson", "json"):
+        raise InvalidUsage("format must be 'ndjson' or 'json'", status_code=400)
+
+    include_probabilities = request.args.get("include_probabilities", "false").lower() in ("1", "true", "yes")
+
+    region_ids = None
+    regions_input = request.args.get("regions", "all")
+    if regions_input and regions_input.lower() != 'all':
+        requested_regions = {r.strip().lower() for r in regions_input.split(',') if r.strip()}
+        if requested_regions:
+            region_mapping = db.fetch_region_mapping()
+            region_ids = [region_id for name, region_id in region_mapping.items() if name.lower() in requested_regions]
+            if not region_ids:
+                raise InvalidUsage(f"No forecast data found for region(s): {regions_input}", status_code=404)
+
+    def generate():
+        first = True
+        if output_format == "json":
+            yield "["
+        for rows in db.iter_predictions(start_date, end_date, region_ids, include_probabilities):
+            lines = [json.dumps(_format_range_row(row, include_probabilities)) for row in rows]
+            if output_format == "json":
+                yield ("" if first else ",") + ",".join(lines)
+            else:
+                yield "\n".join(lines) + "\n"
+            first = False
+        if output_format == "json":
+            yield "]"
+
+    mimetype = "application/x-ndjson" if output_format == "ndjson" else "application/json"
+    return Response(generate(), mimetype=mimetype)
@@ -0,0 +1,225 @@
+"""
+Precomputed responses of the /api/v1/alarm-forecast endpoint.
+
+Predictions change once a day, so instead of querying and reshaping them on every request the daily
+orchestrator publishes the finished per-region forecast to data/predictions/forecast_cache.json.
+The Flask app keeps the published forecast in memory as ready-to-send JSON fragments, one per
+region, together with an ETag and Last-Modified value, and only re-reads the file when it changes
+(checked at most every CACHE_CHECK_SECONDS). Until a forecast has been published, or while the
+published one is older than the latest predictions in the database (its publication failed, checked
+every FALLBACK_TTL_SECONDS), the cache is built from the database and kept for FALLBACK_TTL_SECONDS.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import pandas as pd
+
+FORECAST_CACHE_FILE = 'forecast_cache.json'
+CACHE_CHECK_SECONDS = 5
+FALLBACK_TTL_SECONDS = 300
+MAX_CACHED_RESPONSES = 256
+
+
+def build_forecast_payload(predictions_df, model_info):
+    """
+    Builds the forecast response from the latest predictions and model metadata.
+
+    Args:
+        predictions_df (pd.DataFrame): Output of get_predictions(daily_fetcher=True).
+        model_info (pd.DataFrame): Output of get_model_info(daily_fetcher=True).
+
+    Returns:
+        dict: last_model_train_time, last_prediction_time and regions_forecast
+              ({region_name: {'HH:MM': bool}}).
+    """
+    last_train_time = None
+    if not model_info.empty:
+        last_train_time = pd.to_datetime(model_info['last_trained_on'].iloc[0]).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    times = pd.to_datetime(predictions_df['time'], format='%H:%M:%S')
+    datetimes = pd.to_datetime(predictions_df['date'].dt.strftime('%Y-%m-%d') + ' ' + times.dt.strftime('%H:%M:%S'))
+    last_pred_time = datetimes.max().strftime('%Y-%m-%dT%H:%M:%SZ') if not predictions_df.empty else None
+
+    forecast = pd.DataFrame({
+        'region_name': predictions_df['region_name'].to_numpy(),
+        'time_formatted': times.dt.strftime('%H:%M').to_numpy(),
+        'prediction_bool': predictions_df['prediction_value'].astype(bool).to_numpy(),
+    }).sort_values(['region_name', 'time_formatted'])
+
+    regions_forecast = {
+        region: dict(zip(group['time_formatted'], group['prediction_bool'].tolist()))
+        for region, group in forecast.groupby('region_name', sort=True)
+    }
+
+    return {
+        "last_model_train_time": last_train_time,
+        "last_prediction_time": last_pred_time,
+        "regions_forecast": regions_forecast
+    }
+
+
+def payload_version(payload):
+    """
+    Returns a short content hash of a forecast payload.
+    """
+
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def publish_forecast_cache(db, predictions_dir):
+    """
+    Writes the latest forecast response to predictions_dir for the Flask app to serve.
+
+    Args:
+        db (DatabaseHandler)
+        predictions_dir (str): Directory of the cache file, normally data/predictions.
+
+    Returns:
+        str: The version (content hash) of the published forecast, or None if there are no predictions.
+    """
+    predictions_df = db.get_predictions(daily_fetcher=True)
+    if predictions_df.empty:
+        print("No predictions to publish to the forecast cache.")
+        return None
+
+    payload = build_forecast_payload(predictions_df, db.get_model_info(daily_fetcher=True))
+    version = payload_version(payload)
+    payload['version'] = version
+    payload['published_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    os.makedirs(predictions_dir, exist_ok=True)
+    path = os.path.join(predictions_dir, FORECAST_CACHE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(path + '.tmp', path)
+
+    print(f"Published forecast cache version {version} to {path}.")
+    return version
+
+
+def _dumps(value):
+    # same output as Flask's jsonify outside debug mode
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+class CachedForecast:
+    """
+    One published forecast, with the serialized fragment of every region.
+    """
+
+    def __init__(self, payload, version, published_at):
+        self.version = version
+        self.last_prediction_time = payload['last_prediction_time']
+        self.last_modified = format_datetime(published_at.replace(microsecond=0), usegmt=True)
+        self.published_at = published_at.replace(microsecond=0)
+
+        self.header = ('{"last_model_train_time":' + _dumps(payload['last_model_train_time']) +
+                       ',"last_prediction_time":' + _dumps(payload['last_prediction_time']) +
+                       ',"regions_forecast":{')
+        regions = payload['regions_forecast']
+        self.fragments = {region: _dumps(region) + ':' + _dumps(regions[region]) for region in sorted(regions)}
+        self.regions_by_key = {region.lower(): region for region in regions}
+        self._responses = {}
+
+    def response(self, requested_regions=None):
+        """
+        Returns (body bytes, ETag) of the forecast for the given lowercase region names (all
+        regions if None), or (None, None) if none of them is known.
+        """
+        key = None if requested_regions is None else tuple(sorted(set(requested_regions)))
+        cached = self._responses.get(key)
+        if cached is not None:
+            return cached
+
+        if key is None:
+            regions = list(self.fragments)
+        else:
+            regions = sorted(self.regions_by_key[name] for name in key if name in self.regions_by_key)
+            if not regions:
+                return None, None
+
+        body = (self.header + ','.join(self.fragments[region] for region in regions) + '}}\n').encode('utf-8')
+        etag = self.version + '-' + hashlib.sha1(body).hexdigest()[:8]
+
+        if len(self._responses) >= MAX_CACHED_RESPONSES:
+            self._responses.clear()
+        self._responses[key] = (body, etag)
+        return body, etag
+
+
+class ForecastCache:
+    """
+    Serves the published forecast, reloading it when the orchestrator publishes a new one.
+    """
+
+    def __init__(self, db, predictions_dir):
+        self.db = db
+        self.path = os.path.join(predictions_dir, FORECAST_CACHE_FILE)
+        self._forecast = None
+        self._mtime = None
+        self._expires = 0
+        self._next_check = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Returns the current CachedForecast, or None if there are no predictions at all.
+        """
+        now = time.monotonic()
+        if self._forecast is not None and now < self._next_check:
+            return self._forecast
+
+        with self._lock:
+            if self._forecast is not None and now < self._next_check:
+                return self._forecast
+            self._next_check = now + CACHE_CHECK_SECONDS
+
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+
+            if mtime is not None and mtime != self._mtime:
+                with open(self.path, encoding='utf-8') as f:
+                    payload = json.load(f)
+                published_at = datetime.strptime(payload['published_at'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+                self._forecast = CachedForecast(payload, payload['version'], published_at)
+                self._mtime = mtime
+                self._expires = now + FALLBACK_TTL_SECONDS
+                print(f"Loaded forecast cache version {payload['version']}.")
+            elif self._forecast is None or now >= self._expires:
+                if mtime is None or self._published_is_stale():
+                    self._forecast = self._build_from_database()
+                    self._mtime = mtime
+                self._expires = now + FALLBACK_TTL_SECONDS
+
+            return self._forecast
+
+    def _published_is_stale(self):
+        """
+        Whether the database has predictions of a later day than the served forecast.
+        """
+        latest_date = self.db.get_latest_prediction_date()
+        if latest_date is None:
+            return False
+        if self._forecast is None or self._forecast.last_prediction_time is None:
+            return True
+        served_date = pd.Timestamp(self._forecast.last_prediction_time[:10])
+        if latest_date > served_date:
+            print(f"Published forecast ends on {served_date.date()}, the database has predictions "
+                  f"for {latest_date.date()}; serving them from the database.")
+            return True
+        return False
+
+    def _build_from_database(self):
+        predictions_df = self.db.get_predictions(daily_fetcher=True)
+        if predictions_df.empty:
+            return None
+
+        payload = build_forecast_payload(predictions_df, self.db.get_model_info(daily_fetcher=True))
+        return CachedForecast(payload, payload_version(payload), datetime.now(timezone.utc))
@@ -0,0 +1,467 @@
+"""
+Vectorized alarm feature engineering.
+
+Every region's alarms are kept as sorted start/end arrays (seconds since epoch), so each feature
+becomes a handful of searchsorted calls over the whole date range instead of a boolean mask per
+region, day and hour. Minute totals use cumulative coverage: the minutes covered up to time t are
+sum(min(end, t)) - sum(min(start, t)), which prefix sums over the sorted arrays answer in O(log n).
+
+The alarms table stores DATETIME values, i.e. whole seconds, which the engine relies on to express
+"at the very end of yesterday" as the last second of the day.
+"""
+
+import numpy as np
+import pandas as pd
+
+SECONDS_IN_HOUR = 3600
+SECONDS_IN_DAY = 24 * SECONDS_IN_HOUR
+
+# the features look at most 7 days back (is_alarm_active_lag_7d, avg_daily_alarm_minutes_last_7_days),
+# one more day is fetched so alarms already running at the start of that week are still seen
+ALARM_FEATURE_LOOKBACK_DAYS = 7
+ALARM_FETCH_MARGIN_DAYS = 1
+
+AGGREGATE_COLUMNS = ['minutes', 'starts', 'active_at_start', 'active_at_end', 'last_end']
+
+DAILY_FEATURE_COLUMNS = [
+    'time_since_last_alarm_end_minutes_at_start_of_day',
+    'total_alarm_minutes_yesterday',
+    'alarms_started_yesterday',
+    'alarms_started_trend',
+    'was_alarm_active_end_of_yesterday',
+    'is_alarm_active_lag_7d',
+    'avg_daily_alarm_minutes_last_7_days',
+]
+
+
+def to_epoch_seconds(values):
+    """
+    Converts datetime-like values (Series, DatetimeIndex, array) to int64 seconds since epoch.
+    """
+
+    return np.asarray(values).astype('datetime64[s]').astype(np.int64)
+
+
+def from_epoch_seconds(seconds):
+    """
+    Converts int64 seconds since epoch back to a datetime64[ns] array.
+    """
+
+    return np.asarray(seconds, dtype=np.int64).astype('datetime64[s]').astype('datetime64[ns]')
+
+
+class AlarmIntervals:
+    """
+    Sorted start/end arrays of the alarms of a single region, answering window queries
+    (counts, activity and covered seconds) for many windows at once.
+    """
+
+    def __init__(self, starts, ends):
+        """
+        Args:
+            starts (np.ndarray): Alarm start times in epoch seconds.
+            ends (np.ndarray): Alarm end times in epoch seconds, aligned with starts.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+
+        self.starts = np.sort(starts)
+        self.ends = np.sort(ends)
+
+        # alarms whose end precedes their start can't be counted with two independent sorted
+        # arrays, they are rare enough to be checked directly
+        ordered = ends >= starts
+        self.ordered_starts = np.sort(starts[ordered])
+        self.ordered_ends = np.sort(ends[ordered])
+        self.reversed_starts = starts[~ordered]
+        self.reversed_ends = ends[~ordered]
+
+        self.cum_starts = np.concatenate(([0], np.cumsum(self.ordered_starts)))
+        self.cum_ends = np.concatenate(([0], np.cumsum(self.ordered_ends)))
+
+    def started_between(self, window_start, window_end):
+        """
+        Number of alarms with window_start <= start < window_end.
+        """
+
+        return (np.searchsorted(self.starts, window_end, side='left')
+                - np.searchsorted(self.starts, window_start, side='left'))
+
+    def overlapping(self, window_start, window_end):
+        """
+        Number of alarms with start < window_end and end > window_start.
+        """
+
+        window_start = np.asarray(window_start, dtype=np.int64)
+        window_end = np.asarray(window_end, dtype=np.int64)
+
+        # for ordered alarms end <= window_start already implies start < window_end
+        count = (np.searchsorted(self.ordered_starts, window_end, side='left')
+                 - np.searchsorted(self.ordered_ends, window_start, side='right'))
+
+        if self.reversed_starts.size:
+            count = count + ((self.reversed_starts[None, :] < window_end[..., None])
+                             & (self.reversed_ends[None, :] > window_start[..., None])).sum(axis=-1)
+        return count
+
+    def _coverage_until(self, t):
+        """
+        Total alarm seconds before t, i.e. sum(min(end, t)) - sum(min(start, t)).
+        """
+
+        n = self.ordered_starts.size
+        k_ends = np.searchsorted(self.ordered_ends, t, side='right')
+        k_starts = np.searchsorted(self.ordered_starts, t, side='right')
+        return (self.cum_ends[k_ends] + t * (n - k_ends)) - (self.cum_starts[k_starts] + t * (n - k_starts))
+
+    def covered_seconds(self, window_start, window_end):
+        """
+        Sum over alarms of the seconds each one overlaps [window_start, window_end).
+        Overlapping alarms are counted separately, as in the per-alarm loop this replaces.
+        """
+
+        window_start = np.asarray(window_start, dtype=np.int64)
+        window_end = np.asarray(window_end, dtype=np.int64)
+        return self._coverage_until(window_end) - self._coverage_until(window_start)
+
+    def last_end_before(self, t):
+        """
+        Latest alarm end strictly before t, as float seconds (NaN if there is none).
+        """
+
+        k = np.searchsorted(self.ends, t, side='left')
+        last_end = self.ends[np.maximum(k - 1, 0)].astype(np.float64) if self.ends.size else np.zeros(np.shape(t))
+        return np.where(k > 0, last_end, np.nan)
+
+
+def alarm_history_window(target_dates, lookback_days=ALARM_FEATURE_LOOKBACK_DAYS):
+    """
+    Returns the [start, end) range of alarm starts needed to compute the features of target_dates.
+
+    Args:
+        target_dates (list or pd.DatetimeIndex): Days the features are requested for.
+        lookback_days (int, optional): Days of history before the first target day. Defaults to
+                                       the feature lookback; 0 is enough for the hourly target alone.
+
+    Returns:
+        tuple: (pd.Timestamp, pd.Timestamp) window start (inclusive) and end (exclusive).
+    """
+    target_dates = pd.DatetimeIndex(target_dates).normalize()
+    lookback = pd.Timedelta(days=lookback_days + ALARM_FETCH_MARGIN_DAYS)
+    return target_dates.min() - lookback, target_dates.max() + pd.Timedelta(days=1)
+
+
+def leakage_cutoffs(alarm_starts, target_dates, lookback_days=ALARM_FEATURE_LOOKBACK_DAYS):
+    """
+    Returns the leakage cutoff of every target day: only alarms started at or before it are used
+    for that day. As in the daily run, the cutoff is the midnight of the latest alarm start within
+    the day's own history window (alarm_history_window of that day alone), so a call for many days
+    cuts every day exactly like a call for that day alone. A day whose window has no alarm starts
+    gets the window start.
+
+    Args:
+        alarm_starts (iterable): Start times (or start days) of the alarms, in any order.
+        target_dates (list or pd.DatetimeIndex): Days the features are requested for.
+        lookback_days (int, optional): Days of history before each target day.
+
+    Returns:
+        pd.DatetimeIndex: One cutoff per day of the sorted, unique target_dates.
+    """
+    target_dates = pd.DatetimeIndex(target_dates).normalize().unique().sort_values()
+    start_days = np.unique(to_epoch_seconds(pd.DatetimeIndex(alarm_starts).normalize()))
+
+    window_starts = to_epoch_seconds(target_dates - pd.Timedelta(days=lookback_days + ALARM_FETCH_MARGIN_DAYS))
+    window_ends = to_epoch_seconds(target_dates + pd.Timedelta(days=1))
+
+    k = np.searchsorted(start_days, window_ends, side='left')
+    latest = start_days[np.maximum(k - 1, 0)] if start_days.size else window_starts
+    cutoffs = np.where((k > 0) & (latest >= window_starts), latest, window_starts)
+    return pd.DatetimeIndex(from_epoch_seconds(cutoffs))
+
+
+def compute_daily_features(intervals, day_starts):
+    """
+    Computes the daily alarm features of one region for every day start given.
+
+    Args:
+        intervals (AlarmIntervals): The region's alarms.
+        day_starts (np.ndarray): Midnights of the feature days in epoch seconds.
+
+    Returns:
+        dict: Maps every name in DAILY_FEATURE_COLUMNS to an array aligned with day_starts.
+    """
+    yesterday_starts = day_starts - SECONDS_IN_DAY
+    day_before_yesterday_starts = day_starts - 2 * SECONDS_IN_DAY
+    week_ago_starts = day_starts - 7 * SECONDS_IN_DAY
+
+    started_yesterday = intervals.started_between(yesterday_starts, day_starts)
+    started_day_before_yesterday = intervals.started_between(day_before_yesterday_starts, yesterday_starts)
+
+    return {
+        'time_since_last_alarm_end_minutes_at_start_of_day':
+            (day_starts - intervals.last_end_before(day_starts)) / 60,
+        'total_alarm_minutes_yesterday': intervals.covered_seconds(yesterday_starts, day_starts) / 60,
+        'alarms_started_yesterday': started_yesterday,
+        'alarms_started_trend': started_yesterday - started_day_before_yesterday,
+        # active during the last second of yesterday
+        'was_alarm_active_end_of_yesterday': intervals.overlapping(day_starts - 1, day_starts) > 0,
+        # active at the very start of the day a week ago
+        'is_alarm_active_lag_7d': intervals.overlapping(week_ago_starts, week_ago_starts + 1) > 0,
+        'avg_daily_alarm_minutes_last_7_days': intervals.covered_seconds(week_ago_starts, day_starts) / 60 / 7,
+    }
+
+
+def compute_alarm_features(alarms_df, feature_dates):
+    """
+    Computes the daily alarm features and the hourly 'is_alarm_active' target for every region
+    present in alarms_df and every day in feature_dates in one batched pass.
+
+    Args:
+        alarms_df (pd.DataFrame): Alarms with 'region_id', 'start' and 'end' columns.
+        feature_dates (pd.DatetimeIndex): Days (at midnight) to compute the features for, they don't
+                                          have to be contiguous.
+
+    Returns:
+        pd.DataFrame: One row per region, day and hour ordered by region, date and hour, with
+                      'region_id', 'date', the daily features, 'is_alarm_active' and 'datetime'.
+    """
+    day_starts = to_epoch_seconds(pd.DatetimeIndex(feature_dates).normalize())
+    hour_offsets = np.arange(24, dtype=np.int64) * SECONDS_IN_HOUR
+    hour_starts = (day_starts[:, None] + hour_offsets[None, :]).ravel()
+
+    columns = {name: [] for name in ['region_id', 'date'] + DAILY_FEATURE_COLUMNS + ['is_alarm_active', 'datetime']}
+
+    for region_id, region_alarms in alarms_df.groupby('region_id'):
+        intervals = AlarmIntervals(to_epoch_seconds(region_alarms['start']), to_epoch_seconds(region_alarms['end']))
+
+        daily = compute_daily_features(intervals, day_starts)
+        for name, values in daily.items():
+            columns[name].append(np.repeat(values, 24))
+
+        columns['region_id'].append(np.full(hour_starts.size, region_id, dtype=np.int64))
+        columns['date'].append(np.repeat(day_starts, 24))
+        columns['is_alarm_active'].append(
+            (intervals.overlapping(hour_starts, hour_starts + SECONDS_IN_HOUR) > 0).astype(np.int64)
+        )
+        columns['datetime'].append(hour_starts)
+
+    if not columns['region_id']:
+        return pd.DataFrame(columns=list(columns))
+
+    features_df = pd.DataFrame({name: np.concatenate(parts) for name, parts in columns.items()})
+    features_df['date'] = from_epoch_seconds(features_df['date'])
+    features_df['datetime'] = from_epoch_seconds(features_df['datetime'])
+
+    return features_df
+
+
+def compute_daily_aggregates(alarms_df, region_days):
+    """
+    Computes the 'alarm_daily_aggregates' rows of the given region-days: alarm minutes within the day,
+    alarms started, whether an alarm was active at the first and at the last second of the day, and
+    the latest alarm end within the day.
+
+    Args:
+        alarms_df (pd.DataFrame): Alarms with 'region_id', 'start' and 'end' columns, covering the
+                                  region-days plus the alarms already running when they begin.
+        region_days (pd.DataFrame): 'region_id' and 'date' (midnight) of the rows to compute.
+
+    Returns:
+        pd.DataFrame: 'region_id', 'date' and AGGREGATE_COLUMNS, one row per region-day.
+    """
+    alarms_by_region = dict(tuple(alarms_df.groupby('region_id')))
+    frames = []
+
+    for region_id, days in region_days.groupby('region_id'):
+        region_alarms = alarms_by_region.get(region_id, alarms_df.iloc[0:0])
+        intervals = AlarmIntervals(to_epoch_seconds(region_alarms['start']), to_epoch_seconds(region_alarms['end']))
+
+        day_starts = np.unique(to_epoch_seconds(pd.DatetimeIndex(days['date']).normalize()))
+        day_ends = day_starts + SECONDS_IN_DAY
+
+        last_end = intervals.last_end_before(day_ends)
+        last_end = np.where(last_end >= day_starts, last_end, np.nan)
+
+        frames.append(pd.DataFrame({
+            'region_id': region_id,
+            'date': from_epoch_seconds(day_starts),
+            'minutes': intervals.covered_seconds(day_starts, day_ends) / 60,
+            'starts': intervals.started_between(day_starts, day_ends),
+            'active_at_start': intervals.overlapping(day_starts, day_starts + 1) > 0,
+            'active_at_end': intervals.overlapping(day_ends - 1, day_ends) > 0,
+            'last_end': pd.to_datetime(last_end, unit='s'),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=['region_id', 'date'] + AGGREGATE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def daily_features_from_aggregates(aggregates_df, target_dates):
+    """
+    Derives the daily alarm features of target_dates from 'alarm_daily_aggregates' rows, without
+    touching raw alarms. Region-days without a row had no alarm activity.
+
+    Args:
+        aggregates_df (pd.DataFrame): Aggregates (see compute_daily_aggregates) covering at least the
+                                      ALARM_FEATURE_LOOKBACK_DAYS + 1 days before every target day.
+        target_dates (list or pd.DatetimeIndex): Days the features are requested for.
+
+    Returns:
+        pd.DataFrame: 'region_id', 'date' and DAILY_FEATURE_COLUMNS, ordered by region and date,
+                      for every region present in aggregates_df.
+    """
+    target_dates = pd.DatetimeIndex(target_dates).normalize().unique().sort_values()
+    region_ids = np.sort(aggregates_df['region_id'].unique()).astype(np.int64)
+    if region_ids.size == 0:
+        return pd.DataFrame(columns=['region_id', 'date'] + DAILY_FEATURE_COLUMNS)
+
+    lookback = ALARM_FEATURE_LOOKBACK_DAYS + 1
+    window = pd.date_range(target_dates.min() - pd.Timedelta(days=lookback),
+                           target_dates.max() - pd.Timedelta(days=1), freq='D')
+
+    dense = aggregates_df.assign(date=pd.DatetimeIndex(aggregates_df['date']).normalize()).set_index(
+        ['region_id', 'date'])[AGGREGATE_COLUMNS].reindex(pd.MultiIndex.from_product([region_ids, window]))
+    shape = (region_ids.size, window.size)
+
+    minutes = dense['minutes'].fillna(0).to_numpy(dtype=np.float64).reshape(shape)
+    starts = dense['starts'].fillna(0).to_numpy(dtype=np.int64).reshape(shape)
+    active_at_start = dense['active_at_start'].fillna(False).to_numpy(dtype=bool).reshape(shape)
+    active_at_end = dense['active_at_end'].fillna(False).to_numpy(dtype=bool).reshape(shape)
+    last_end = to_epoch_seconds(pd.to_datetime(dense['last_end'])).astype(np.float64)
+    last_end[dense['last_end'].isna().to_numpy()] = np.nan
+    last_end = last_end.reshape(shape)
+
+    # latest known alarm end up to each day, and prefix sums of minutes for the 7-day average
+    filled = np.where(~np.isnan(last_end), np.arange(window.size)[None, :], -1)
+    filled = np.maximum.accumulate(filled, axis=1)
+    last_end = np.where(filled >= 0, np.take_along_axis(last_end, np.maximum(filled, 0), axis=1), np.nan)
+    cum_minutes = np.concatenate((np.zeros((region_ids.size, 1)), np.cumsum(minutes, axis=1)), axis=1)
+
+    day_starts = to_epoch_seconds(target_dates)
+    # position of each target day in the window; the window ends the day before the last target
+    j = ((target_dates - window[0]) // pd.Timedelta(days=1)).to_numpy()
+
+    features = {
+        'time_since_last_alarm_end_minutes_at_start_of_day': (day_starts[None, :] - last_end[:, j - 1]) / 60,
+        'total_alarm_minutes_yesterday': minutes[:, j - 1],
+        'alarms_started_yesterday': starts[:, j - 1],
+        'alarms_started_trend': starts[:, j - 1] - starts[:, j - 2],
+        'was_alarm_active_end_of_yesterday': active_at_end[:, j - 1],
+        'is_alarm_active_lag_7d': active_at_start[:, j - 7],
+        'avg_daily_alarm_minutes_last_7_days': (cum_minutes[:, j] - cum_minutes[:, j - 7]) / 7,
+    }
+
+    daily_df = pd.DataFrame({
+        'region_id': np.repeat(region_ids, target_dates.size),
+        'date': np.tile(target_dates.to_numpy(dtype='datetime64[ns]'), region_ids.size),
+    })
+    for name, values in features.items():
+        daily_df[name] = values.ravel()
+
+    return daily_df
+
+
+def features_with_cutoffs(aggregates_df, alarms_df, target_dates, cutoffs):
+    """
+    Computes the hourly alarm features of target_dates from stored daily aggregates, honoring the
+    leakage cutoff of every day (see leakage_cutoffs). The stored rows of the days before a cutoff's
+    day only contain alarms started before it and are used as they are; the rows from the cutoff's
+    day on are recomputed from alarms_df without the alarms started after the cutoff, and so is the
+    hourly target. As in compute_alarm_features, a day only gets rows for the regions with an alarm
+    started in its window (stored rows of idle regions, all zeros, don't add any), so the result
+    equals compute_alarm_features on the alarms of each day's window, filtered by its cutoff.
+
+    Args:
+        aggregates_df (pd.DataFrame): Stored aggregates covering the ALARM_FEATURE_LOOKBACK_DAYS + 1
+                                      days before every target day.
+        alarms_df (pd.DataFrame): Alarms with 'region_id', 'start' and 'end' columns, covering
+                                  every day from the earliest cutoff's day to the last target day.
+        target_dates (list or pd.DatetimeIndex): Days the features are requested for.
+        cutoffs (pd.DatetimeIndex): Cutoff of every day of the sorted, unique target_dates.
+
+    Returns:
+        pd.DataFrame: Same layout as compute_alarm_features.
+    """
+    target_dates = pd.DatetimeIndex(target_dates).normalize().unique().sort_values()
+    if aggregates_df.empty:
+        aggregates_df = pd.DataFrame(columns=['region_id', 'date'] + AGGREGATE_COLUMNS)
+    aggregate_days = pd.DatetimeIndex(aggregates_df['date']).normalize()
+    region_ids = np.union1d(aggregates_df['region_id'].unique(), alarms_df['region_id'].unique()).astype(np.int64)
+
+    frames = []
+    for cutoff, days in pd.Series(target_dates, index=pd.DatetimeIndex(cutoffs)).groupby(level=0):
+        allowed = alarms_df[alarms_df['start'] <= cutoff]
+        stored = aggregates_df[aggregate_days < cutoff.normalize()]
+
+        recompute_days = pd.date_range(cutoff.normalize(), days.max() - pd.Timedelta(days=1), freq='D')
+        if len(recompute_days):
+            region_days = pd.DataFrame({
+                'region_id': np.repeat(region_ids, len(recompute_days)),
+                'date': np.tile(recompute_days.to_numpy(), len(region_ids)),
+            })
+            stored = pd.concat([stored, compute_daily_aggregates(allowed, region_days)], ignore_index=True)
+
+        daily_df = daily_features_from_aggregates(stored, pd.DatetimeIndex(days))
+        daily_df = daily_df.merge(active_region_days(stored, allowed, days), on=['region_id', 'date'])
+        frames.append(expand_to_hours(daily_df, allowed))
+
+    if not frames:
+        return compute_alarm_features(alarms_df.iloc[0:0], target_dates)
+    hourly_df = pd.concat(frames).sort_values(by=['region_id', 'datetime'], kind='stable')
+    return hourly_df.reset_index(drop=True)
+
+
+def active_region_days(aggregates_df, alarms_df, target_dates):
+    """
+    Returns the regions with an alarm started in the history window of each target day
+    (alarm_history_window of that day alone), from the aggregates of the days before it and the
+    alarms started on the day itself.
+
+    Returns:
+        pd.DataFrame: 'region_id' and 'date', one row per active region and target day.
+    """
+    starts = pd.to_numeric(aggregates_df['starts']).fillna(0)
+    active_days = aggregates_df.loc[starts > 0, ['region_id', 'date']]
+    active_dates = pd.DatetimeIndex(active_days['date']).normalize()
+
+    frames = []
+    for day in pd.DatetimeIndex(target_dates):
+        window_start, window_end = alarm_history_window([day])
+        regions = np.union1d(
+            active_days['region_id'][(active_dates >= window_start) & (active_dates < day)],
+            alarms_df.loc[(alarms_df['start'] >= day) & (alarms_df['start'] < window_end), 'region_id'],
+        ).astype(np.int64)
+        frames.append(pd.DataFrame({'region_id': regions, 'date': day}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def expand_to_hours(daily_df, alarms_df):
+    """
+    Expands daily features to 24 hourly rows per region-day and adds the hourly 'is_alarm_active'
+    target computed from alarms_df.
+
+    Args:
+        daily_df (pd.DataFrame): 'region_id', 'date' and the daily features, ordered by region and date.
+        alarms_df (pd.DataFrame): Alarms with 'region_id', 'start' and 'end' columns.
+
+    Returns:
+        pd.DataFrame: Same layout as compute_alarm_features.
+    """
+    hourly_df = daily_df.loc[daily_df.index.repeat(24)].reset_index(drop=True)
+    hour_starts = (to_epoch_seconds(hourly_df['date'])
+                   + np.tile(np.arange(24, dtype=np.int64) * SECONDS_IN_HOUR, len(daily_df)))
+
+    is_active = np.zeros(hour_starts.size, dtype=np.int64)
+    alarms_by_region = dict(tuple(alarms_df.groupby('region_id')))
+    for region_id, positions in hourly_df.groupby('region_id').indices.items():
+        region_alarms = alarms_by_region.get(region_id)
+        if region_alarms is None:
+            continue
+        intervals = AlarmIntervals(to_epoch_seconds(region_alarms['start']), to_epoch_seconds(region_alarms['end']))
+        region_hours = hour_starts[positions]
+        is_active[positions] = intervals.overlapping(region_hours, region_hours + SECONDS_IN_HOUR) > 0
+
+    hourly_df['is_alarm_active'] = is_active
+    hourly_df['datetime'] = from_epoch_seconds(hour_starts)
+    return hourly_df
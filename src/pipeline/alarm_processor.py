@@ -2,17 +2,38 @@ import pandas as pd
 from dotenv import load_dotenv
 import os
 from src.data_receiver.alarms_receiver import UkraineAlarmAPIClient
-from datetime import datetime, timedelta
+from src.pipeline.instrumentation import measure
+from src.pipeline.alarm_features import (
+    AGGREGATE_COLUMNS,
+    ALARM_FEATURE_LOOKBACK_DAYS,
+    alarm_history_window,
+    compute_daily_aggregates,
+    features_with_cutoffs,
+    leakage_cutoffs,
+)
+from datetime import timedelta
 
 def get_and_process_alarms(target_date, db_handler):
+    """
+    Ingests the alarm history needed for target_date, refreshes the daily aggregates it touched
+    and computes the hourly alarm features for it. Only the target days and the 7 days of
+    lookback the features use are processed.
+
+    Args:
+        target_date (datetime or list): A single day, or a list of days for backfills.
+        db_handler (DatabaseHandler)
+
+    Returns:
+        pd.DataFrame: Hourly alarm features of every target day, with a 'datetime' column.
+    """
 
     load_dotenv()
     alarm_api_key = os.environ.get("ALARM_API_KEY")
 
-    yesterday_target_date = target_date - timedelta(days=1)
-    
+    target_dates = pd.DatetimeIndex(target_date if isinstance(target_date, (list, tuple, pd.DatetimeIndex)) else [target_date])
+    target_dates = target_dates.normalize().unique().sort_values()
+
     client = UkraineAlarmAPIClient(api_key=alarm_api_key)
-    history = client.get_date_history(yesterday_target_date) # in datetime(Y, M, D) format
     
     col_mapping = {
         'region': 'regionName',
@@ -46,143 +67,107 @@ def get_and_process_alarms(target_date, db_handler):
         'Чернівецька область': 24,
         'Чернігівська область': 25,
     }
-    db_handler.insert_alerts_data(history, region_mapping, col_mapping)
+    with measure('ingest') as step:
+        affected_region_days = []
+        for day in target_dates:
+            yesterday_target_date = (day - timedelta(days=1)).to_pydatetime()
+            history = client.get_date_history(yesterday_target_date) # in datetime(Y, M, D) format
+            affected_region_days.extend(db_handler.insert_alerts_data(history, region_mapping, col_mapping))
 
-    alarms_df = db_handler.get_alerts(weekly_fetcher=True)
-    
-    alarms_df.dropna(subset=['start', 'end'], inplace=True) # filter for empty values
-    alarms_df = alarms_df[alarms_df['start'] <= alarms_df['start'].max().normalize()] # filter to prevent potentional data leakage
-    
-    alarms_df.sort_values(by=['region_id', 'start'], inplace=True)
-    alarms_df = alarms_df[['region_id', 'start', 'end']].copy()
-    
-    min_date = alarms_df['start'].min().normalize()
-    max_date = pd.Timestamp(target_date) # in Timestamp('Y-M-D 00:00:00') format
-    
-    feature_dates = pd.date_range(start=min_date,
-                                  end=max_date,
-                                  freq='D')
-    results_daily = []
-    results_hourly = []
-    
-    grouped_alarms = alarms_df.groupby('region_id')
-    
-    for region_id, region_alarms in grouped_alarms:
-        region_alarms = region_alarms.sort_values(by='start')
-    
-        # daily processing
-        for current_day in feature_dates:
-            start_of_day = current_day
-            start_of_yesterday = start_of_day - pd.Timedelta(days=1)
-            start_of_day_before_yesterday = start_of_day - pd.Timedelta(days=2)
-            end_of_yesterday = start_of_day - pd.Timedelta(microseconds=1)  # very end of previous day
-            start_of_7_days_ago = start_of_day - pd.Timedelta(days=7)
-    
-            # time_since_last_alarm_end_minutes_at_start_of_day
-            alarms_ended_before_today = region_alarms[region_alarms['end'] < start_of_day]
-            if not alarms_ended_before_today.empty:
-                last_alarm_end_time = alarms_ended_before_today['end'].max()
-                time_since_last_end = (start_of_day - last_alarm_end_time).total_seconds() / 60
-            else:
-                time_since_last_end = pd.NA
-    
-            # total_alarm_minutes_yesterday
-            yesterday_overlap = region_alarms[
-                (region_alarms['start'] < start_of_day) & (region_alarms['end'] > start_of_yesterday)
-            ]
-            total_minutes_yesterday = 0
-            for _, alarm in yesterday_overlap.iterrows():
-                intersection_start = max(alarm['start'], start_of_yesterday)
-                intersection_end = min(alarm['end'], start_of_day)
-                duration_yesterday = (intersection_end - intersection_start).total_seconds() / 60
-                if duration_yesterday > 0:
-                    total_minutes_yesterday += duration_yesterday
-    
-            # alarms_started_yesterday
-            alarms_started_yesterday_count = region_alarms[
-                (region_alarms['start'] >= start_of_yesterday) & (region_alarms['start'] < start_of_day)
-            ].shape[0]
-    
-            # was_alarm_active_end_of_yesterday
-            was_active_end_of_yesterday = region_alarms[
-                (region_alarms['start'] <= end_of_yesterday) & (region_alarms['end'] > end_of_yesterday)
-            ].shape[0] > 0
-    
-            # alarms_started_trend
-            alarms_started_day_before_yesterday_count = region_alarms[
-                (region_alarms['start'] >= start_of_day_before_yesterday) & (region_alarms['start'] < start_of_yesterday)
-            ].shape[0]
-    
-            alarms_started_trend = alarms_started_yesterday_count - alarms_started_day_before_yesterday_count
-    
-            # is_alarm_active_lag_7d
-            is_active_start_7d_ago = region_alarms[
-                (region_alarms['start'] <= start_of_7_days_ago) & (region_alarms['end'] > start_of_7_days_ago)
-            ].shape[0] > 0
-    
-            # avg_daily_alarm_minutes_last_7_days
-            total_minutes_last_7d = 0
-            days_to_check = 7
-            for i in range(1, days_to_check + 1):
-                day_start = start_of_day - pd.Timedelta(days=i)
-                day_end = day_start + pd.Timedelta(days=1)
-                day_overlap = region_alarms[
-                    (region_alarms['start'] < day_end) & (region_alarms['end'] > day_start)
-                ]
-                minutes_this_day = 0
-                for _, alarm in day_overlap.iterrows():
-                    intersection_start = max(alarm['start'], day_start)
-                    intersection_end = min(alarm['end'], day_end)
-                    duration = (intersection_end - intersection_start).total_seconds() / 60
-                    if duration > 0:
-                        minutes_this_day += duration
-                total_minutes_last_7d += minutes_this_day
-            avg_minutes_last_7d = total_minutes_last_7d / days_to_check if days_to_check > 0 else 0
-    
-            daily_features = {
-                'region_id': region_id,
-                'date': start_of_day.date(),
-                'time_since_last_alarm_end_minutes_at_start_of_day': time_since_last_end,
-                'total_alarm_minutes_yesterday': total_minutes_yesterday,
-                'alarms_started_yesterday': alarms_started_yesterday_count,
-                'alarms_started_trend': alarms_started_trend,
-                'was_alarm_active_end_of_yesterday': was_active_end_of_yesterday,
-                'is_alarm_active_lag_7d': is_active_start_7d_ago,
-                'avg_daily_alarm_minutes_last_7_days': avg_minutes_last_7d,
-            }
-            results_daily.append(daily_features.copy())
-    
-            # hourly processing
-            for hour in range(24):
-                hour_timestamp = start_of_day + pd.Timedelta(hours=hour)
-                hour_end_timestamp = hour_timestamp + pd.Timedelta(hours=1)
-                
-                is_active = int(region_alarms[
-                    (region_alarms['start'] < hour_end_timestamp) &
-                    (region_alarms['end'] > hour_timestamp)
-                ].shape[0] > 0)
-    
-                hourly_record = daily_features.copy()
-                hourly_record.update({
-                    'hour_indicator': hour_timestamp.time(),
-                    'is_alarm_active': is_active
-                })
-                results_hourly.append(hourly_record)
-    
-    
-    hourly_features_df = pd.DataFrame(results_hourly)
-    
-    hourly_features_df['date'] = pd.to_datetime(hourly_features_df['date'])
-    hourly_features_df['datetime'] = hourly_features_df['date'].dt.normalize() + pd.to_timedelta(
-        hourly_features_df['hour_indicator'].astype(str)
-    )
+        update_alarm_daily_aggregates(affected_region_days, db_handler)
+        step.rows = len(affected_region_days)
 
-    alarms_features_prepared = hourly_features_df[hourly_features_df['date'] == target_date]
-    
-    alarms_features_prepared = alarms_features_prepared.drop(columns=['date', 'hour_indicator'])
+    with measure('features') as step:
+        # filter to prevent potentional data leakage, per target day: each day only sees the alarms
+        # started up to the midnight of the latest start in its own window, as a run for that day alone
+        window_start, window_end = alarm_history_window(target_dates)
+        start_days = db_handler.get_alarm_start_days(window_start, window_end)['date']
+        cutoffs = leakage_cutoffs(start_days, target_dates)
+
+        # the lookback comes from the aggregates table; raw alarms are only needed for the days from
+        # the earliest cutoff on, whose aggregates include alarms started after the cutoff, and for
+        # the hourly target
+        aggregates_start = target_dates.min() - pd.Timedelta(days=ALARM_FEATURE_LOOKBACK_DAYS + 1)
+        aggregates_df = db_handler.get_alarm_daily_aggregates(aggregates_start, target_dates.max())
+
+        # days without any stored row (alarm history ingested before the table existed) are computed
+        # from the raw alarms and stored once
+        lookback_days = pd.date_range(aggregates_start, target_dates.max() - pd.Timedelta(days=1), freq='D')
+        stored_days = pd.DatetimeIndex([] if aggregates_df.empty else aggregates_df['date']).normalize()
+        missing_days = lookback_days.difference(stored_days)
+        if len(missing_days):
+            print(f"Computing missing alarm daily aggregates for {len(missing_days)} days.")
+            missing_df = update_alarm_daily_aggregates(
+                [(region_id, day) for region_id in region_mapping.values() for day in missing_days], db_handler)
+            aggregates_df = pd.concat([aggregates_df, missing_df], ignore_index=True)
+
+        history_start = target_dates.append(cutoffs.normalize()).min()
+        history_end = target_dates.max() + pd.Timedelta(days=1)
+        alarms_df = db_handler.get_alerts(start_date=history_start, end_date=history_end, overlapping=True)
+        if alarms_df.empty:
+            alarms_df = pd.DataFrame(columns=['region_id', 'start', 'end'])
+        
+        alarms_df.dropna(subset=['start', 'end'], inplace=True) # filter for empty values
+        alarms_df.sort_values(by=['region_id', 'start'], inplace=True)
+        alarms_df = alarms_df[['region_id', 'start', 'end']].copy()
+
+        hourly_features_df = features_with_cutoffs(aggregates_df, alarms_df, target_dates, cutoffs)
+        step.rows = len(hourly_features_df)
+
+    alarms_features_prepared = hourly_features_df.drop(columns=['date'])
     
     return alarms_features_prepared
 
+def update_alarm_daily_aggregates(region_days, db_handler):
+    """
+    Recomputes the 'alarm_daily_aggregates' rows of the given region-days from the raw alarms,
+    leaving every other region-day untouched.
+
+    Args:
+        region_days (list): (region_id, date) tuples, e.g. as returned by insert_alerts_data.
+        db_handler (DatabaseHandler)
+
+    Returns:
+        pd.DataFrame: The stored rows, 'region_id', 'date' and the aggregate columns.
+    """
+    if not region_days:
+        print("No alarm daily aggregates to update.")
+        return pd.DataFrame(columns=['region_id', 'date'] + AGGREGATE_COLUMNS)
+
+    region_days_df = pd.DataFrame(region_days, columns=['region_id', 'date']).drop_duplicates()
+    region_days_df['date'] = pd.to_datetime(region_days_df['date'])
+
+    # every alarm overlapping the days, however long ago it started
+    history_start = region_days_df['date'].min().normalize()
+    history_end = region_days_df['date'].max().normalize() + pd.Timedelta(days=1)
+    alarms_df = db_handler.get_alerts(start_date=history_start, end_date=history_end, overlapping=True)
+    if alarms_df.empty:
+        alarms_df = pd.DataFrame(columns=['region_id', 'start', 'end'])
+    alarms_df = alarms_df.dropna(subset=['start', 'end'])[['region_id', 'start', 'end']]
+
+    aggregates_df = compute_daily_aggregates(alarms_df, region_days_df)
+    db_handler.upsert_alarm_daily_aggregates(aggregates_df)
+    return aggregates_df
+
+
+def rebuild_alarm_daily_aggregates(start_date, end_date, db_handler):
+    """
+    Recomputes 'alarm_daily_aggregates' for every region and every day from start_date to end_date,
+    e.g. to populate the table from the existing alarm history.
+
+    Args:
+        start_date (datetime): First day to rebuild.
+        end_date (datetime): Last day to rebuild (inclusive).
+        db_handler (DatabaseHandler)
+
+    Returns:
+        pd.DataFrame: The stored rows.
+    """
+    region_ids = db_handler.fetch_region_mapping().values()
+    days = pd.date_range(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize(), freq='D')
+    return update_alarm_daily_aggregates([(region_id, day) for region_id in region_ids for day in days], db_handler)
+
+
 def get_and_process_validation_set(db_handler):
     alarms_df = db_handler.get_alerts(validation_set=True) 
     
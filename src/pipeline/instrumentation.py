@@ -0,0 +1,360 @@
+"""
+Lightweight instrumentation of the pipeline stages.
+
+A PipelineRun collects one StageMetrics per measured step: wall time, CPU time, the process's
+peak RSS when the step ended and how much the step raised it, the peak of traced Python
+allocations (only with trace_memory, tracemalloc slows Python code down noticeably) and the number
+of rows the step produced. Steps are measured with the measure() context manager or the
+instrumented() decorator. Both are no-ops outside an active run, so the processors can be called
+on their own as before. Inside a stage, nested steps are recorded as '<stage>/<step>'.
+
+The active run and stage are context variables, which asyncio tasks and asyncio.to_thread carry
+over: the stages of run_stages are attributed correctly although they run concurrently. CPU time
+is that of the stage's thread plus that of the worker processes that finished meanwhile (the text
+normalization pools); for coroutine stages it includes the other coroutines of the event loop. The
+process-wide memory figures of overlapping stages are upper bounds.
+
+With profile, every top-level stage also runs under cProfile and its stats are dumped to
+data/pipeline_runs/profiles/<run_id>/<stage>.prof (inspect with python -m pstats).
+
+At the end of a run, write_report() saves a JSON report under data/pipeline_runs/, next to
+data/predictions, and save() stores the stage rows in the 'pipeline_runs' table.
+"""
+
+import contextvars
+import cProfile
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+REPORT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'pipeline_runs'))
+
+_current_run = contextvars.ContextVar('pipeline_run', default=None)
+_current_stage = contextvars.ContextVar('pipeline_stage', default=None)
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process in MB (None where unsupported).
+    """
+
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _children_cpu_seconds():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def count_rows(result):
+    """
+    Returns the number of rows of a stage result, or None if it is not tabular.
+    """
+
+    if isinstance(result, (pd.DataFrame, pd.Series, np.ndarray, list, tuple)):
+        return len(result)
+    return None
+
+
+class StageMetrics:
+    def __init__(self, name, started_at, status='running'):
+        self.name = name
+        self.started_at = started_at
+        self.finished_at = None
+        self.status = status
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_mb = None
+        self.rss_growth_mb = None
+        self.traced_peak_mb = None
+        self.rows = None
+        self.error = None
+        self.profile_path = None
+
+    def to_dict(self):
+        record = dict(vars(self))
+        for key in ('started_at', 'finished_at'):
+            if record[key] is not None:
+                record[key] = record[key].isoformat(timespec='seconds')
+        return record
+
+
+class PipelineRun:
+    """
+    The metrics of one run of a pipeline.
+    """
+
+    def __init__(self, pipeline, target_date=None, profile=False, trace_memory=False, report_dir=REPORT_DIR):
+        """
+        Args:
+            pipeline (str): Pipeline name, e.g. 'daily_forecast'.
+            target_date (datetime, optional): Target date of the run.
+            profile (bool, optional): Run every top-level stage under cProfile. Defaults to False.
+            trace_memory (bool, optional): Trace Python allocations with tracemalloc. Defaults to False.
+            report_dir (str, optional): Directory of the JSON reports and profiles.
+        """
+
+        self.pipeline = pipeline
+        self.target_date = target_date
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.report_dir = report_dir
+        self.run_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.started_at = None
+        self.finished_at = None
+        self.status = 'running'
+        self.stages = []
+        self._active_stages = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        """
+        Makes this the active run of the block: measure() and instrumented() record into it.
+        """
+        self.started_at = datetime.now()
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        token = _current_run.set(self)
+        try:
+            yield self
+            self.status = 'done'
+        except BaseException:
+            self.status = 'failed'
+            raise
+        finally:
+            _current_run.reset(token)
+            if started_tracing:
+                tracemalloc.stop()
+            self.finished_at = datetime.now()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures the block as the stage name; the yielded StageMetrics' rows may be set by the block.
+        """
+        metrics = StageMetrics(name, datetime.now())
+        tracing = tracemalloc.is_tracing()
+        with self._lock:
+            self.stages.append(metrics)
+            # the traced peak is process-wide; it is only reset while no other stage runs
+            if tracing and self._active_stages == 0:
+                tracemalloc.reset_peak()
+            self._active_stages += 1
+        traced_start = tracemalloc.get_traced_memory()[0] if tracing else None
+        rss_start = peak_rss_mb()
+
+        profiler = None
+        if self.profile and _current_stage.get() is None:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:  # another profiler is active (Python 3.12+ allows only one per process)
+                print(f"Stage '{name}' is not profiled: {e}")
+                profiler = None
+
+        token = _current_stage.set(name)
+        cpu_start = time.thread_time() + _children_cpu_seconds()
+        wall_start = time.perf_counter()
+        try:
+            yield metrics
+            metrics.status = 'done'
+        except BaseException as e:
+            metrics.status = 'failed'
+            metrics.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            metrics.wall_seconds = time.perf_counter() - wall_start
+            metrics.cpu_seconds = time.thread_time() + _children_cpu_seconds() - cpu_start
+            _current_stage.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                metrics.profile_path = self._dump_profile(profiler, name)
+
+            metrics.peak_rss_mb = peak_rss_mb()
+            if rss_start is not None:
+                metrics.rss_growth_mb = metrics.peak_rss_mb - rss_start
+            if traced_start is not None and tracemalloc.is_tracing():
+                metrics.traced_peak_mb = max(tracemalloc.get_traced_memory()[1] - traced_start, 0) / 1024 ** 2
+            metrics.finished_at = datetime.now()
+            with self._lock:
+                self._active_stages -= 1
+
+    def record(self, name, status, wall_seconds=None, rows=None):
+        """
+        Records a stage that did not run, e.g. one loaded from its checkpoint.
+        """
+        metrics = StageMetrics(name, datetime.now(), status)
+        metrics.finished_at = metrics.started_at
+        metrics.wall_seconds = wall_seconds
+        metrics.rows = rows
+        with self._lock:
+            self.stages.append(metrics)
+        return metrics
+
+    def _dump_profile(self, profiler, name):
+        directory = os.path.join(self.report_dir, 'profiles', self.run_id)
+        path = os.path.join(directory, f"{name.replace('/', '.')}.prof")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(path)
+            return path
+        except OSError as e:
+            print(f"Could not write the profile of stage '{name}': {e}")
+            return None
+
+    def report(self):
+        """
+        Returns the run and its stages as a JSON-serializable dict.
+        """
+        wall_seconds = None
+        if self.started_at is not None and self.finished_at is not None:
+            wall_seconds = (self.finished_at - self.started_at).total_seconds()
+        return {
+            'run_id': self.run_id,
+            'pipeline': self.pipeline,
+            'target_date': self.target_date.strftime('%Y-%m-%d') if self.target_date is not None else None,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+            'wall_seconds': wall_seconds,
+            'peak_rss_mb': peak_rss_mb(),
+            'trace_memory': self.trace_memory,
+            'stages': [metrics.to_dict() for metrics in self.stages],
+        }
+
+    def write_report(self):
+        """
+        Writes the JSON report of the run to report_dir.
+
+        Returns:
+            str: Path of the report, or None if it could not be written.
+        """
+        path = os.path.join(self.report_dir, f"{self.pipeline}_{self.run_id}.json")
+        try:
+            os.makedirs(self.report_dir, exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, indent=2)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Could not write the run report: {e}")
+            return None
+        print(f"Run report written to {path}")
+        return path
+
+    def to_frame(self):
+        """
+        Returns one row per recorded stage, in the layout of the 'pipeline_runs' table.
+        """
+        df = pd.DataFrame([metrics.to_dict() for metrics in self.stages],
+                          columns=list(StageMetrics('', None).to_dict()))
+        df = df.rename(columns={'name': 'stage', 'rows': 'row_count'}).drop(columns=['profile_path'])
+        df['started_at'] = pd.to_datetime(df['started_at'])
+        df['finished_at'] = pd.to_datetime(df['finished_at'])
+        df['row_count'] = df['row_count'].astype('Int64')
+        df.insert(0, 'run_id', self.run_id)
+        df.insert(1, 'pipeline', self.pipeline)
+        df.insert(2, 'target_date', self.target_date)
+        return df
+
+    def save(self, db_handler):
+        """
+        Stores the stages of the run in the 'pipeline_runs' table.
+        """
+        if self.stages:
+            db_handler.insert_pipeline_runs(self.to_frame())
+
+    def print_summary(self):
+        """
+        Prints the wall time, CPU time, memory and rows of every recorded stage.
+        """
+        def fmt(value, width, spec):
+            return ('-' if value is None else format(value, spec)).rjust(width)
+
+        print(f"\n===== RUN {self.run_id} ({self.pipeline}) =====")
+        print(f"  {'stage':<28} {'status':<10} {'wall s':>8} {'cpu s':>8} {'peak MB':>8} {'+MB':>7} {'traced MB':>9} {'rows':>8}")
+        for metrics in self.stages:
+            print(f"  {metrics.name:<28} {metrics.status:<10} {fmt(metrics.wall_seconds, 8, '.2f')} "
+                  f"{fmt(metrics.cpu_seconds, 8, '.2f')} {fmt(metrics.peak_rss_mb, 8, '.0f')} "
+                  f"{fmt(metrics.rss_growth_mb, 7, '.0f')} {fmt(metrics.traced_peak_mb, 9, '.1f')} "
+                  f"{fmt(metrics.rows, 8, 'd')}")
+
+
+def current_run():
+    """
+    Returns the active PipelineRun, or None.
+    """
+
+    return _current_run.get()
+
+
+@contextmanager
+def measure(name):
+    """
+    Measures the block as a step of the active run, named '<stage>/<name>' inside a stage. Outside
+    a run nothing is recorded. The yielded StageMetrics' rows may be set by the block.
+
+    Usage:
+        with measure('normalize') as step:
+            texts = normalize(texts)
+            step.rows = len(texts)
+    """
+    run = _current_run.get()
+    if run is None:
+        yield StageMetrics(name, None)
+        return
+
+    parent = _current_stage.get()
+    with run.stage(name if parent is None else f"{parent}/{name}") as metrics:
+        yield metrics
+
+
+def instrumented(name=None):
+    """
+    Decorator measuring every call of a function (or coroutine function) with measure(); the rows
+    are counted from its return value.
+
+    Args:
+        name (str, optional): Step name. Defaults to the function's name.
+    """
+
+    def decorator(func):
+        step_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with measure(step_name) as metrics:
+                    result = await func(*args, **kwargs)
+                    metrics.rows = count_rows(result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(step_name) as metrics:
+                result = func(*args, **kwargs)
+                metrics.rows = count_rows(result)
+                return result
+        return wrapper
+
+    return decorator
@@ -0,0 +1,245 @@
+"""
+Fitted TF-IDF vectorizers and SVD reducers of the text pipelines, as memory-mapped arrays.
+
+The pickled artifacts (artifacts/tfidf_vectorizer_<name>.pkl and artifacts/svd_reducer_<name>.pkl)
+are exported once to artifacts/text_<name>/: the vocabulary (terms in column order), the IDF weights
+and the SVD components as .npy files, the vectorizer parameters as JSON, and a manifest with the
+SHA-256 of every file and of the source pickles. The registry loads each export once per process,
+validates it against the manifest and memory-maps the arrays read-only, so every caller in the
+process (and every process on the host, through the page cache) shares one copy. The export is
+rebuilt when the source pickles change.
+
+Usage:
+    python -m src.pipeline.text_artifacts isw tg
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+ARTIFACTS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'artifacts'))
+TEXT_ARTIFACT_NAMES = ('isw', 'tg')
+ARRAY_FILES = ('vocabulary.npy', 'idf.npy', 'components.npy')
+MANIFEST_FILE = 'manifest.json'
+VECTORIZER_FILE = 'vectorizer.json'
+
+
+def file_checksum(path, block_size=1 << 20):
+    """
+    Returns the SHA-256 hex digest of a file.
+    """
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_paths(name, artifacts_dir=ARTIFACTS_DIR):
+    """
+    Returns the paths of the pickled vectorizer and SVD reducer of a text pipeline.
+    """
+
+    return (os.path.join(artifacts_dir, f'tfidf_vectorizer_{name}.pkl'),
+            os.path.join(artifacts_dir, f'svd_reducer_{name}.pkl'))
+
+
+def export_dir(name, artifacts_dir=ARTIFACTS_DIR):
+    return os.path.join(artifacts_dir, f'text_{name}')
+
+
+def _vectorizer_params(vectorizer):
+    params = vectorizer.get_params()
+    for key in ('analyzer', 'preprocessor', 'tokenizer'):
+        if callable(params[key]):
+            raise ValueError(f"Cannot export a vectorizer with a custom {key}.")
+    params['dtype'] = np.dtype(params['dtype']).name
+    params['ngram_range'] = list(params['ngram_range'])
+    if params['stop_words'] is not None and not isinstance(params['stop_words'], str):
+        params['stop_words'] = sorted(params['stop_words'])
+    params['vocabulary'] = None
+    return params
+
+
+def export_text_artifacts(name, artifacts_dir=ARTIFACTS_DIR):
+    """
+    Exports the pickled vectorizer and SVD reducer of a text pipeline to .npy arrays.
+
+    Args:
+        name (str): Pipeline name, 'isw' or 'tg'.
+        artifacts_dir (str, optional): Directory of the pickles and the export.
+
+    Returns:
+        dict: The manifest of the export.
+    """
+    vectorizer_path, svd_path = source_paths(name, artifacts_dir)
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open(svd_path, 'rb') as f:
+        svd_reducer = pickle.load(f)
+
+    vocabulary = np.empty(len(vectorizer.vocabulary_), dtype=object)
+    for term, column in vectorizer.vocabulary_.items():
+        vocabulary[column] = term
+    arrays = {
+        'vocabulary.npy': vocabulary.astype(str),
+        'idf.npy': np.ascontiguousarray(vectorizer.idf_, dtype=np.float64),
+        'components.npy': np.ascontiguousarray(svd_reducer.components_),
+    }
+    if arrays['components.npy'].shape[1] != len(vocabulary):
+        raise ValueError(f"The SVD reducer of '{name}' does not match its vectorizer's vocabulary.")
+
+    out_dir = export_dir(name, artifacts_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {
+        'name': name,
+        'sources': {os.path.basename(path): file_checksum(path) for path in (vectorizer_path, svd_path)},
+        'files': {},
+    }
+    for filename, array in arrays.items():
+        path = os.path.join(out_dir, filename)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, array, allow_pickle=False)
+        os.replace(path + '.tmp', path)
+        manifest['files'][filename] = file_checksum(path)
+
+    path = os.path.join(out_dir, VECTORIZER_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(_vectorizer_params(vectorizer), f, indent=2)
+    os.replace(path + '.tmp', path)
+    manifest['files'][VECTORIZER_FILE] = file_checksum(path)
+
+    # written last: an export without a manifest is incomplete
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+    print(f"Exported text artifacts '{name}' to {out_dir}.")
+    return manifest
+
+
+class TextArtifacts:
+    """
+    The fitted TF-IDF vectorizer and SVD components of one text pipeline, backed by read-only
+    memory-mapped arrays.
+    """
+
+    def __init__(self, name, directory):
+        self.name = name
+        self.vocabulary = np.load(os.path.join(directory, 'vocabulary.npy'), mmap_mode='r')
+        self.idf = np.load(os.path.join(directory, 'idf.npy'), mmap_mode='r')
+        self.components = np.load(os.path.join(directory, 'components.npy'), mmap_mode='r')
+        with open(os.path.join(directory, VECTORIZER_FILE), encoding='utf-8') as f:
+            self.vectorizer_params = json.load(f)
+        self._vectorizer = None
+        self._lock = threading.Lock()
+
+    @property
+    def n_components(self):
+        return self.components.shape[0]
+
+    @property
+    def vectorizer(self):
+        """
+        TfidfVectorizer equivalent to the pickled one, built on first use.
+        """
+        with self._lock:
+            if self._vectorizer is None:
+                params = dict(self.vectorizer_params)
+                params['dtype'] = np.dtype(params['dtype']).type
+                params['ngram_range'] = tuple(params['ngram_range'])
+                vectorizer = TfidfVectorizer(**params)
+                vectorizer.vocabulary_ = {term: column for column, term in enumerate(self.vocabulary.tolist())}
+                vectorizer.idf_ = self.idf
+                self._vectorizer = vectorizer
+            return self._vectorizer
+
+    def transform(self, texts):
+        """
+        Projects texts onto the SVD components, like svd_reducer.transform(tfidf_vectorizer.transform(texts)).
+
+        Args:
+            texts (iterable): Normalized texts.
+
+        Returns:
+            np.ndarray: One row of n_components values per text.
+        """
+        return self.vectorizer.transform(texts) @ self.components.T
+
+
+class TextArtifactRegistry:
+    def __init__(self, artifacts_dir=ARTIFACTS_DIR):
+        self.artifacts_dir = artifacts_dir
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def _export_is_current(self, name):
+        directory = export_dir(name, self.artifacts_dir)
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+
+        # the pickles may be left out of a deployment; the export is used on its own then
+        for path in source_paths(name, self.artifacts_dir):
+            expected = manifest['sources'].get(os.path.basename(path))
+            if os.path.exists(path) and file_checksum(path) != expected:
+                print(f"Text artifacts '{name}' are older than {os.path.basename(path)}.")
+                return False
+
+        for filename, expected in manifest['files'].items():
+            path = os.path.join(directory, filename)
+            if not os.path.exists(path) or file_checksum(path) != expected:
+                raise ValueError(f"Text artifact {path} does not match its checksum.")
+        return True
+
+    def get(self, name):
+        """
+        Returns the TextArtifacts of a text pipeline, loaded and validated once per process and
+        exported from the pickles first if needed.
+
+        Args:
+            name (str): Pipeline name, 'isw' or 'tg'.
+
+        Returns:
+            TextArtifacts
+        """
+        artifacts = self._artifacts.get(name)
+        if artifacts is not None:
+            return artifacts
+
+        with self._lock:
+            if name not in self._artifacts:
+                if not self._export_is_current(name):
+                    export_text_artifacts(name, self.artifacts_dir)
+                self._artifacts[name] = TextArtifacts(name, export_dir(name, self.artifacts_dir))
+                print(f"Loaded text artifacts '{name}'.")
+            return self._artifacts[name]
+
+    def invalidate(self, name=None):
+        """
+        Drops a loaded pipeline's artifacts, or all of them.
+        """
+        with self._lock:
+            if name is None:
+                self._artifacts.clear()
+            else:
+                self._artifacts.pop(name, None)
+
+
+# shared by every caller in the process
+text_artifacts = TextArtifactRegistry()
+
+
+if __name__ == '__main__':
+    import sys
+
+    for artifact_name in sys.argv[1:] or TEXT_ARTIFACT_NAMES:
+        export_text_artifacts(artifact_name)
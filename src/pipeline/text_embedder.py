@@ -0,0 +1,139 @@
+"""
+Batched TF-IDF -> SVD projection of the text pipelines.
+
+svd_reducer.transform(tfidf_vectorizer.transform(texts)) builds the count matrix, scales it by the
+IDF weights, normalizes the rows and multiplies the result by components_.T, validating and
+copying the matrix at every step. The embedder performs the same floating-point operations in the
+same order (counts with sorted indices, sublinear scaling, IDF weights, sklearn's normalize, one
+sparse-dense product with the memory-mapped components) directly on the CSR arrays of a batch of
+documents, so the features are identical to the two-step transform, bit for bit
+(benchmarks/bench_text_embedder.py checks it against the pickled artifacts).
+"""
+
+import threading
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+from src.pipeline.text_artifacts import text_artifacts
+
+DEFAULT_BATCH_SIZE = 512
+
+
+class TextEmbedder:
+    """
+    Projects normalized texts onto the SVD components of a text pipeline, in batches.
+    """
+
+    def __init__(self, artifacts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Args:
+            artifacts (TextArtifacts): Fitted vectorizer and SVD components of the pipeline.
+            batch_size (int, optional): Documents projected per sparse-dense product.
+        """
+
+        params = artifacts.vectorizer_params
+        if not params['use_idf']:
+            raise ValueError("TextEmbedder requires a vectorizer fitted with use_idf=True.")
+
+        self.artifacts = artifacts
+        self.batch_size = batch_size
+        self.norm = params['norm']
+        self.sublinear_tf = params['sublinear_tf']
+        self.binary = params['binary']
+        self.dtype = np.dtype(params['dtype'])
+
+        vectorizer = artifacts.vectorizer
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = artifacts.idf
+        self.components_t = artifacts.components.T
+
+    @property
+    def n_components(self):
+        return self.components_t.shape[1]
+
+    def _term_frequencies(self, texts):
+        vocabulary = self.vocabulary
+        indices = []
+        indptr = [0]
+        for text in texts:
+            for term in self.analyzer(text):
+                column = vocabulary.get(term)
+                if column is not None:
+                    indices.append(column)
+            indptr.append(len(indices))
+
+        # counts with sorted column indices, in the vectorizer's dtype, as CountVectorizer builds them
+        tf = sp.csr_matrix((np.ones(len(indices), dtype=self.dtype), np.asarray(indices, dtype=np.int64),
+                            np.asarray(indptr)), shape=(len(indptr) - 1, len(self.idf)))
+        tf.sum_duplicates()
+        if self.binary:
+            tf.data.fill(1)
+        return tf
+
+    def _tfidf(self, tf):
+        # the steps of TfidfTransformer.transform, in its order
+        if self.sublinear_tf:
+            np.log(tf.data, tf.data)
+            tf.data += 1.0
+        tf.data *= self.idf[tf.indices]
+        if self.norm is not None:
+            tf = normalize(tf, norm=self.norm, copy=False)
+        return tf
+
+    def embed_batch(self, texts):
+        """
+        Projects one batch of texts.
+
+        Args:
+            texts (list): Normalized texts.
+
+        Returns:
+            np.ndarray: (len(texts), n_components) array.
+        """
+        return np.asarray(self._tfidf(self._term_frequencies(texts)) @ self.components_t)
+
+    def embed(self, texts):
+        """
+        Projects texts batch_size at a time, equivalent to
+        svd_reducer.transform(tfidf_vectorizer.transform(texts)).
+
+        Args:
+            texts (iterable): Normalized texts.
+
+        Returns:
+            np.ndarray: One row of n_components values per text.
+        """
+        batches = []
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == self.batch_size:
+                batches.append(self.embed_batch(batch))
+                batch = []
+        if batch or not batches:
+            batches.append(self.embed_batch(batch))
+        return np.vstack(batches)
+
+
+_embedders = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(name):
+    """
+    Returns the TextEmbedder of a text pipeline, built once per loaded set of artifacts.
+
+    Args:
+        name (str): Pipeline name, 'isw' or 'tg'.
+
+    Returns:
+        TextEmbedder
+    """
+    artifacts = text_artifacts.get(name)
+    with _embedders_lock:
+        embedder = _embedders.get(name)
+        if embedder is None or embedder.artifacts is not artifacts:
+            embedder = TextEmbedder(artifacts)
+            _embedders[name] = embedder
+        return embedder
@@ -0,0 +1,320 @@
+"""
+Text normalisation shared by the ISW and Telegram processors: encoding fixes, removal of report
+boilerplate and URLs, lowercasing, punctuation and digit removal, tokenization, stop-word filtering
+and lemmatization.
+
+The patterns are compiled and the stop-word sets frozen once, at import, and lemmas are memoised,
+so normalising a document only runs the patterns and tokenizer over it. normalize_many() spreads
+large batches (historical corpora) over a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import re
+import ftfy
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+LEMMA_CACHE_SIZE = 200000
+# below this many documents a process pool costs more than it saves
+MIN_DOCUMENTS_PER_POOL = 64
+
+ISW_CUSTOM_STOP_WORDS = {
+    # report metadata
+    'isw', 'report', 'assessment', 'update', 'backgrounder', 'pm', 'est',
+    'eet', 'local', 'time', 'et', 'key', 'takeaway', 'item', 'watch',
+    'click', 'map', 'interactive', 'see', 'figure', 'source', 'url', 'http',
+    'https', 'www', 'published', 'updated', 'accessed', 'twitter', 'telegram',
+    'note', 'isws', 'daily', 'reference', 'statement', 'backgrounder',
+
+    # generic time references
+    'january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+    'september', 'october', 'november', 'december', 'monday', 'tuesday',
+    'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'day', 'week',
+    'month', 'year', 'hour', 'date', 'recent', 'recently', 'past', 'future',
+
+    # generic verbs
+    'include', 'including', 'also', 'may', 'provide', 'provides', 'provided',
+    'providing', 'conduct', 'conducts', 'conducted', 'conducting',
+    'continue', 'continues', 'continued', 'continuing', 'develop', 'develops',
+    'developed', 'developing', 'indicate', 'indicates', 'indicated',
+    'indicating', 'use', 'using', 'used', 'state', 'stated', 'claim', 'claimed',
+    'assess', 'assessed',
+
+    # generic nouns
+    'area', 'effort', 'system', 'process', 'part', 'level', 'type', 'way',
+    'situation', 'presence', 'resource', 'result', 'status', 'structure',
+    'support', 'basis', 'center', 'change', 'condition', 'facility',
+    'material', 'measure', 'member', 'number', 'order', 'percent',
+    'security', 'series', 'service', 'term', 'people', 'city', 'region',
+    'plan', 'objective', 'potential', 'capability', 'capacity',
+
+    # generic connectives
+    'however', 'unspecified', 'element', 'although', 'another', 'available',
+    'following', 'former', 'main', 'need', 'public', 'publicly', 'still',
+    'throughout', 'well', 'would', 'yet', 'ability', 'able', 'access',
+
+    # authors
+    'fredrick', 'kagan', 'george', 'barros', 'kateryna', 'katya',
+    'stepanenko', 'karolina', 'hird', 'mason', 'clark', 'frederick',
+    'grace', 'mappes', 'katherine', 'lawlor', 'frederick', 'layne',
+    'philipson', 'angela', 'howard', 'riley', 'bailey', 'nicole',
+    'wolkov', 'angelica', 'evans', 'christina', 'harward',
+}
+
+TELEGRAM_CUSTOM_STOP_WORDS = {
+    # --- Metadata / Reporting / Channel Specific ---
+    "повідомлення", "сообщение", "повідомляють", "сообщают", "інформація", "информация", "офіційно", "официально",
+    "неофіційно", "неофициально", "підтверджено", "подтверждено", "непідтверджено", "неподтверждено", "оновлення",
+    "обновление",
+    "доповнення", "дополнение", "дані", "данные", "станом", "состоянию", "джерело", "источник", "згідно",
+    "согласно",
+    "як", "как", "без",
+    "канал", "channel", "телеграм", "телеграмм", "telegram", "пост", "post", "публікація", "публикация",
+    "репост", "пересилка", "forwarded", "fwd", "увага", "внимание", "важливо", "важно", "терміново", "срочно",
+    "екстрено", "экстренно", "звіт", "отчет", "огляд", "обзор", "ситуація", "ситуация", "карта", "карты",
+    "актуальна", "актуальная", "інтерактивна", "интерактивная", "карта", "карті", "карте",
+    "попередньо", "предварительно", "уточнюється", "уточняется", "деталі", "детали", "подробиці", "подробности",
+    "відомо", "известно", "пишуть", "пишут", "кажуть", "говорят", "заявили", "заявил", "заявила", "заявило",
+    "коментар", "комментарий", "цитата", "заява", "заявление", "інтерв'ю", "интервью", "брифінг", "брифинг",
+    "підсумок", "итог", "підсумки", "итоги", "аналіз", "анализ", "оцінка", "оценка", "факт", "від", "от",
+    "фактчекінг", "фактчекинг", "спростування", "опровержение", "реакція", "реакция", "читати", "читать",
+    "дивитись", "смотреть",
+    "далі", "далее", "тут", "здесь", "нижче", "ниже", "вище", "выше", "посилання", "ссылка", "лінк", "линк",
+    "продовження", "продолжение", "початок", "начало", "кінець", "конец", "частина", "часть", "номер", "№", "no",
+    "фото", "відео", "аудіо", "photo", "video", "audio", "скріншот", "скриншот", "screenshot", "UPD", "upd",
+    "станом", "обстановка",
+
+    # --- Generic Time References ---
+    "година", "годин", "год", "час", "часов", "хвилина", "хвилин", "хв", "минута", "минут", "мин",
+    "секунда", "секунд", "сек",
+    "день", "дня", "днів", "день", "дня", "дней",
+    "ніч", "ночі", "ночей", "ночь", "ночи", "ночей",
+    "ранок", "ранку", "утро", "утра", "вечір", "вечора", "вечер", "вечера",
+    "сьогодні", "сегодня", "вчора", "вчера", "завтра",
+    "нещодавно", "недавно", "зранку", "утром", "вдень", "днем",
+    "ввечері", "вечером", "вночі", "ночью", "дата",
+    "місяць", "месяц", "рік", "год", "тиждень", "неделя",
+    "минулий", "прошлый", "наступний", "следующий", "поточний", "текущий", "зараз", "сейчас", "тепер", "теперь",
+    "потім", "потом", "доба", "сутки", "годинник", "часы", "календар", "календарь",
+    "понеділок", "вівторок", "середа", "четвер", "п'ятниця", "субота", "неділя",
+    "понедельник", "вторник", "среда", "четверг", "пятница", "суббота", "воскресенье",
+    "січень", "лютий", "березень", "квітень", "травень", "червень", "липень", "серпень", "вересень", "жовтень",
+    "листопад", "грудень",
+    "январь", "февраль", "март", "апрель", "май", "июнь", "июль", "август", "сентябрь", "октябрь", "ноябрь",
+    "декабрь",
+    "близько", "около", "приблизно", "приблизительно", "орієнтовно", "ориентировочно", "біля", "около",
+    "РФ", "назад", "тому",
+
+    # --- Generic Verbs ---
+    "бути", "быть", "мати", "иметь", "робити", "делать", "зробити", "сделать", "могти", "мочь", "вміти", "уметь",
+    "сказати", "сказать", "говорити", "говорить", "повідомляти", "сообщать", "повідомити", "сообщить",
+    "тривати", "продолжаться", "продовжувати", "продолжать", "починати", "начинать", "почати", "начать",
+    "закінчувати", "заканчивать", "закінчити", "закончить", "знаходитись", "находиться", "перебувати", "пребывать",
+    "відбуватись", "происходить", "стати", "стать", "чути", "слышать", "давати", "давать", "дати", "дать", "брати",
+    "брать", "взяти", "взять", "отримувати", "получать",
+    "отримати", "получить", "використовувати", "использовать", "застосовувати", "применять", "здійснювати",
+    "осуществлять",
+    "працювати", "работать", "діяти", "действовать", "залишатись", "оставаться", "залишити", "оставить",
+    "очікувати", "ожидать", "очікується", "ожидается", "рухатись", "двигаться", "йти", "идти", "їхати", "ехать",
+    "летіти", "лететь", "прибувати", "прибывать", "виглядати", "выглядеть", "намагатись", "пытаться", "пробувати",
+    "пробовать",
+    "вважати", "считать", "називати", "называть", "заявляти", "заявлять", "фіксувати", "фиксировать",
+    "спостерігати", "наблюдать", "означати", "означать", "значити", "значить",
+    "підтверджувати", "подтверждать", "спростовувати", "опровергать", "зберігати", "сохранять", "захищати",
+    "защищать",
+    "атакувати", "атаковать", "вести", "включати", "включать", "містити", "содержать",
+
+    # --- Generic Nouns ---
+    "район", "область", "місто", "село", "населений", "пункт",
+    "територія", "территория", "регіон", "регион", "країна", "страна", "місце", "место", "зона", "зона",
+    "напрямок", "направление", "бік", "сторона", "частина", "часть", "ділянка", "участок", "сектор", "сектор",
+    "тип", "тип", "вид", "вид", "різновид", "разновидность", "рівень", "уровень", "ступінь", "степень",
+    "кількість", "количество", "номер", "номер", "число", "число", "група", "группа", "особа", "лицо", "люди",
+    "люди",
+    "населення", "население", "мешканці", "жители", "громада",
+    "засіб", "средство", "об'єкт", "объект", "предмет", "предмет", "питання", "вопрос", "тема", "тема",
+    "причина", "причина", "наслідок", "последствие", "результат", "результат", "вихід", "выход", "вхід", "вход",
+    "шлях", "путь", "дорога", "дорога", "мета", "цель", "завдання", "задача", "план", "план",
+    "дія", "действие", "подія", "событие", "випадок", "случай", "можливість", "возможность", "здатність",
+    "способность",
+    "стан", "состояние", "статус", "статус", "зміна", "изменение", "процес", "процесс", "розвиток", "развитие",
+    "підтримка", "поддержка", "допомога", "помощь", "ресурс", "ресурс", "потреба", "необходимость", "потребность",
+    "влада", "власть", "уряд", "правительство", "організація", "организация", "служба",
+    "захід", "мероприятие", "зустріч", "встреча", "переговори", "переговоры",
+    "вогонь", "огонь", "вода", "вода", "земля", "земля", "повітря", "воздух",
+    "життя", "жизнь", "смерть", "смерть", "здоров'я", "здоровье", "залишки", "ліс", "лес",
+
+    # --- Generic Adjectives / Adverbs ---
+    "новий", "новый", "старий", "старый", "великий", "большой", "малий", "малый", "маленький",
+    "добрий", "добрый", "хороший", "гарний", "красивый", "поганий", "плохой",
+    "можливий", "возможный", "ймовірний", "вероятный", "очевидний", "очевидный",
+    "різний", "разный", "інший", "другой", "иной", "однаковий", "одинаковый", "схожий", "похожий",
+    "загальний", "общий", "основний", "основной", "головний", "главный", "важливий", "важный",
+    "певний", "определенный", "невизначений", "неопределенный", "відомий", "известный", "невідомий", "неизвестный",
+    "військовий", "военный", "цивільний", "гражданский",
+    "останній", "последний", "попередній", "предыдущий", "наступний", "следующий",
+    "правий", "правый", "лівий", "левый", "верхній", "верхний", "нижній", "нижний",
+    "східний", "восточный", "західний", "западный", "північний", "северный", "південний", "южный",
+    "швидко", "быстро", "повільно", "медленно", "добре", "хорошо", "погано", "плохо",
+    "сильно", "сильно", "слабко", "слабо", "більше", "больше", "менше", "меньше", "краще", "лучше", "гірше", "хуже",
+    "разом", "вместе", "окремо", "отдельно", "приблизно", "приблизительно",
+    "майже", "почти", "дуже", "очень", "надто", "слишком", "достатньо", "достаточно", "особливо", "особенно",
+    "звичайно", "обычно",
+    "переважно", "преимущественно", "насправді", "на самом деле", "дійсно", "действительно",
+    "зокрема", "в частности", "наприклад", "например",
+
+    # --- Numbers / Quantifiers ---
+    "один", "одна", "одне",
+    "два", "дві",
+    "три",
+    "чотири", "четыре",
+    "п'ять", "пять", "шість", "шесть", "сім", "семь", "вісім", "восемь", "дев'ять", "девять", "десять",
+    "нуль", "ноль", "декілька", "несколько", "багато", "много", "мало", "кілька", "несколько",
+    "пара", "сотня", "тисяча", "тысяча", "мільйон", "миллион",
+    "перший", "первый", "другий", "второй", "третій", "третий", "четвертий", "четвертый", "п'ятий", "пятый",
+    "раз", "рази", "раза",
+
+    # --- Other ---
+    "берег", "катер", "острів", "остров", "імовірність", "вероятность", "з", "из", "слово", "Міноборони",
+    "Минобороны", "вимикати", "выключать",
+    "підрозділ", "подразделение", "скупчення", "скопление", "підписувати", "подписывать", "над", "на""повторний",
+    "повторный", "прямий", "прямой",
+    "місія", "миссия", "передавати", "передавать", "береговий", "береговой", "лінія", "линия", "мінімум", "минимум",
+    "департамент", "захист", "защита",
+    "війна", "война", "ЗСУ", "Генштаб", "журналіст", "журналист", "уточнення", "уточнение", "склад", "міністерство",
+    "министерство", "оборона",
+    "зв'язок", "связь", "окупант", "оккупант", "обіцяти", "обещать", "компанія", "компания", "загалом", "в общем",
+    "в целом", "інфраструктура",
+    "пожежа", "пожар", "внаслідок", "вследствие", "поранити", "ранить", "жінка", "женщина", "голова", "глава",
+    "ОВА", "президент", "збирати", "собирать",
+    "супутник", "спутник", "одиниця", "единица", "застосунок", "приложение", "опублікувати", "опубликовать",
+    "супутниковий", "спутниковый", "знімок", "снимок",
+    "водосховище", "водохранилище", "енергоблок", "черга", "очередь", "відповідь", "ответ", "ваш", "зупинитися",
+    "остановиться", "житловий", "жилой",
+    "відповідний", "соответствующий", "розділитися", "разделиться", "фонд", "відкрити", "открыть", "збір", "сбор",
+    "повз", "мимо", "більшість", "большинство"
+}
+
+ISW_STOP_WORDS = frozenset(stopwords.words('english')) | frozenset(ISW_CUSTOM_STOP_WORDS)
+TELEGRAM_STOP_WORDS = frozenset(stopwords.words('russian')) | frozenset(TELEGRAM_CUSTOM_STOP_WORDS)
+
+ISW_REMOVE_PATTERNS = (
+    # author line patterns
+    re.compile(r"Russian Offensive Campaign Assessment,.*?\d{1,2}:\d{2}\s*(?:am|pm)\s*ET", re.IGNORECASE),
+    # common map links
+    re.compile(r"Click here to see ISW’s interactive map.*?\.", re.IGNORECASE),
+    # bracketed numbers
+    re.compile(r'\[\d+\]'),
+)
+
+TELEGRAM_REMOVE_PATTERNS = (
+    # common map links
+    re.compile(r"https://hromadske.ua/posts*?\.", re.IGNORECASE),
+    # bracketed numbers
+    re.compile(r'\[\d+\]'),
+    # urls
+    re.compile(
+        r'((([A-Za-z]{3,9}:(?://)?)(?:[-;:&=\+\$,\w]+@)?[A-Za-z0-9.-]+|(?:www.|[-;:&=\+\$,\w]+@)[A-Za-z0-9.-]+)((?:/[\+~%/.\w_-]*)?\??(?:[-\+=&;%@.\w_]*)#?(?:[.\!/\\\w]*)))'),
+)
+
+DIGITS_PATTERN = re.compile(r'\d+')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s-]')
+DETACHED_HYPHEN_PATTERN = re.compile(r'\s-\s|\s-$|^-')
+
+_lemmatizer = WordNetLemmatizer()
+
+
+class TextNormalizer:
+    """
+    Turns raw report text into the space-separated lemmas the TF-IDF vectorizers were fitted on.
+    """
+
+    def __init__(self, stop_words, remove_patterns=(), lemma_cache_size=LEMMA_CACHE_SIZE):
+        """
+        Args:
+            stop_words (frozenset): Tokens dropped before lemmatization.
+            remove_patterns (tuple, optional): Compiled patterns removed from the text before lowercasing, in order.
+            lemma_cache_size (int, optional): Number of memoised lemmas.
+        """
+
+        self.stop_words = frozenset(stop_words)
+        self.remove_patterns = tuple(remove_patterns)
+        self.lemma_cache_size = lemma_cache_size
+        self._lemmatize = lru_cache(maxsize=lemma_cache_size)(_lemmatizer.lemmatize)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lemmatize']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lemmatize = lru_cache(maxsize=self.lemma_cache_size)(_lemmatizer.lemmatize)
+
+    def normalize(self, text):
+        """
+        Normalizes one document.
+
+        Args:
+            text (str): Raw text.
+
+        Returns:
+            str: Lemmas of the remaining tokens, separated by spaces.
+        """
+
+        text = ftfy.fix_text(text)
+        for pattern in self.remove_patterns:
+            text = pattern.sub('', text)
+
+        text = text.lower()
+        text = DIGITS_PATTERN.sub('', text)
+        text = PUNCTUATION_PATTERN.sub('', text)
+        text = DETACHED_HYPHEN_PATTERN.sub(' ', text)
+
+        # no sentence punctuation is left, so the text is tokenized as a single sentence
+        tokens = word_tokenize(text, preserve_line=True)
+
+        stop_words = self.stop_words
+        lemmatize = self._lemmatize
+        return ' '.join(
+            lemmatize(word) for word in tokens
+            if word not in stop_words and len(word) > 2 and not word.startswith('-') and not word.endswith('-')
+        )
+
+    def normalize_many(self, texts, processes=None, chunksize=16):
+        """
+        Normalizes a batch of documents, across a process pool when processes is above 1 and the
+        batch is large enough to pay for it.
+
+        Args:
+            texts (iterable): Raw texts.
+            processes (int, optional): Worker processes. Defaults to None (normalize in this process).
+            chunksize (int, optional): Documents sent to a worker at a time.
+
+        Returns:
+            list: Normalized texts, in input order.
+        """
+        texts = list(texts)
+        if not processes or processes <= 1 or len(texts) < MIN_DOCUMENTS_PER_POOL:
+            return [self.normalize(text) for text in texts]
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self,)) as executor:
+            return list(executor.map(_normalize_in_worker, texts, chunksize=chunksize))
+
+
+_worker_normalizer = None
+
+
+def _init_worker(normalizer):
+    global _worker_normalizer
+    _worker_normalizer = normalizer
+
+
+def _normalize_in_worker(text):
+    return _worker_normalizer.normalize(text)
+
+
+ISW_NORMALIZER = TextNormalizer(ISW_STOP_WORDS, ISW_REMOVE_PATTERNS)
+TELEGRAM_NORMALIZER = TextNormalizer(TELEGRAM_STOP_WORDS, TELEGRAM_REMOVE_PATTERNS)
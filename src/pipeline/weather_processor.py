@@ -1,10 +1,26 @@
 import pandas as pd
 from dotenv import load_dotenv
 import os
+from datetime import timedelta
 from src.data_receiver.weather_receiver import WeatherDataCollector
+from src.pipeline.instrumentation import measure
 
+WEATHER_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'weather_cache'))
 
-def get_and_process_weather(target_date, db_handler):
+
+def get_and_process_weather(target_date, db_handler, end_date=None):
+    """
+    Collects, stores and prepares the hourly weather of target_date, or of target_date to
+    end_date (inclusive) for backfills, where every location is requested once per range.
+
+    Args:
+        target_date (datetime): First (or only) day.
+        db_handler (DatabaseHandler)
+        end_date (datetime, optional): Last day. Defaults to target_date.
+
+    Returns:
+        pd.DataFrame: Prepared hourly weather with a 'datetime' column.
+    """
     # 1. ENV
     load_dotenv()
     weather_api_key = os.environ.get("WEATHER_API_KEY")
@@ -12,9 +28,13 @@ def get_and_process_weather(target_date, db_handler):
 
     # 2. WEATHER COLLECTION
     locations = db_handler.get_locations_from_database()
-    collector = WeatherDataCollector(weather_api_key_backup)
+    collector = WeatherDataCollector(weather_api_key, backup_api_key=weather_api_key_backup,
+                                     cache_dir=WEATHER_CACHE_DIR)
 
-    weather_data = collector.collect_and_prepare_data(target_date, target_date, locations)
+    # days already stored in full are not requested again
+    last_date = end_date or target_date
+    stored_days = db_handler.get_weather_stored_days(target_date, last_date + timedelta(days=1))
+    weather_data = collector.collect_and_prepare_data(target_date, last_date, locations, skip_days=stored_days)
 
     # 3. WEATHER INSERTION
     weather_region_mapping = db_handler.fetch_region_mapping()
@@ -24,10 +44,19 @@ def get_and_process_weather(target_date, db_handler):
         'time': 'time'
     }
     
-    db_handler.insert_weather_data(weather_data, weather_region_mapping, weather_col_mapping)
+    if weather_data.empty:
+        print("No new weather data to insert.")
+    else:
+        db_handler.insert_weather_data(weather_data, weather_region_mapping, weather_col_mapping)
 
     # 4. WEATHER PROCESSING
-    weather_data_inserted = db_handler.get_weather_data(daily_fetcher=True)
+    # the read includes the expansion of the JSON 'data' column, the costly part
+    with measure('read_expand_json') as step:
+        if end_date is None:
+            weather_data_inserted = db_handler.get_weather_data(daily_fetcher=True)
+        else:
+            weather_data_inserted = db_handler.get_weather_data(start_date=target_date, end_date=end_date + timedelta(days=1))
+        step.rows = len(weather_data_inserted)
 
     weather_exclude = [
     'weather_id',